@@ -1,15 +1,33 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import calendar
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+import copy
 import io
-import json
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from artifact_cache import ArtifactCache, VersionCounter
+from auto_roster import generate_roster
+from excel_export import safe_file_name, write_schedule_archive, write_schedule_workbook, write_team_bundle
+from export_jobs import DONE, FAILED, ExportJobQueue, QueueFull
+from json_documents import ConflictError
+from member_index import MemberIndex
+from pattern_anchors import anchor_date, make_anchor, materialize, month_records, shift_on
+from replacements import rank_replacements
+from roster_rules import DEFAULT_RULES, RULE_LABELS, check_roster
+from rotations import rotation_block, stagger_offsets
+from schedule_matrix import ScheduleMatrix
+from schedule_store import partition_key
+from shared_store import ChangeFeed, SharedDocuments, SharedMonths
+from shift_times import ShiftTimes
+from storage import open_storage
+from undo_history import UndoHistory, replay_records, schedule_delta
+from staffing import DAY_KINDS, analyze_gaps, day_kinds, empty_requirements, requirement_array
+from shift_types import SHIFT_TYPES
 
 # Page config
 st.set_page_config(
@@ -76,218 +94,431 @@ st.markdown("""
 # File paths for persistent storage
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
-MEMBERS_FILE = DATA_DIR / "team_members.json"
+# 'json' (files under DATA_DIR) or 'sqlite' (DATA_DIR/shifts.db); see migrate_storage.py
+STORAGE_BACKEND = os.environ.get("SHIFT_STORAGE", "json")
+# Flat pre-partitioning schedule, migrated into the month store on first start
 SCHEDULE_FILE = DATA_DIR / "shift_schedule.json"
-SETTINGS_FILE = DATA_DIR / "settings.json"
-PATTERNS_FILE = DATA_DIR / "shift_patterns.json"
-
-# Enhanced shift type definitions with SAST times
-SHIFT_TYPES = {
-    0: {
-        'code': '',
-        'name': 'Off',
-        'time': 'Day Off',
-        'color': '#FFFFFF',
-        'text_color': '#000000'
-    },
-    1: {
-        'code': 'D1',
-        'name': 'Day Shift 1',
-        'time': '7:00 AM - 4:00 PM SAST',
-        'color': '#3B82F6',
-        'text_color': '#FFFFFF'
-    },
-    2: {
-        'code': 'D2',
-        'name': 'Day Shift 2',
-        'time': '8:00 AM - 5:00 PM SAST',
-        'color': '#2563EB',
-        'text_color': '#FFFFFF'
-    },
-    3: {
-        'code': 'L',
-        'name': 'Layover',
-        'time': '2:00 PM - 10:00 PM SAST',
-        'color': '#F59E0B',
-        'text_color': '#FFFFFF'
-    },
-    4: {
-        'code': 'N',
-        'name': 'Night Shift',
-        'time': '4:00 PM - 1:00 AM SAST',
-        'color': '#1F2937',
-        'text_color': '#FFFFFF'
-    },
-    5: {
-        'code': 'EM',
-        'name': 'Early Morning',
-        'time': '3:00 AM - 11:00 AM SAST',
-        'color': '#8B5CF6',
-        'text_color': '#FFFFFF'
-    },
-    6: {
-        'code': 'WD',
-        'name': 'Weekend Day',
-        'time': '7:00 AM - 4:00 PM SAST',
-        'color': '#10B981',
-        'text_color': '#FFFFFF'
-    },
-    7: {
-        'code': 'WEM',
-        'name': 'Weekend Early',
-        'time': '3:00 AM - 11:00 AM SAST',
-        'color': '#059669',
-        'text_color': '#FFFFFF'
-    },
-    8: {
-        'code': 'WN',
-        'name': 'Weekend Night',
-        'time': '4:00 PM - 1:00 AM SAST',
-        'color': '#047857',
-        'text_color': '#FFFFFF'
-    },
-    9: {
-        'code': 'HD',
-        'name': 'Holiday Day',
-        'time': '7:00 AM - 4:00 PM SAST',
-        'color': '#DC2626',
-        'text_color': '#FFFFFF'
-    },
-    10: {
-        'code': 'HEM',
-        'name': 'Holiday Early',
-        'time': '3:00 AM - 11:00 AM SAST',
-        'color': '#B91C1C',
-        'text_color': '#FFFFFF'
-    },
-    11: {
-        'code': 'HN',
-        'name': 'Holiday Night',
-        'time': '4:00 PM - 1:00 AM SAST',
-        'color': '#991B1B',
-        'text_color': '#FFFFFF'
-    },
-    12: {
-        'code': 'X',
-        'name': 'Leave',
-        'time': 'Approved Leave',
-        'color': '#EC4899',
-        'text_color': '#FFFFFF'
-    },
-    13: {
-        'code': 'SL',
-        'name': 'Sick Leave',
-        'time': 'Sick Leave',
-        'color': '#EF4444',
-        'text_color': '#FFFFFF'
-    },
-    14: {
-        'code': 'TR',
-        'name': 'Training',
-        'time': 'Training/Development',
-        'color': '#06B6D4',
-        'text_color': '#FFFFFF'
-    }
+SCHEDULE_JOURNAL_FILE = DATA_DIR / "shift_schedule.journal"
+# Months kept loaded in memory, shared by all sessions
+MONTH_CACHE_SIZE = 12
+# Undo step names by the kind of schedule change
+UNDO_LABELS = {
+    'set': "Shift change",
+    'fill': "Bulk assign",
+    'pattern': "Shift pattern",
+    'rotation': "Team rotation",
+    'cells': "Shift edits"
+}
+RULE_WARNING_ROWS = 20
+# Days before the month the auto-roster reads so rests and streaks carry over
+AUTO_ROSTER_LEAD_DAYS = 7
+COVER_CANDIDATE_ROWS = 10
+EXPORT_CACHE_BYTES = 64 * 2**20
+EXPORT_WORKERS = 2
+BUNDLE_WORKERS = os.cpu_count() or 2
+MAX_TRACKED_EXPORTS = 3
+GRID_PAGE_SIZES = [25, 50, 100, 200]
+BULK_PREVIEW_ROWS = 100
+WEEKDAY_NAMES = list(calendar.day_abbr)
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_MIME = "application/zip"
+# Shared documents and the session_state attribute each session reaches them by
+SESSION_DOCUMENTS = {
+    'team_members': 'member_index',
+    'shift_patterns': 'shift_patterns',
+    'pattern_anchors': 'pattern_anchors',
+    'staffing': 'staffing',
+    'settings': 'settings'
+}
+DOCUMENT_LABELS = {
+    'team_members': "Team members",
+    'shift_patterns': "Shift patterns",
+    'pattern_anchors': "Pattern anchors",
+    'staffing': "Staffing requirements",
+    'settings': "Settings"
 }
 
+# Vectorized lookups indexed by shift type code
+NUM_SHIFT_TYPES = max(SHIFT_TYPES) + 1
+SHIFT_CODES = np.array([SHIFT_TYPES.get(i, SHIFT_TYPES[0])['code'] for i in range(NUM_SHIFT_TYPES)], dtype=object)
+SHIFT_CODE_TYPES = {info['code']: shift_type for shift_type, info in SHIFT_TYPES.items()}
+EDITABLE_SHIFT_CODES = [info['code'] for shift_type, info in SHIFT_TYPES.items() if shift_type > 0]
+SHIFT_LABELS = np.where(SHIFT_CODES == '', 'Off', SHIFT_CODES).astype(object)
+SHIFT_CODE_CSS = {
+    info['code']: f"background-color: {info['color']}; color: {info['text_color']}; font-weight: bold"
+    for info in SHIFT_TYPES.values()
+}
+SHIFT_CODE_CSS_BY_TYPE = np.array([SHIFT_CODE_CSS[code] for code in SHIFT_CODES], dtype=object)
+SHIFT_TIMES = ShiftTimes.from_types(SHIFT_TYPES, NUM_SHIFT_TYPES)
+# Shift codes with working hours, the ones staffing requirements can be set for
+STAFFED_SHIFT_CODES = [info['code'] for shift_type, info in SHIFT_TYPES.items() if SHIFT_TIMES.minutes[shift_type] > 0]
+
 # Data management functions
-def load_team_members():
-    """Load team members from JSON file"""
-    if MEMBERS_FILE.exists():
-        try:
-            with open(MEMBERS_FILE, 'r') as f:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-        except Exception as e:
-            st.error(f"Error loading team members: {e}")
-    return {}
+@st.cache_resource
+def get_data_version():
+    """Process-wide counter bumped by every data save; keys cached exports"""
+    return VersionCounter()
+
+@st.cache_resource
+def get_export_cache():
+    """Process-wide size-bounded cache of generated export files"""
+    return ArtifactCache(EXPORT_CACHE_BYTES)
+
+def decode_team_members(data):
+    """Build the MemberIndex from the ``team_members.json`` layout
+
+    Members saved before IDs existed are given one, and schedules still keyed
+    by their names are re-keyed to the new IDs.
+    """
+    member_index, assigned = MemberIndex.from_dict(data if isinstance(data, dict) else {})
+    if assigned:
+        get_schedule_store().rekey_members(assigned)
+    return member_index
+
+def decode_staffing(data):
+    return {**empty_requirements(), **(data or {})}
 
-def save_team_members(team_members):
-    """Save team members to JSON file"""
+def decode_settings(data):
+    if data is not None:
+        return data
+    return {
+        'current_month': datetime.now().month,
+        'current_year': datetime.now().year
+    }
+
+@st.cache_resource
+def get_change_feed():
+    """Process-wide feed of document and schedule changes, read by every session on rerun"""
+    return ChangeFeed()
+
+@st.cache_resource
+def get_shared_documents():
+    """Process-wide team members, patterns, anchors, staffing and settings, held once"""
+    documents = SharedDocuments(get_storage(), get_change_feed())
+    documents.register('team_members', decode_team_members, MemberIndex.to_dict)
+    documents.register('shift_patterns', lambda data: data or {})
+    documents.register('pattern_anchors', lambda data: data or {})
+    documents.register('staffing', decode_staffing)
+    documents.register('settings', decode_settings)
+    return documents
+
+def load_document(key):
+    """Point this session at the current version of a shared document"""
+    documents = get_shared_documents()
     try:
-        with open(MEMBERS_FILE, 'w') as f:
-            json.dump(team_members, f, indent=2)
+        value = documents.get(key)
+    except Exception as e:
+        st.error(f"Error loading {DOCUMENT_LABELS[key].lower()}: {e}")
+        value = documents.empty(key)
+    st.session_state[SESSION_DOCUMENTS[key]] = value
+    return value
+
+def rendered_document(key):
+    """The version of a document the page on screen was built from"""
+    return st.session_state.rendered_documents.get(key, st.session_state[SESSION_DOCUMENTS[key]])
+
+def save_shared_document(key, value, base=None):
+    """Save ``value``, a modified copy of a document
+
+    ``base`` is the version the change was made against, by default the one
+    the page on screen was built from. Changes other sessions saved since
+    then are merged in. If both changed the same value nothing is saved and
+    the latest version is shown instead. Shared values must never be edited
+    in place.
+    """
+    attribute = SESSION_DOCUMENTS[key]
+    if base is None:
+        base = rendered_document(key)
+    try:
+        saved = get_shared_documents().save(key, value, base)
+        # Later saves in this run build on this one
+        st.session_state[attribute] = st.session_state.rendered_documents[key] = saved
         return True
+    except ConflictError as e:
+        st.error(f"❌ {DOCUMENT_LABELS[key]} not saved: {e}. The latest version has been loaded.")
+        load_document(key)
+        return False
     except Exception as e:
-        st.error(f"Error saving team members: {e}")
+        st.error(f"Error saving {DOCUMENT_LABELS[key].lower()}: {e}")
         return False
 
-def load_shift_schedule():
-    """Load shift schedule from JSON file"""
-    if SCHEDULE_FILE.exists():
-        try:
-            with open(SCHEDULE_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            st.error(f"Error loading shift schedule: {e}")
-    return {}
+def save_team_members(member_index):
+    """Save team members to JSON file and move shared month rows to their teams"""
+    if not save_shared_document('team_members', member_index):
+        return False
+    get_shared_months().regroup(st.session_state.member_index.member_teams)
+    get_data_version().bump()
+    return True
+
+@st.cache_resource
+def get_storage():
+    """Process-wide storage backend for documents and month schedules"""
+    return open_storage(STORAGE_BACKEND, DATA_DIR)
+
+def get_schedule_store():
+    """Per-month schedule store of the storage backend, shared by all sessions"""
+    return get_storage().schedules
 
-def save_shift_schedule(shift_schedule):
-    """Save shift schedule to JSON file"""
+@st.cache_resource
+def get_shared_months():
+    """Process-wide cache of loaded months, shared by all sessions"""
+    return SharedMonths(get_schedule_store(), get_change_feed(), load_shift_schedule, MONTH_CACHE_SIZE)
+
+def load_shift_schedule(year, month):
+    """Load one month's snapshot and replay its journal into ``(matrix, seq)``"""
+    store = get_schedule_store()
+    member_index = get_shared_documents().get('team_members')
+    if store.migrate_legacy(SCHEDULE_FILE, SCHEDULE_JOURNAL_FILE, year, month):
+        store.rekey_members(member_index.name_map(), months=[(year, month)])
+        st.info(f"ℹ️ Moved existing schedule into {calendar.month_name[month]} {year}")
+    shift_schedule, seq, warnings = store.journal(year, month).load_versioned()
+    for warning in warnings:
+        st.warning(f"⚠️ {warning}")
+    matrix = ScheduleMatrix.from_dict(
+        shift_schedule, get_days_in_month(year, month), NUM_SHIFT_TYPES, member_index.member_teams
+    )
+    return matrix, seq
+
+def select_schedule_month(year, month):
+    """Make (year, month) the active schedule, loading it into the shared month cache if needed
+
+    Anchored patterns are laid over the month for members with no row in it yet.
+    """
     try:
-        with open(SCHEDULE_FILE, 'w') as f:
-            json.dump(shift_schedule, f, indent=2)
-        return True
+        shift_schedule, seq, _ = get_shared_months().get(year, month)
+    except Exception as e:
+        st.error(f"Error loading shift schedule: {e}")
+        st.session_state.shift_schedule = ScheduleMatrix(get_days_in_month(year, month), NUM_SHIFT_TYPES)
+        st.session_state.schedule_seq = None
+        return
+    st.session_state.shift_schedule, st.session_state.schedule_seq = shift_schedule, seq
+    extend_anchored_patterns(shift_schedule, year, month)
+
+def sync_schedule_month():
+    """Point the session at the shared copy of the active month, with everyone's latest changes"""
+    year, month = st.session_state.current_year, st.session_state.current_month
+    entry = get_shared_months().peek(year, month)
+    if entry is None:
+        select_schedule_month(year, month)
+    else:
+        st.session_state.shift_schedule, st.session_state.schedule_seq = entry
+
+def record_schedule_changes(*records, label=None, anchors=None):
+    """Apply changes to the active month and append them to its journal
+
+    ``anchors`` optionally sets pattern anchors with them (see
+    ``update_pattern_anchors``). The cells and anchors changed become one
+    undo step named ``label`` (default: the kind of change), and the members
+    touched are re-checked against the working-time rules.
+    """
+    year, month = st.session_state.current_year, st.session_state.current_month
+    delta = schedule_delta(st.session_state.shift_schedule, records)
+    success = record_month_changes(year, month, *records)
+    if success:
+        anchor_changes = update_pattern_anchors(anchors) if anchors else {}
+        if delta is not None or anchor_changes:
+            st.session_state.undo_history.push({
+                'label': label or UNDO_LABELS[records[0]['op']],
+                'months': {(year, month): delta} if delta is not None else {},
+                'anchors': anchor_changes or {}
+            })
+        refresh_rule_warnings(
+            member_id
+            for record in records
+            for member_id in (
+                [cell[0] for cell in record['cells']] if 'cells' in record
+                else record.get('members', [record.get('member')])
+            )
+        )
+    return success
+
+def refresh_rule_warnings(member_ids):
+    """Re-check members of the active month against the working-time rules after a change
+
+    The violations are kept for ``render_rule_warnings``.
+    """
+    year, month = st.session_state.current_year, st.session_state.current_month
+    member_ids = [
+        member_id for member_id in dict.fromkeys(member_ids) if member_id in st.session_state.member_index
+    ]
+    st.session_state.rule_warnings = {
+        'month': partition_key(year, month),
+        'violations': check_schedule_rules(member_ids, year, month)
+    }
+
+def rendered_seq():
+    """Journal ``seq`` of the active month as the page on screen showed it
+
+    None if the page has not shown this month yet (it was only just
+    selected), so there is nothing on screen to check changes against.
+    """
+    key, seq = st.session_state.get('rendered_month', (None, None))
+    if key == partition_key(st.session_state.current_year, st.session_state.current_month):
+        return seq
+    return None
+
+def record_month_changes(year, month, *records, force=False):
+    """Append changes to one month's journal and to the shared copy of it
+
+    For the active month, changes other sessions saved since the page on
+    screen was built are checked first: if one of them set a cell these
+    records also set, nothing is saved and the latest version is shown
+    instead, unless ``force``.
+    """
+    active = (year, month) == (st.session_state.current_year, st.session_state.current_month)
+    try:
+        _, seq = get_shared_months().record(
+            year, month, *records, base_seq=rendered_seq() if active else None, force=force
+        )
+    except ConflictError as e:
+        st.error(f"❌ Not saved: {e}. {calendar.month_name[month]} {year} now shows their changes; "
+                 f"please redo yours.")
+        if active:
+            sync_schedule_month()
+            st.session_state.grid_edit_generation += 1
+        return False
     except Exception as e:
         st.error(f"Error saving shift schedule: {e}")
         return False
+    if active:
+        st.session_state.rendered_month = (partition_key(year, month), seq)
+        sync_schedule_month()
+    get_data_version().bump()
+    return True
 
-def load_shift_patterns():
-    """Load saved shift patterns"""
-    if PATTERNS_FILE.exists():
-        try:
-            with open(PATTERNS_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            st.error(f"Error loading shift patterns: {e}")
-    return {}
+def unlaid_anchors(shift_schedule, member_ids=None):
+    """Members of ``member_ids`` (default all) with a pattern anchor but no row in ``shift_schedule``"""
+    anchors = st.session_state.pattern_anchors
+    member_index = st.session_state.member_index
+    return [
+        member_id for member_id in (anchors if member_ids is None else member_ids)
+        if member_id in anchors and member_id in member_index and member_id not in shift_schedule
+    ]
+
+def extend_anchored_patterns(shift_schedule, year, month):
+    """Save anchored patterns into a month being opened, for members with no row in it yet
+
+    Months that are only read (rule checks, coverage) get them laid in
+    memory by ``load_schedule_block`` instead.
+    """
+    records = month_records(st.session_state.pattern_anchors, unlaid_anchors(shift_schedule), year, month)
+    if records:
+        record_month_changes(year, month, *records)
+
+def fill_anchored_months(months):
+    """Re-lay every anchored pattern over the ``months`` months after the active one"""
+    member_ids = [member_id for member_id in st.session_state.pattern_anchors
+                  if member_id in st.session_state.member_index]
+    filled = 0
+    for offset in range(1, months + 1):
+        year, month = add_months(st.session_state.current_year, st.session_state.current_month, offset)
+        records = month_records(st.session_state.pattern_anchors, member_ids, year, month)
+        if records:
+            if not record_month_changes(year, month, *records):
+                break
+            filled += 1
+    return filled
 
 def save_shift_patterns(patterns):
     """Save shift patterns to JSON file"""
-    try:
-        with open(PATTERNS_FILE, 'w') as f:
-            json.dump(patterns, f, indent=2)
-        return True
-    except Exception as e:
-        st.error(f"Error saving shift patterns: {e}")
+    if not save_shared_document('shift_patterns', patterns):
         return False
+    get_data_version().bump()
+    return True
 
-def load_settings():
-    """Load app settings from JSON file"""
-    if SETTINGS_FILE.exists():
-        try:
-            with open(SETTINGS_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            st.error(f"Error loading settings: {e}")
+def save_pattern_anchors(anchors):
+    """Save per-member date-anchored patterns"""
+    return save_shared_document('pattern_anchors', anchors)
+
+def pattern_anchor_updates(member_ids, name, pattern, anchors):
+    """``{member_id: anchor}`` anchoring ``pattern`` at each date in ``anchors``; a None date clears it"""
     return {
-        'current_month': datetime.now().month,
-        'current_year': datetime.now().year
+        member_id: None if anchor is None else make_anchor(name, pattern, anchor)
+        for member_id, anchor in zip(member_ids, anchors)
     }
 
-def save_settings(settings):
+def update_pattern_anchors(updates):
+    """Set members' anchors from ``{member_id: anchor}``, where None clears one
+
+    Returns ``{member_id: [old, new]}`` for the anchors that changed, or None
+    if saving failed.
+    """
+    current = st.session_state.pattern_anchors
+    changed = {
+        member_id: [current.get(member_id), anchor]
+        for member_id, anchor in updates.items() if current.get(member_id) != anchor
+    }
+    if not changed:
+        return {}
+    pattern_anchors = dict(current)
+    for member_id, (_, anchor) in changed.items():
+        if anchor is None:
+            pattern_anchors.pop(member_id, None)
+        else:
+            pattern_anchors[member_id] = anchor
+    return changed if save_pattern_anchors(pattern_anchors) else None
+
+def save_staffing_requirements(requirements):
+    """Save staffing requirements to JSON file"""
+    return save_shared_document('staffing', requirements)
+
+def get_rule_limits():
+    """Working-time rule limits from settings, falling back to the defaults"""
+    return {**DEFAULT_RULES, **st.session_state.settings.get('rules', {})}
+
+def save_settings(settings, base=None):
     """Save app settings to JSON file"""
-    try:
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f, indent=2)
-        return True
-    except Exception as e:
-        st.error(f"Error saving settings: {e}")
-        return False
+    return save_shared_document('settings', settings, base)
 
-# Initialize session state
-if 'team_members' not in st.session_state:
-    st.session_state.team_members = load_team_members()
+def apply_change_feed():
+    """Pick up what other sessions changed since this session's last run
 
-if 'shift_schedule' not in st.session_state:
-    st.session_state.shift_schedule = load_shift_schedule()
+    Only the documents named in the change feed are re-bound, and the active
+    month only if it changed. A session that fell further behind than the
+    feed reaches re-binds everything.
+    """
+    get_shared_documents().refresh()
+    feed = get_change_feed()
+    latest = feed.version
+    changes = feed.since(st.session_state.feed_version)
+    if changes is None:
+        changes = [(latest, 'document', key, None) for key in SESSION_DOCUMENTS]
+        changes.append((latest, 'schedule', None, None))
+    active = partition_key(st.session_state.current_year, st.session_state.current_month)
+    documents = dict.fromkeys(key for _, topic, key, _ in changes if topic == 'document')
+    for key in documents:
+        load_document(key)
+    if 'team_members' in documents:
+        get_shared_months().regroup(st.session_state.member_index.member_teams)
+    if any(topic == 'schedule' and key in (active, None) for _, topic, key, _ in changes):
+        sync_schedule_month()
+    if changes:
+        st.session_state.feed_version = changes[-1][0]
 
-if 'shift_patterns' not in st.session_state:
-    st.session_state.shift_patterns = load_shift_patterns()
+def remember_rendered_versions():
+    """Note the month ``seq`` and documents the page was just built from
+
+    Called once the whole page has run, so the handlers of the next run save
+    against what the user actually saw, not what ``apply_change_feed`` picked
+    up at its start.
+    """
+    st.session_state.rendered_month = (
+        partition_key(st.session_state.current_year, st.session_state.current_month),
+        st.session_state.schedule_seq
+    )
+    st.session_state.rendered_documents = {
+        key: st.session_state[attribute] for key, attribute in SESSION_DOCUMENTS.items()
+    }
+
+# Helper functions
+def get_days_in_month(year, month):
+    return calendar.monthrange(year, month)[1]
 
-if 'settings' not in st.session_state:
-    st.session_state.settings = load_settings()
+# Initialize session state
+if 'feed_version' not in st.session_state:
+    st.session_state.feed_version = get_change_feed().version
+    for key in SESSION_DOCUMENTS:
+        load_document(key)
 
 if 'current_month' not in st.session_state:
     st.session_state.current_month = st.session_state.settings.get('current_month', datetime.now().month)
@@ -295,167 +526,620 @@ if 'current_month' not in st.session_state:
 if 'current_year' not in st.session_state:
     st.session_state.current_year = st.session_state.settings.get('current_year', datetime.now().year)
 
-# Helper functions
-def get_days_in_month(year, month):
-    return calendar.monthrange(year, month)[1]
+if 'export_jobs' not in st.session_state:
+    st.session_state.export_jobs = []
+
+if 'grid_edit_generation' not in st.session_state:
+    st.session_state.grid_edit_generation = 0
+
+if 'undo_history' not in st.session_state:
+    st.session_state.undo_history = UndoHistory()
+
+if 'rendered_documents' not in st.session_state:
+    st.session_state.rendered_documents = {}
+
+if 'shift_schedule' not in st.session_state:
+    select_schedule_month(st.session_state.current_year, st.session_state.current_month)
+else:
+    apply_change_feed()
 
 def get_shift_info(shift_type):
     """Get shift information by type"""
     return SHIFT_TYPES.get(shift_type, SHIFT_TYPES[0])
 
-def update_shift(member_name, day, shift_type):
-    """Update a shift and save to file"""
-    if member_name not in st.session_state.shift_schedule:
-        st.session_state.shift_schedule[member_name] = [0] * 31
-    
-    if day < len(st.session_state.shift_schedule[member_name]):
-        st.session_state.shift_schedule[member_name][day] = shift_type
-        save_shift_schedule(st.session_state.shift_schedule)
-
-def bulk_update_shifts(member_name, start_day, end_day, shift_type):
-    """Update multiple days at once"""
-    if member_name not in st.session_state.shift_schedule:
-        st.session_state.shift_schedule[member_name] = [0] * 31
-    
-    for day in range(start_day, end_day + 1):
-        if day < len(st.session_state.shift_schedule[member_name]):
-            st.session_state.shift_schedule[member_name][day] = shift_type
-    
-    save_shift_schedule(st.session_state.shift_schedule)
-    return True
+def update_shift(member_id, day, shift_type):
+    """Update a shift and record it in the journal"""
+    return record_schedule_changes({'op': 'set', 'member': member_id, 'days': [day, day], 'shift': shift_type})
 
-def apply_shift_pattern(member_name, pattern, start_day=0):
-    """Apply a shift pattern to a member"""
-    if member_name not in st.session_state.shift_schedule:
-        st.session_state.shift_schedule[member_name] = [0] * 31
-    
-    days_in_month = len(st.session_state.shift_schedule[member_name])
-    pattern_length = len(pattern)
-    
-    for i in range(start_day, days_in_month):
-        pattern_index = (i - start_day) % pattern_length
-        st.session_state.shift_schedule[member_name][i] = pattern[pattern_index]
-    
-    save_shift_schedule(st.session_state.shift_schedule)
-    return True
+def bulk_assign_shifts(member_ids, days, shift_type):
+    """Set the same shift on the given (0-based) days for many members in one write"""
+    return record_schedule_changes(
+        {'op': 'fill', 'members': list(member_ids), 'days': [int(day) for day in days], 'shift': shift_type}
+    )
+
+def apply_shift_pattern(member_id, pattern, start_day=0, anchors=None):
+    """Apply a shift pattern to a member, optionally updating pattern anchors with it"""
+    return record_schedule_changes(
+        {'op': 'pattern', 'member': member_id, 'pattern': list(pattern), 'start': start_day},
+        anchors=anchors
+    )
+
+def apply_team_rotation(member_ids, pattern, offsets, start_day=0, anchors=None):
+    """Apply one pattern to many members at staggered phase offsets in one write"""
+    return record_schedule_changes({
+        'op': 'rotation',
+        'members': list(member_ids),
+        'pattern': list(pattern),
+        'offsets': [int(offset) for offset in offsets],
+        'start': start_day
+    }, anchors=anchors)
+
+def draft_auto_roster(teams, time_budget, keep_existing=False):
+    """Generate a roster for the active month without saving it
+
+    Leave, sick days and training are always kept; with ``keep_existing`` so
+    is every shift already in the schedule. Returns the draft as a dict for
+    ``st.session_state.roster_draft``.
+    """
+    year, month = st.session_state.current_year, st.session_state.current_month
+    member_index = st.session_state.member_index
+    team_slot = {team: slot for slot, team in enumerate(teams)}
+    ids = member_index.ids(set(teams))
+    row_teams = [team_slot[member_index.team_of(member_id)] for member_id in ids]
+    lead_start = date(year, month, 1) - timedelta(days=AUTO_ROSTER_LEAD_DAYS)
+    block = load_schedule_block(ids, lead_start, date(year, month, get_days_in_month(year, month)))
+    fixed = block != 0
+    if not keep_existing:
+        fixed &= SHIFT_TIMES.minutes[block] == 0
+    required = requirement_array(st.session_state.staffing, teams, SHIFT_CODE_TYPES, NUM_SHIFT_TYPES)
+    kinds = day_kinds(year, month, st.session_state.staffing['holidays'])
+    original = block[:, AUTO_ROSTER_LEAD_DAYS:].copy()
+    draft, summary = generate_roster(
+        block, fixed, row_teams, kinds, required, SHIFT_TIMES, lead_start,
+        get_rule_limits(), lead=AUTO_ROSTER_LEAD_DAYS, time_budget=time_budget
+    )
+    summary['short_before'] = int(analyze_gaps(original, row_teams, kinds, required)[2].sum())
+    return {
+        'month': partition_key(year, month),
+        'ids': ids,
+        'original': original,
+        'draft': draft,
+        'summary': summary
+    }
+
+def write_auto_roster(roster_draft):
+    """Save a draft's changes as one journal record
+
+    Cells that changed in the schedule since the draft was generated keep
+    their newer value. Returns ``(written, skipped)``, or None if saving failed.
+    """
+    member_index = st.session_state.member_index
+    ids = roster_draft['ids']
+    original, draft = roster_draft['original'], roster_draft['draft']
+    current = st.session_state.shift_schedule.rows(ids)
+    changed = draft != original
+    changed[[member_id not in member_index for member_id in ids]] = False
+    conflicts = changed & (current != original)
+    rows, days = np.nonzero(changed & ~conflicts)
+    cells = [[ids[row], int(day), int(draft[row, day])] for row, day in zip(rows, days)]
+    if cells and not record_schedule_changes({'op': 'cells', 'cells': cells}, label="Auto roster"):
+        return None
+    return len(cells), int(conflicts.sum())
+
+def find_cover(member_id, day, shift_type):
+    """Ranked teammates who could take ``member_id``'s ``shift_type`` on ``day`` (0-based)"""
+    year, month = st.session_state.current_year, st.session_state.current_month
+    return rank_replacements(
+        st.session_state.shift_schedule, member_id, day, shift_type,
+        st.session_state.member_index.team_of(member_id),
+        SHIFT_TIMES, date(year, month, 1), get_rule_limits()
+    )
+
+def assign_cover(member_id, cover_id, day, shift_type, absence_type):
+    """Hand a shift to ``cover_id`` and mark ``member_id`` absent, as one journal record"""
+    return record_schedule_changes({
+        'op': 'cells',
+        'cells': [[member_id, day, absence_type], [cover_id, day, shift_type]]
+    }, label="Cover")
+
+def diff_grid_edits(ids, original, edited):
+    """Compare an edited grid of shift codes with the one it was built from
+
+    Returns ``(cells, invalid)``: ``[member_id, day, shift]`` for every changed
+    cell, and the unrecognized codes. Any invalid code rejects the whole batch.
+    """
+    edited = pd.DataFrame(edited).fillna('').to_numpy(dtype=object)
+    rows, days = np.nonzero(edited != original)
+    new_codes = pd.Series(edited[rows, days], dtype=object).astype(str).str.strip().str.upper()
+    changed = (new_codes.to_numpy(dtype=object) != original[rows, days])
+    rows, days, new_codes = rows[changed], days[changed], new_codes[changed]
+    shifts = new_codes.map(SHIFT_CODE_TYPES)
+    invalid = sorted(set(new_codes[shifts.isna()]))
+    if invalid:
+        return [], invalid
+    return [[ids[r], int(d), int(v)] for r, d, v in zip(rows, days, shifts.to_numpy(dtype=np.int64))], []
+
+def commit_grid_edits(cells):
+    """Save a batch of grid edits as a single journal record"""
+    return record_schedule_changes({'op': 'cells', 'cells': cells}, label="Grid edits")
+
+def remove_member_schedule(member_id):
+    """Drop a member from the active month and every later month; history is kept
+
+    Returns the removed rows as ``{(year, month): delta}`` for undo, or None
+    if saving failed.
+    """
+    current = (st.session_state.current_year, st.session_state.current_month)
+    store = get_schedule_store()
+    record = {'op': 'remove', 'member': member_id}
+    removed = {}
+    for year, month in sorted(set(store.partitions()) | {current}):
+        if (year, month) < current:
+            continue
+        delta = schedule_delta(get_shared_months().get(year, month)[0], [record])
+        # The member is gone for good, so this wins over anyone else's edits to their row
+        if not record_month_changes(year, month, record, force=True):
+            return None
+        if delta is not None:
+            removed[year, month] = delta
+    return removed
 
 def add_team_member(team_name, member_data):
     """Add a new team member and save"""
-    if team_name not in st.session_state.team_members:
-        st.session_state.team_members[team_name] = []
-    
-    existing_names = [m['name'] for m in st.session_state.team_members[team_name]]
-    if member_data['name'] in existing_names:
+    member_index = st.session_state.member_index.copy()
+    if member_index.find(team_name, member_data['name']) is not None:
         return False, "Member already exists in this team"
     
-    st.session_state.team_members[team_name].append(member_data)
-    st.session_state.shift_schedule[member_data['name']] = [0] * 31
-    
-    save_team_members(st.session_state.team_members)
-    save_shift_schedule(st.session_state.shift_schedule)
-    
+    member_id = member_index.add(team_name, member_data)
+    if not save_team_members(member_index):
+        return False, f"{member_data['name']} was not added"
+    st.session_state.undo_history.push({
+        'label': f"Add {member_data['name']}",
+        'months': {},
+        'anchors': {},
+        'member': {
+            'action': 'add', 'id': member_id, 'team': team_name, 'record': member_index.get(member_id),
+            'position': len(member_index.members(team_name)) - 1
+        }
+    })
     return True, "Member added successfully"
 
-def remove_team_member(team_name, member_name):
+def remove_team_member(member_id):
     """Remove a team member and save"""
-    if team_name in st.session_state.team_members:
-        st.session_state.team_members[team_name] = [
-            m for m in st.session_state.team_members[team_name] 
-            if m['name'] != member_name
-        ]
-        
-        if member_name in st.session_state.shift_schedule:
-            del st.session_state.shift_schedule[member_name]
-        
-        save_team_members(st.session_state.team_members)
-        save_shift_schedule(st.session_state.shift_schedule)
-        return True, f"Removed {member_name} from {team_name}"
+    member_index = st.session_state.member_index.copy()
+    if member_id in member_index:
+        team_name = member_index.team_of(member_id)
+        position = member_index.ids([team_name]).index(member_id)
+        record = member_index.remove(member_id)
+        
+        # Their shifts are cleared with force, so only once they are really off the team
+        if not save_team_members(member_index):
+            return False, f"{record['name']} was not removed"
+        removed = remove_member_schedule(member_id)
+        if removed is None:
+            return False, f"Removed {record['name']} from {team_name}, but their shifts could not all be cleared"
+        st.session_state.undo_history.push({
+            'label': f"Remove {record['name']}",
+            'months': removed,
+            'anchors': update_pattern_anchors({member_id: None}) or {},
+            'member': {'action': 'remove', 'id': member_id, 'team': team_name, 'record': record,
+                       'position': position}
+        })
+        return True, f"Removed {record['name']} from {team_name}"
     return False, "Team or member not found"
 
-def export_to_excel():
-    """Export schedule to Excel with enhanced formatting"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Schedule {st.session_state.current_month}-{st.session_state.current_year}"
+def update_team_member(member_id, name, team_name):
+    """Rename a member and/or move them to another team; schedules are keyed by ID and stay put"""
+    member_index = st.session_state.member_index.copy()
+    if member_id not in member_index:
+        return False, "Member not found"
+    existing = member_index.find(team_name, name)
+    if existing is not None and existing != member_id:
+        return False, "Member already exists in this team"
+    
+    if name != member_index.name_of(member_id):
+        member_index.rename(member_id, name)
+    if team_name != member_index.team_of(member_id):
+        member_index.move(member_id, team_name)
     
-    # Header styling
-    header_fill = PatternFill(start_color="667EEA", end_color="667EEA", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    if not save_team_members(member_index):
+        return False, f"{name} was not updated"
+    return True, f"Updated {name} ({team_name})"
+
+def replay_member(member, forward):
+    """Take an added/removed member out of, or put them back into, the team members
+
+    Redoing a removal or undoing an addition takes them out; the other two
+    put them back where they were in their team.
+    """
+    taking_out = forward == (member['action'] == 'remove')
+    member_index = st.session_state.member_index
+    if taking_out == (member['id'] not in member_index):
+        return True
+    member_index = member_index.copy()
+    if taking_out:
+        member_index.remove(member['id'])
+    else:
+        member_index.restore(member['team'], member['record'], member['position'])
+    return save_team_members(member_index)
+
+def replay_step(step, forward):
+    """Redo (``forward``) or undo one step of this session's history
+
+    Each month it touched gets a single journal append. Returns
+    ``(success, skipped)`` where ``skipped`` counts cells and anchors left
+    alone because someone else changed them since.
+    """
+    member = step.get('member')
+    # A restored member needs their record back before their rows
+    if member is not None and forward != (member['action'] == 'remove'):
+        if not replay_member(member, forward):
+            return False, 0
+    skipped = 0
+    for (year, month), delta in step['months'].items():
+        try:
+            matrix = get_shared_months().get(year, month)[0]
+        except Exception as e:
+            st.error(f"Error loading shift schedule: {e}")
+            return False, skipped
+        records, month_skipped = replay_records(delta, matrix, forward)
+        skipped += month_skipped
+        if records and not record_month_changes(year, month, *records, force=member is not None):
+            return False, skipped
+    anchors = {}
+    for member_id, (old, new) in step['anchors'].items():
+        expected, value = (old, new) if forward else (new, old)
+        if st.session_state.pattern_anchors.get(member_id) == expected:
+            anchors[member_id] = value
+        else:
+            skipped += 1
+    if anchors and update_pattern_anchors(anchors) is None:
+        return False, skipped
+    if member is not None and forward == (member['action'] == 'remove'):
+        if not replay_member(member, forward):
+            return False, skipped
+    # The warnings shown were about the change just undone or redone
+    delta = step['months'].get((st.session_state.current_year, st.session_state.current_month))
+    if delta is None:
+        st.session_state.pop('rule_warnings', None)
+    else:
+        refresh_rule_warnings([cell[0] for cell in delta['cells']] + delta['added'] + delta['removed'])
+    return True, skipped
+
+def undo_last_change():
+    """Revert this session's latest change; returns ``(success, message)``"""
+    history = st.session_state.undo_history
+    step = history.next_undo()
+    if step is None:
+        return False, "Nothing to undo"
+    success, skipped = replay_step(step, forward=False)
+    if not success:
+        return False, f"Could not undo {step['label']}"
+    history.undone()
+    return True, f"Undid {step['label']}" + (
+        f" ({skipped} changes someone else made since were kept)" if skipped else ""
+    )
+
+def redo_last_change():
+    """Re-apply the change undone last; returns ``(success, message)``"""
+    history = st.session_state.undo_history
+    step = history.next_redo()
+    if step is None:
+        return False, "Nothing to redo"
+    success, skipped = replay_step(step, forward=True)
+    if not success:
+        return False, f"Could not redo {step['label']}"
+    history.redone()
+    return True, f"Redid {step['label']}" + (
+        f" ({skipped} changes someone else made since were kept)" if skipped else ""
     )
+
+@st.cache_resource
+def get_export_queue():
+    """Process-wide background export workers shared by all sessions"""
+    return ExportJobQueue(max_workers=EXPORT_WORKERS)
+
+@st.cache_resource
+def get_bundle_pool():
+    """Process pool for per-team bundle workbooks, shared by all sessions"""
+    return ProcessPoolExecutor(max_workers=BUNDLE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+
+def add_months(year, month, offset):
+    """(year, month) shifted by ``offset`` months"""
+    index = year * 12 + month - 1 + offset
+    return index // 12, index % 12 + 1
+
+def run_cached_export(job, version, cache, key, build, *args):
+    """Worker entry point: build the export file and keep it in the export cache
+
+    The data version is read here, before ``build`` loads any month, so the
+    file is cached under a version no newer than the data in it.
+    """
+    return cache.get_or_build((version.value, *key[1:]), lambda: build(job, *args))
+
+def load_export_shifts(months, store, ids, year, month):
+    """``ids`` rows of one month for an export worker: the shared copy if loaded, else read from disk"""
+    entry = months.peek(year, month)
+    if entry is not None:
+        return entry[0].rows(ids)
+    schedule, _ = store.load_month(year, month)
+    return ScheduleMatrix.from_dict(schedule, get_days_in_month(year, month), NUM_SHIFT_TYPES).rows(ids)
+
+def build_grid_export(job, year, month, members, ids, months, store):
+    """Build one month's schedule workbook as bytes (runs on an export worker)"""
+    shifts = load_export_shifts(months, store, ids, year, month)
+    output = io.BytesIO()
+    write_schedule_workbook(output, f"Schedule {month}-{year}", members, shifts, SHIFT_TYPES,
+                            get_days_in_month(year, month), progress=job.report)
+    return output.getvalue()
+
+def build_archive_export(job, entries, members, ids, months, store):
+    """Build a ZIP of monthly workbooks, loading each month as it is written (runs on an export worker)"""
+    def load_shifts(year, month):
+        return load_export_shifts(months, store, ids, year, month)
     
-    days = get_days_in_month(st.session_state.current_year, st.session_state.current_month)
+    output = io.BytesIO()
+    write_schedule_archive(output, entries, members, SHIFT_TYPES, load_shifts, progress=job.report)
+    return output.getvalue()
+
+def build_team_bundle_export(job, periods, members, ids, months, store, pool):
+    """Build a ZIP with one workbook per team per month across the process pool"""
+    job.report(0.0, "Loading months")
+    team_rows = {}
+    for idx, member in enumerate(members):
+        team_rows.setdefault(member[1], []).append(idx)
     
-    # Headers
-    headers = ['Member', 'Team', 'Location', 'WHMCS'] + [f'Day {i}' for i in range(1, days + 1)]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
+    tasks = []
+    for year, month in periods:
+        days = get_days_in_month(year, month)
+        shifts = load_export_shifts(months, store, ids, year, month)
+        for team, rows in team_rows.items():
+            tasks.append((
+                f"{year}-{month:02d}/{safe_file_name(team)}.xlsx",
+                f"Schedule {month}-{year}",
+                [members[i] for i in rows],
+                shifts[rows],
+                days
+            ))
     
-    # Data rows
-    row = 2
-    for team_name, members in st.session_state.team_members.items():
-        for member in members:
-            ws.cell(row=row, column=1, value=member['name']).border = border
-            ws.cell(row=row, column=2, value=team_name).border = border
-            ws.cell(row=row, column=3, value=member['location']).border = border
-            ws.cell(row=row, column=4, value=member['whmcs']).border = border
-            
-            schedule = st.session_state.shift_schedule.get(member['name'], [0] * days)
-            for day in range(days):
-                col = day + 5
-                shift_type = schedule[day] if day < len(schedule) else 0
-                shift_info = get_shift_info(shift_type)
-                
-                cell = ws.cell(row=row, column=col, value=shift_info['code'])
-                cell.fill = PatternFill(start_color=shift_info['color'].replace('#', ''), 
-                                       end_color=shift_info['color'].replace('#', ''), 
-                                       fill_type="solid")
-                cell.font = Font(bold=True, color=shift_info['text_color'].replace('#', ''))
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                cell.border = border
-            
-            row += 1
+    job.report(0.0, f"Generating {len(tasks)} workbooks")
+    try:
+        output = io.BytesIO()
+        write_team_bundle(output, tasks, SHIFT_TYPES, executor=pool, progress=job.report)
+    except BrokenProcessPool:
+        # A dead worker breaks the pool for good; replace it and finish in-process
+        get_bundle_pool.clear()
+        job.report(0.0, "Worker pool restarted; generating sequentially")
+        output = io.BytesIO()
+        write_team_bundle(output, tasks, SHIFT_TYPES, progress=job.report)
+    return output.getvalue()
+
+def submit_export(months=1, per_team=False):
+    """Queue an export of the active month, or a ZIP of it and the following months
+
+    With ``per_team`` the ZIP holds one workbook per team per month, built in
+    parallel on the bundle process pool.
+    """
+    year, month = st.session_state.current_year, st.session_state.current_month
+    ids, names, member_teams, records = get_roster()
+    members = [
+        (name, team, record['location'], record['whmcs'])
+        for name, team, record in zip(names, member_teams, records)
+    ]
     
-    # Add legend sheet
-    legend_ws = wb.create_sheet("Legend")
-    legend_ws.cell(row=1, column=1, value="Shift Code").font = Font(bold=True)
-    legend_ws.cell(row=1, column=2, value="Shift Name").font = Font(bold=True)
-    legend_ws.cell(row=1, column=3, value="Time").font = Font(bold=True)
+    if per_team:
+        fmt = f'teams-zip-{months}'
+        label = f"Team bundle, {months} month{'s' if months > 1 else ''} from {calendar.month_name[month]} {year}"
+        file_name = f"team_schedules_{year}-{month:02d}_{months}_months.zip"
+        mime = ZIP_MIME
+        periods = [add_months(year, month, offset) for offset in range(months)]
+        build = build_team_bundle_export
+        args = (periods, members, ids, get_shared_months(), get_schedule_store(), get_bundle_pool())
+    elif months == 1:
+        fmt = 'xlsx'
+        label = f"{calendar.month_name[month]} {year}"
+        file_name = f"shift_schedule_{month}_{year}.xlsx"
+        mime = XLSX_MIME
+        build = build_grid_export
+        args = (year, month, members, ids, get_shared_months(), get_schedule_store())
+    else:
+        fmt = f'zip-{months}'
+        label = f"{months} months from {calendar.month_name[month]} {year}"
+        file_name = f"shift_schedule_{year}-{month:02d}_{months}_months.zip"
+        mime = ZIP_MIME
+        entries = []
+        for offset in range(months):
+            y, m = add_months(year, month, offset)
+            entries.append((f"shift_schedule_{y}-{m:02d}.xlsx", f"Schedule {m}-{y}", y, m, get_days_in_month(y, m)))
+        build = build_archive_export
+        args = (entries, members, ids, get_shared_months(), get_schedule_store())
     
-    legend_row = 2
-    for shift_type, info in SHIFT_TYPES.items():
-        if shift_type > 0:  # Skip "Off"
-            legend_ws.cell(row=legend_row, column=1, value=info['code'])
-            legend_ws.cell(row=legend_row, column=2, value=info['name'])
-            legend_ws.cell(row=legend_row, column=3, value=info['time'])
-            legend_row += 1
+    key = (get_data_version().value, year, month, fmt)
+    queue = get_export_queue()
+    cache = get_export_cache()
+    job = queue.get(key)
+    if job is None or job.status == FAILED:
+        cached = cache.get(key)
+        if cached is not None:
+            job = queue.add_finished(key, label, file_name, mime, cached)
+        else:
+            job = queue.submit(
+                key, label, file_name, mime, run_cached_export, get_data_version(), cache, key, build, *args
+            )
     
-    # Auto-adjust column widths
-    for worksheet in wb.worksheets:
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
+    if key in st.session_state.export_jobs:
+        st.session_state.export_jobs.remove(key)
+    st.session_state.export_jobs.insert(0, key)
+    del st.session_state.export_jobs[MAX_TRACKED_EXPORTS:]
+    return job
+
+def render_export_jobs():
+    """Show progress and download buttons for this session's exports"""
+    queue = get_export_queue()
+    jobs = [job for job in (queue.get(key) for key in st.session_state.export_jobs) if job is not None]
+    polling = any(not job.finished for job in jobs)
     
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+    @st.fragment(run_every=1 if polling else None)
+    def export_status():
+        for idx, job in enumerate(jobs):
+            if job.status == DONE:
+                st.download_button(
+                    label=f"⬇️ {job.label}",
+                    data=job.result,
+                    file_name=job.file_name,
+                    mime=job.mime,
+                    key=f"export_download_{idx}",
+                    use_container_width=True
+                )
+            elif job.status == FAILED:
+                st.error(f"Error exporting {job.label}: {job.error}")
+            else:
+                st.progress(job.progress, text=f"{job.label}: {job.message}")
+        if polling and all(job.finished for job in jobs):
+            st.rerun()
+    
+    export_status()
+
+def get_roster(teams=None):
+    """Flat (ids, names, teams, member records) lists for the given teams, in display order"""
+    ids = st.session_state.member_index.ids(teams)
+    return (ids, *describe_members(ids))
+
+def describe_members(ids):
+    """(names, teams, member records) lists aligned with ``ids``"""
+    member_index = st.session_state.member_index
+    records = [member_index.records[member_id] for member_id in ids]
+    member_teams = [member_index.member_teams[member_id] for member_id in ids]
+    return [record['name'] for record in records], member_teams, records
+
+def select_days(year, month, start_day, end_day, weekdays):
+    """0-based days between ``start_day`` and ``end_day`` (1-based, inclusive) that fall on ``weekdays`` (Mon=0)"""
+    first_weekday = calendar.monthrange(year, month)[0]
+    days = np.arange(start_day - 1, end_day)
+    return days[np.isin((first_weekday + days) % 7, weekdays)]
+
+def load_schedule_block(ids, start, end):
+    """``len(ids) x days`` shifts for ``start``..``end`` inclusive, across month boundaries
+
+    Months are read through the shared month cache, so neighbouring months
+    are replayed from disk once rather than on every check. Anchored patterns
+    not yet saved into a month are laid over the block in memory only.
+    """
+    blocks = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        shift_schedule = get_shared_months().get(year, month)[0]
+        first = start.day - 1 if (year, month) == (start.year, start.month) else 0
+        last = end.day if (year, month) == (end.year, end.month) else shift_schedule.days
+        block = shift_schedule.rows(ids)[:, first:last]
+        unlaid = set(unlaid_anchors(shift_schedule, ids))
+        if unlaid:
+            rows = [row for row, member_id in enumerate(ids) if member_id in unlaid]
+            block[rows] = materialize(
+                st.session_state.pattern_anchors, [ids[row] for row in rows],
+                date(year, month, first + 1), date(year, month, last)
+            )[0]
+        blocks.append(block)
+        year, month = add_months(year, month, 1)
+    if not blocks:
+        return np.zeros((len(ids), 0), dtype=np.uint8)
+    return np.concatenate(blocks, axis=1)
+
+def check_schedule_rules(member_ids, year, month):
+    """Working-time rule violations for ``member_ids`` within one month
+
+    A margin of days either side is loaded too, so streaks and weeks that
+    cross into the neighbouring months are judged on their full length.
+    Returns violations from ``check_roster`` with ``member`` and ``date`` added.
+    """
+    limits = get_rule_limits()
+    days = get_days_in_month(year, month)
+    margin = max(int(limits['max_consecutive_days']), 7)
+    first = date(year, month, 1) - timedelta(days=margin)
+    block = load_schedule_block(member_ids, first, date(year, month, days) + timedelta(days=margin))
+    violations = check_roster(block, first, SHIFT_TIMES, limits, days=(margin, margin + days))
+    for violation in violations:
+        violation['member'] = member_ids[violation['row']]
+        violation['date'] = first + timedelta(days=violation['day'])
+    return violations
+
+def describe_violation(violation):
+    """One-line explanation of a rule violation"""
+    when = violation['date'].strftime('%a %d %b')
+    if violation['rule'] == 'rest':
+        return f"only {violation['value']:g}h rest before the shift on {when}"
+    if violation['rule'] == 'consecutive':
+        return f"{violation['value']:g} working days in a row, over the limit from {when}"
+    return f"{violation['value']:g} night shifts that week, over the limit from {when}"
+
+def render_rule_warnings():
+    """Show the rule violations found after the last change to the active month"""
+    warnings = st.session_state.get('rule_warnings')
+    if not warnings or not warnings['violations']:
+        return
+    if warnings['month'] != partition_key(st.session_state.current_year, st.session_state.current_month):
+        return
+    violations = warnings['violations']
+    member_index = st.session_state.member_index
+    st.warning(f"⚠️ The last change breaks {len(violations)} working-time rule{'s' if len(violations) != 1 else ''}")
+    with st.expander("Show rule warnings", expanded=len(violations) <= 5):
+        for violation in violations[:RULE_WARNING_ROWS]:
+            if violation['member'] in member_index:
+                st.markdown(
+                    f"- **{member_index.label(violation['member'])}** · "
+                    f"{RULE_LABELS[violation['rule']]}: {describe_violation(violation)}"
+                )
+        if len(violations) > RULE_WARNING_ROWS:
+            st.caption(f"…and {len(violations) - RULE_WARNING_ROWS} more. See Team Summary for the full report.")
+
+def analyze_month_staffing(teams=None):
+    """Gap analysis of the active month against the staffing requirements
+
+    Returns ``(teams, scheduled, needed, short, over)`` with the arrays shaped
+    ``teams x days x shift types`` (see ``staffing.analyze_gaps``).
+    """
+    member_index = st.session_state.member_index
+    teams = member_index.teams if teams is None else list(teams)
+    team_slot = {team: slot for slot, team in enumerate(teams)}
+    ids = member_index.ids(set(teams))
+    shift_schedule = st.session_state.shift_schedule
+    required = requirement_array(st.session_state.staffing, teams, SHIFT_CODE_TYPES, NUM_SHIFT_TYPES)
+    kinds = day_kinds(st.session_state.current_year, st.session_state.current_month,
+                      st.session_state.staffing['holidays'])
+    gaps = analyze_gaps(
+        shift_schedule.rows(ids), [team_slot[member_index.team_of(member_id)] for member_id in ids],
+        kinds[:shift_schedule.days], required
+    )
+    return (teams, *gaps)
+
+def staffing_gap_table(teams, scheduled, needed, short, over):
+    """One row per team, day and shift that is under or over its requirement"""
+    team_idx, days, types = np.nonzero(short + over)
+    return pd.DataFrame({
+        'Day': days + 1,
+        'Team': [teams[t] for t in team_idx],
+        'Shift': SHIFT_CODES[types],
+        'Required': needed[team_idx, days, types],
+        'Scheduled': scheduled[team_idx, days, types],
+        'Gap': scheduled[team_idx, days, types] - needed[team_idx, days, types]
+    })
+
+def gap_css(value):
+    """Styler cell function: red when short, amber when over, green when exactly met"""
+    if pd.isna(value):
+        return ''
+    if value < 0:
+        return "background-color: #FECACA; color: #991B1B; font-weight: bold"
+    if value > 0:
+        return "background-color: #FEF3C7; color: #92400E"
+    return "background-color: #D1FAE5; color: #065F46"
+
+def heat_css(maximum):
+    """Styler cell function shading a value from white up to ``maximum``"""
+    def css(value):
+        alpha = value / maximum if maximum else 0
+        return f"background-color: rgba(37, 99, 235, {alpha:.2f}); color: {'#FFFFFF' if alpha > 0.5 else '#000000'}"
+    return css
 
 def get_day_of_week(year, month, day):
     """Get day of week name"""
@@ -491,45 +1175,78 @@ with st.sidebar:
     if selected_month != st.session_state.current_month or selected_year != st.session_state.current_year:
         st.session_state.current_month = selected_month
         st.session_state.current_year = selected_year
-        st.session_state.settings['current_month'] = selected_month
-        st.session_state.settings['current_year'] = selected_year
-        save_settings(st.session_state.settings)
+        # Start from the latest settings so another session's month choice is not a conflict
+        load_document('settings')
+        save_settings({
+            **st.session_state.settings,
+            'current_month': selected_month,
+            'current_year': selected_year
+        }, base=st.session_state.settings)
+        select_schedule_month(selected_year, selected_month)
     
     selected_month_name = calendar.month_name[selected_month]
     
+    # Undo/redo this session's changes
+    next_undo = st.session_state.undo_history.next_undo()
+    next_redo = st.session_state.undo_history.next_redo()
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("↩️ Undo", key="undo_button", use_container_width=True, disabled=next_undo is None,
+                     help=f"Undo: {next_undo['label']}" if next_undo else "Nothing to undo"):
+            st.session_state.undo_message = undo_last_change()
+            st.session_state.grid_edit_generation += 1
+            st.rerun()
+    with col2:
+        if st.button("↪️ Redo", key="redo_button", use_container_width=True, disabled=next_redo is None,
+                     help=f"Redo: {next_redo['label']}" if next_redo else "Nothing to redo"):
+            st.session_state.undo_message = redo_last_change()
+            st.session_state.grid_edit_generation += 1
+            st.rerun()
+    if 'undo_message' in st.session_state:
+        success, message = st.session_state.pop('undo_message')
+        if success:
+            st.success(f"✅ {message}")
+        else:
+            st.error(f"❌ {message}")
+    
     st.divider()
     
     # View selector
     view_type = st.radio(
         "📊 View Mode",
         ["📖 User Guide", "👥 Team Setup", "📅 Calendar View", "📊 Grid View", 
-         "⚡ Bulk Assign", "🔄 Shift Patterns", "📋 Card View", "📈 Team Summary"],
+         "⚡ Bulk Assign", "🔄 Shift Patterns", "🤖 Auto Roster", "📋 Card View", "📈 Team Summary"],
         label_visibility="visible"
     )
     
     st.divider()
     
     # Export button
+    export_months = st.selectbox(
+        "Export Period",
+        [1, 2, 3, 6, 12],
+        format_func=lambda n: "This month" if n == 1 else f"{n} months from this one (ZIP)"
+    )
+    export_per_team = st.checkbox("One workbook per team")
     if st.button("📥 Export to Excel", use_container_width=True):
         try:
-            excel_data = export_to_excel()
-            st.download_button(
-                label="⬇️ Download Excel File",
-                data=excel_data,
-                file_name=f"shift_schedule_{selected_month}_{selected_year}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True
-            )
+            submit_export(export_months, export_per_team)
+        except QueueFull as e:
+            st.warning(f"⚠️ {e}")
         except Exception as e:
             st.error(f"Error exporting: {e}")
+    render_export_jobs()
     
     # Stats
     st.divider()
-    total_members = sum(len(members) for members in st.session_state.team_members.values())
+    member_index = st.session_state.member_index
+    total_members = len(member_index)
     st.metric("👥 Total Members", total_members)
-    st.metric("🏢 Teams", len(st.session_state.team_members))
+    st.metric("🏢 Teams", len(member_index.teams))
 
 # Main content area
+render_rule_warnings()
+
 if view_type == "📖 User Guide":
     st.title("📖 Advanced Shift Scheduler - User Guide")
     
@@ -694,7 +1411,7 @@ if view_type == "📖 User Guide":
         
         ### 📊 Grid View
         - See entire month schedule in table format
-        - Edit individual shifts quickly
+        - Edit many shifts in place and save them together
         - Filter by team
         - Export-ready format
         
@@ -749,10 +1466,10 @@ if view_type == "📖 User Guide":
         
         ### Scenario 5: Someone Calls in Sick
         **Use: Grid View**
-        1. Go to "Grid View"
+        1. Go to "Grid View" and turn on "Edit grid"
         2. Find member and day
-        3. Change shift to "SL - Sick Leave"
-        4. Assign replacement if needed
+        3. Change shift to "SL"
+        4. Assign replacement if needed, then save both changes together
         """)
     
     # Tips & Best Practices
@@ -769,7 +1486,7 @@ if view_type == "📖 User Guide":
         - 🚀 Use **Bulk Assignment** for regular weekday schedules
         - 🚀 Create **Shift Patterns** for repeating rotations
         - 🚀 Use **Calendar View** for visual overview
-        - 🚀 Use **Grid View** for quick individual edits
+        - 🚀 Use **Grid View** to edit many shifts and save them in one go
         - 🚀 Filter by team in Grid View to focus on specific groups
         
         ### Data Safety:
@@ -808,7 +1525,7 @@ if view_type == "📖 User Guide":
 elif view_type == "👥 Team Setup":
     st.header("👥 Team Management")
     
-    tab1, tab2 = st.tabs(["Add Members", "Remove Members"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Add Members", "Edit Members", "Remove Members", "Staffing Requirements"])
     
     with tab1:
         st.subheader("➕ Add New Team Member")
@@ -843,32 +1560,68 @@ elif view_type == "👥 Team Setup":
         
         # Display current teams
         st.subheader("Current Teams")
-        for team_name, members in st.session_state.team_members.items():
+        for team_name in member_index.teams:
+            members = member_index.members(team_name)
             with st.expander(f"**{team_name}** ({len(members)} members)"):
                 if members:
-                    df = pd.DataFrame(members)
+                    df = pd.DataFrame(members, columns=['name', 'location', 'whmcs'])
                     st.dataframe(df, use_container_width=True, hide_index=True)
                 else:
                     st.info("No members in this team")
     
     with tab2:
+        st.subheader("✏️ Rename or Move a Member")
+        
+        if total_members:
+            member_to_edit = st.selectbox(
+                "Select member to edit",
+                member_index.ids(),
+                format_func=member_index.label,
+                key="edit_member"
+            )
+            edit_cols = st.columns(2)
+            with edit_cols[0]:
+                edited_name = st.text_input(
+                    "Member Name", value=member_index.name_of(member_to_edit), key=f"edit_name_{member_to_edit}"
+                )
+            with edit_cols[1]:
+                edited_team = st.text_input(
+                    "Team Name", value=member_index.team_of(member_to_edit), key=f"edit_team_{member_to_edit}"
+                )
+            st.caption("Schedules follow the member, so renaming or moving someone keeps all their shifts.")
+            if st.button("Save Changes", type="primary"):
+                if edited_name and edited_team:
+                    success, message = update_team_member(member_to_edit, edited_name, edited_team)
+                    if success:
+                        st.success(f"✅ {message}")
+                        st.rerun()
+                    else:
+                        st.error(f"❌ {message}")
+                else:
+                    st.warning("⚠️ Please fill in all fields")
+        else:
+            st.info("No teams created yet")
+    
+    with tab3:
         st.subheader("➖ Remove Team Member")
         
-        if st.session_state.team_members:
-            for team_name, members in st.session_state.team_members.items():
+        if member_index.teams:
+            for team_name in member_index.teams:
+                members = member_index.members(team_name)
                 if members:
                     with st.expander(f"**{team_name}**"):
                         remove_cols = st.columns([3, 1])
                         with remove_cols[0]:
                             member_to_remove = st.selectbox(
                                 "Select member to remove",
-                                [m['name'] for m in members],
+                                [m['id'] for m in members],
+                                format_func=member_index.name_of,
                                 key=f"remove_select_{team_name}"
                             )
                         with remove_cols[1]:
                             st.write("")
                             if st.button("Remove", key=f"remove_btn_{team_name}", type="secondary"):
-                                success, message = remove_team_member(team_name, member_to_remove)
+                                success, message = remove_team_member(member_to_remove)
                                 if success:
                                     st.success(message)
                                     st.rerun()
@@ -876,6 +1629,53 @@ elif view_type == "👥 Team Setup":
                                     st.error(message)
         else:
             st.info("No teams created yet")
+    
+    with tab4:
+        st.subheader("📋 Minimum Staffing per Shift")
+        
+        if member_index.teams:
+            # Edited as a copy; the shared requirements are replaced on save
+            staffing = copy.deepcopy(st.session_state.staffing)
+            staffing_team = st.selectbox("Team", member_index.teams, key="staffing_team")
+            st.caption("Minimum number of people this team needs on each shift. Leave 0 for no requirement.")
+            
+            team_requirements = staffing['teams'].get(staffing_team, {})
+            requirement_df = pd.DataFrame(
+                [[team_requirements.get(code, {}).get(kind, 0) for kind in DAY_KINDS] for code in STAFFED_SHIFT_CODES],
+                index=STAFFED_SHIFT_CODES, columns=DAY_KINDS
+            )
+            edited_requirements = st.data_editor(
+                requirement_df,
+                column_config={kind: st.column_config.NumberColumn(kind, min_value=0, step=1) for kind in DAY_KINDS},
+                use_container_width=True,
+                key=f"staffing_editor_{staffing_team}"
+            )
+            
+            holidays_text = st.text_area(
+                "Public holidays (one YYYY-MM-DD date per line)",
+                value="\n".join(staffing['holidays']),
+                help="Holidays use the Holiday column instead of their weekday, for every team"
+            )
+            
+            if st.button("💾 Save Requirements", type="primary"):
+                try:
+                    holidays = sorted({date.fromisoformat(line.strip()).isoformat()
+                                       for line in holidays_text.splitlines() if line.strip()})
+                except ValueError as e:
+                    st.error(f"❌ Invalid holiday date: {e}")
+                else:
+                    values = edited_requirements.fillna(0).astype(int)
+                    staffing['teams'][staffing_team] = {
+                        code: {kind: int(n) for kind, n in row.items() if n > 0}
+                        for code, row in values.iterrows() if (row > 0).any()
+                    }
+                    if not staffing['teams'][staffing_team]:
+                        del staffing['teams'][staffing_team]
+                    staffing['holidays'] = holidays
+                    if save_staffing_requirements(staffing):
+                        st.success(f"✅ Saved staffing requirements for {staffing_team}")
+        else:
+            st.info("No teams created yet")
 
 elif view_type == "📅 Calendar View":
     st.header(f"📅 Calendar - {selected_month_name} {selected_year}")
@@ -899,6 +1699,9 @@ elif view_type == "📅 Calendar View":
                 st.markdown(f"**{day_name}**")
         
         # Calendar days
+        scheduled_per_day = st.session_state.shift_schedule.scheduled_per_day()
+        staffing_gaps = analyze_month_staffing()
+        short_per_day = staffing_gaps[3].sum(axis=(0, 2))
         current_day = 1
         week_row = 0
         
@@ -914,19 +1717,22 @@ elif view_type == "📅 Calendar View":
                         bg_color = "#FEE2E2" if is_weekend_day else "#F3F4F6"
                         
                         # Show day number and scheduled count
-                        scheduled_today = 0
-                        for member_name, schedule in st.session_state.shift_schedule.items():
-                            if current_day - 1 < len(schedule) and schedule[current_day - 1] > 0:
-                                scheduled_today += 1
+                        scheduled_today = int(scheduled_per_day[current_day - 1])
+                        short_today = int(short_per_day[current_day - 1])
+                        border = "2px solid #DC2626" if short_today else "1px solid #ddd"
+                        gap_note = (
+                            f"<br><span style='font-size: 12px; color: #B91C1C; font-weight: bold;'>⚠️ {short_today} short</span>"
+                            if short_today else ""
+                        )
                         
                         st.markdown(f"""
                         <div style='background-color: {bg_color}; padding: 10px; border-radius: 5px; 
-                                    min-height: 60px; border: 1px solid #ddd;'>
+                                    min-height: 60px; border: {border};'>
                             <strong style='font-size: 18px;'>{current_day}</strong>
                             <br>
                             <span style='font-size: 12px; color: #666;'>
                                 {scheduled_today} scheduled
-                            </span>
+                            </span>{gap_note}
                         </div>
                         """, unsafe_allow_html=True)
                         
@@ -934,6 +1740,21 @@ elif view_type == "📅 Calendar View":
             
             week_row += 1
         
+        if staffing_gaps[2].any():
+            gap_table = staffing_gap_table(*staffing_gaps)
+            short_rows = int((gap_table['Gap'] < 0).sum())
+            with st.expander(
+                f"🚨 Staffing Gaps ({short_rows} short, {len(gap_table) - short_rows} over)",
+                expanded=short_rows > 0
+            ):
+                if len(gap_table):
+                    st.dataframe(
+                        gap_table.sort_values(['Gap', 'Day']).style.map(gap_css, subset=['Gap']),
+                        use_container_width=True, hide_index=True
+                    )
+                else:
+                    st.success("✅ Every staffing requirement is met this month")
+        
         st.divider()
         
         # Day detail editor
@@ -945,12 +1766,10 @@ elif view_type == "📅 Calendar View":
             selected_day = st.number_input("Select Day", min_value=1, max_value=days, value=1)
         
         with col2:
-            all_members = []
-            for team_name, members in st.session_state.team_members.items():
-                all_members.extend([m['name'] for m in members])
+            all_members = member_index.ids()
             
             if all_members:
-                selected_member = st.selectbox("Select Member", all_members)
+                selected_member = st.selectbox("Select Member", all_members, format_func=member_index.label)
             else:
                 st.warning("No members available")
                 selected_member = None
@@ -964,36 +1783,82 @@ elif view_type == "📅 Calendar View":
             st.write("")
             st.write("")
             if selected_member and st.button("Update Shift", use_container_width=True, type="primary"):
-                update_shift(selected_member, selected_day - 1, selected_shift_type)
-                shift_info = get_shift_info(selected_shift_type)
-                st.success(f"✅ Updated {selected_member} on Day {selected_day} to {shift_info['name']}")
-                st.rerun()
+                if update_shift(selected_member, selected_day - 1, selected_shift_type):
+                    shift_info = get_shift_info(selected_shift_type)
+                    st.success(
+                        f"✅ Updated {member_index.name_of(selected_member)} on Day {selected_day} to {shift_info['name']}"
+                    )
+                    st.rerun()
         
         # Show who's scheduled for selected day
         if all_members:
             st.divider()
             st.subheader(f"Who's Working on Day {selected_day}?")
             
+            ids, names, member_teams, _ = get_roster()
+            day_column = st.session_state.shift_schedule.rows(ids)[:, selected_day - 1]
             day_schedule = []
-            for team_name, members in st.session_state.team_members.items():
-                for member in members:
-                    schedule = st.session_state.shift_schedule.get(member['name'], [])
-                    if selected_day - 1 < len(schedule):
-                        shift_type = schedule[selected_day - 1]
-                        if shift_type > 0:
-                            shift_info = get_shift_info(shift_type)
-                            day_schedule.append({
-                                'Member': member['name'],
-                                'Team': team_name,
-                                'Shift': f"{shift_info['code']} - {shift_info['name']}",
-                                'Time': shift_info['time']
-                            })
+            for idx in np.flatnonzero(day_column):
+                shift_info = get_shift_info(int(day_column[idx]))
+                day_schedule.append({
+                    'Member': names[idx],
+                    'Team': member_teams[idx],
+                    'Shift': f"{shift_info['code']} - {shift_info['name']}",
+                    'Time': shift_info['time']
+                })
             
             if day_schedule:
                 df = pd.DataFrame(day_schedule)
                 st.dataframe(df, use_container_width=True, hide_index=True)
             else:
                 st.info("No one scheduled for this day yet")
+            
+            # Cover for someone who can't work their shift
+            st.subheader(f"🔁 Find Cover for Day {selected_day}")
+            working_ids = [ids[idx] for idx in np.flatnonzero(SHIFT_TIMES.minutes[day_column] > 0)]
+            if working_ids:
+                col1, col2 = st.columns(2)
+                with col1:
+                    absent_id = st.selectbox("Who can't work?", working_ids, format_func=member_index.label,
+                                             key="cover_absent")
+                with col2:
+                    absence_types = [13, 12, 0]
+                    absence_type = st.selectbox("Mark them as", absence_types,
+                                                format_func=lambda t: SHIFT_TYPES[t]['name'], key="cover_absence")
+                cover_shift = st.session_state.shift_schedule.get(absent_id, selected_day - 1)
+                candidates = find_cover(absent_id, selected_day - 1, cover_shift)[:COVER_CANDIDATE_ROWS]
+                st.caption(
+                    f"{SHIFT_TYPES[cover_shift]['name']} ({SHIFT_TYPES[cover_shift]['time']}) · "
+                    f"teammates in {member_index.team_of(absent_id)} who are off that day, best first"
+                )
+                if candidates:
+                    st.dataframe(pd.DataFrame({
+                        'Member': [member_index.name_of(c['member']) for c in candidates],
+                        'Rules': ["✅ OK" if not c['breaches'] else f"⚠️ {c['breaches']} breach{'es' if c['breaches'] > 1 else ''}"
+                                  for c in candidates],
+                        'Hours This Month': [c['hours'] for c in candidates],
+                        'Rest Before (h)': [c['rest_before'] for c in candidates],
+                        'Rest After (h)': [c['rest_after'] for c in candidates]
+                    }), use_container_width=True, hide_index=True)
+                    col1, col2 = st.columns([2, 1])
+                    with col1:
+                        cover_id = st.selectbox("Cover", [c['member'] for c in candidates],
+                                                format_func=member_index.name_of, key="cover_member")
+                    with col2:
+                        st.write("")
+                        st.write("")
+                        if st.button("🔁 Assign Cover", type="primary", use_container_width=True):
+                            if assign_cover(absent_id, cover_id, selected_day - 1, cover_shift, absence_type):
+                                st.success(
+                                    f"✅ {member_index.name_of(cover_id)} now covers {SHIFT_TYPES[cover_shift]['code']} "
+                                    f"on Day {selected_day}; {member_index.name_of(absent_id)} marked "
+                                    f"{SHIFT_TYPES[absence_type]['name']}"
+                                )
+                                st.rerun()
+                else:
+                    st.info("No one in the team is off that day")
+            else:
+                st.info("No one is working a timed shift on this day")
 
 elif view_type == "📊 Grid View":
     st.header(f"📊 Grid Schedule - {selected_month_name} {selected_year}")
@@ -1007,92 +1872,120 @@ elif view_type == "📊 Grid View":
         with col1:
             st.metric("Total Members", total_members)
         with col2:
-            st.metric("Total Teams", len(st.session_state.team_members))
+            st.metric("Total Teams", len(member_index.teams))
         with col3:
             days = get_days_in_month(selected_year, st.session_state.current_month)
             st.metric("Days in Month", days)
         with col4:
-            scheduled_count = sum(
-                sum(1 for shift in schedule if shift > 0)
-                for schedule in st.session_state.shift_schedule.values()
-            )
+            scheduled_count = st.session_state.shift_schedule.scheduled_total()
             st.metric("Scheduled Shifts", scheduled_count)
         
         st.divider()
         
-        # Team filter
-        team_filter = st.multiselect(
-            "Filter by Team",
-            list(st.session_state.team_members.keys()),
-            default=list(st.session_state.team_members.keys())
-        )
+        # Team filter and member search
+        filter_col, search_col = st.columns([2, 1])
+        with filter_col:
+            team_filter = st.multiselect(
+                "Filter by Team",
+                member_index.teams,
+                default=member_index.teams
+            )
+        with search_col:
+            member_search = st.text_input("Search Members", placeholder="Name contains...")
         
         # Create schedule grid
         days = get_days_in_month(selected_year, st.session_state.current_month)
         
-        # Build dataframe for display
-        schedule_data = []
-        for team in team_filter:
-            if team in st.session_state.team_members:
-                for member in st.session_state.team_members[team]:
-                    row = {'Member': member['name'], 'Team': team, 'Location': member['location']}
-                    schedule = st.session_state.shift_schedule.get(member['name'], [0] * days)
-                    for day in range(1, days + 1):
-                        shift_type = schedule[day - 1] if day - 1 < len(schedule) else 0
-                        shift_info = get_shift_info(shift_type)
-                        row[f'Day {day}'] = shift_info['code']
-                    schedule_data.append(row)
+        matching_ids = member_index.ids(set(team_filter))
+        if member_search:
+            matching_names = pd.Series([member_index.name_of(member_id) for member_id in matching_ids], dtype=object)
+            found = matching_names.str.contains(member_search.strip(), case=False, regex=False).to_numpy()
+            matching_ids = [member_id for member_id, hit in zip(matching_ids, found) if hit]
+        
+        # Only one page of rows is built, styled and sent to the browser
+        page_col1, page_col2, page_col3 = st.columns([1, 1, 2])
+        with page_col1:
+            page_size = st.selectbox("Rows per Page", GRID_PAGE_SIZES, index=1)
+        page_count = max(1, -(-len(matching_ids) // page_size))
+        with page_col2:
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1)
+        first_row = (page - 1) * page_size
+        ids = matching_ids[first_row:first_row + page_size]
+        with page_col3:
+            st.write("")
+            st.write("")
+            if ids:
+                st.caption(f"Showing {first_row + 1}-{first_row + len(ids)} of {len(matching_ids)} members · page {page} of {page_count}")
         
-        if schedule_data:
-            df = pd.DataFrame(schedule_data)
-            
-            # Style the dataframe
-            def color_cells(val):
-                for shift_type, info in SHIFT_TYPES.items():
-                    if val == info['code']:
-                        return f"background-color: {info['color']}; color: {info['text_color']}; font-weight: bold"
-                return ''
+        # Staffing requirements for the filtered teams, one row per team and shift
+        gap_teams, gap_scheduled, gap_needed, _, _ = analyze_month_staffing(
+            [team for team in member_index.teams if team in team_filter]
+        )
+        team_idx, gap_types = np.nonzero(gap_needed.any(axis=1))
+        if len(team_idx):
+            gap_diff = (gap_scheduled - gap_needed)[team_idx, :, gap_types][:, :days]
+            gap_df = pd.DataFrame(
+                np.where(gap_needed[team_idx, :, gap_types][:, :days] > 0, gap_diff, np.nan),
+                index=[f"{gap_teams[t]} · {SHIFT_CODES[c]}" for t, c in zip(team_idx, gap_types)],
+                columns=[f'Day {day}' for day in range(1, days + 1)]
+            ).astype('Int64')
+            st.markdown("**🚨 Staffing vs. requirements** (scheduled minus required)")
+            st.dataframe(gap_df.style.map(gap_css).format("{:+d}", na_rep=""), use_container_width=True)
+        
+        # Build dataframe for display
+        names, member_teams, records = describe_members(ids)
+        
+        if ids:
+            codes = SHIFT_CODES[st.session_state.shift_schedule.rows(ids)[:, :days]]
+            day_columns = [f'Day {day}' for day in range(1, days + 1)]
+            df = pd.DataFrame(codes, columns=day_columns)
+            df.insert(0, 'Member', names)
+            df.insert(1, 'Team', member_teams)
+            df.insert(2, 'Location', [m['location'] for m in records])
             
-            styled_df = df.style.applymap(
-                color_cells,
-                subset=[col for col in df.columns if col.startswith('Day')]
+            edit_mode = st.toggle(
+                "✏️ Edit grid",
+                help="Change any number of shifts in place, then save them all at once"
             )
-            st.dataframe(styled_df, use_container_width=True, height=600)
-            
-            # Quick shift editor
-            st.divider()
-            st.subheader("✏️ Quick Edit")
-            
-            edit_col1, edit_col2, edit_col3, edit_col4 = st.columns(4)
             
-            with edit_col1:
-                all_members = []
-                for team in team_filter:
-                    if team in st.session_state.team_members:
-                        all_members.extend([m['name'] for m in st.session_state.team_members[team]])
+            if edit_mode:
+                # Off cells are blank; clearing a cell sets it back to Off
+                editor_df = df.replace({col: {'': None} for col in day_columns})
+                edited_df = st.data_editor(
+                    editor_df,
+                    column_config={
+                        col: st.column_config.SelectboxColumn(col, options=EDITABLE_SHIFT_CODES)
+                        for col in day_columns
+                    },
+                    disabled=['Member', 'Team', 'Location'],
+                    num_rows="fixed",
+                    hide_index=True,
+                    use_container_width=True,
+                    height=600,
+                    key=f"grid_editor_{selected_year}_{selected_month}_{page}_{st.session_state.grid_edit_generation}"
+                )
+                cells, invalid = diff_grid_edits(ids, codes, edited_df[day_columns].to_numpy())
                 
-                if all_members:
-                    selected_member = st.selectbox("Select Member", all_members)
-                else:
-                    st.warning("No members in selected teams")
-                    selected_member = None
-            
-            with edit_col2:
-                selected_day = st.number_input("Day", min_value=1, max_value=days, value=1)
-            
-            with edit_col3:
-                shift_options = {info['name']: shift_type for shift_type, info in SHIFT_TYPES.items()}
-                selected_shift_name = st.selectbox("Shift Type", list(shift_options.keys()))
-                selected_shift_type = shift_options[selected_shift_name]
-            
-            with edit_col4:
-                st.write("")
-                st.write("")
-                if selected_member and st.button("Update Shift", use_container_width=True, type="primary"):
-                    update_shift(selected_member, selected_day - 1, selected_shift_type)
-                    shift_info = get_shift_info(selected_shift_type)
-                    st.success(f"✅ Updated {selected_member}'s shift for day {selected_day}")
-                    st.rerun()
+                if invalid:
+                    st.error(f"❌ Unknown shift codes: {', '.join(invalid)}. Nothing will be saved until they are fixed.")
+                st.caption(f"{len(cells)} unsaved change{'s' if len(cells) != 1 else ''} · clear a cell to set it Off")
+                
+                save_col, discard_col = st.columns(2)
+                with save_col:
+                    if st.button("💾 Save Changes", type="primary", use_container_width=True,
+                                 disabled=not cells or bool(invalid)):
+                        if commit_grid_edits(cells):
+                            st.session_state.grid_edit_generation += 1
+                            st.rerun()
+                with discard_col:
+                    if st.button("↩️ Discard Changes", use_container_width=True, disabled=not cells):
+                        st.session_state.grid_edit_generation += 1
+                        st.rerun()
+            else:
+                styled_df = df.style.map(SHIFT_CODE_CSS.get, subset=day_columns)
+                st.dataframe(styled_df, use_container_width=True, height=600)
+        elif member_search:
+            st.info(f"No members match '{member_search}' in the selected teams.")
         else:
             st.info("No team members selected. Please select teams from the filter above.")
         
@@ -1122,21 +2015,28 @@ elif view_type == "⚡ Bulk Assign":
     else:
         st.markdown("""
         <div class='info-box'>
-            <strong>💡 Tip:</strong> Use bulk assignment to quickly schedule multiple consecutive days 
-            for a team member. Perfect for weekly schedules or extended assignments.
+            <strong>💡 Tip:</strong> Assign a shift to several members, whole teams or everyone at a location
+            in one go. Untick weekdays to skip them, e.g. leave out Sat and Sun for a Mon-Fri roster.
         </div>
         """, unsafe_allow_html=True)
         
         col1, col2 = st.columns(2)
         
         with col1:
-            # Member selection
-            all_members = []
-            for team_name, members in st.session_state.team_members.items():
-                all_members.extend([f"{m['name']} ({team_name})" for m in members])
-            
-            selected_member_display = st.selectbox("Select Member", all_members)
-            selected_member = selected_member_display.split(' (')[0]  # Extract name
+            # Target selection
+            target_mode = st.radio("Assign To", ["Members", "Teams", "Locations"], horizontal=True)
+            if target_mode == "Members":
+                target_ids = st.multiselect("Select Members", member_index.ids(), format_func=member_index.label)
+            elif target_mode == "Teams":
+                target_teams = st.multiselect("Select Teams", member_index.teams)
+                target_ids = member_index.ids(set(target_teams))
+            else:
+                locations = sorted({record['location'] for record in member_index.records.values()})
+                target_locations = set(st.multiselect("Select Locations", locations))
+                target_ids = [
+                    member_id for member_id in member_index.ids()
+                    if member_index.records[member_id]['location'] in target_locations
+                ]
             
             # Date range
             days = get_days_in_month(selected_year, st.session_state.current_month)
@@ -1147,7 +2047,17 @@ elif view_type == "⚡ Bulk Assign":
             with date_col2:
                 end_day = st.number_input("End Day", min_value=start_day, max_value=days, value=min(start_day + 4, days))
             
-            st.info(f"📅 Will assign days {start_day} through {end_day} ({end_day - start_day + 1} days)")
+            selected_weekdays = st.multiselect("Weekdays", WEEKDAY_NAMES, default=WEEKDAY_NAMES)
+            target_days = select_days(
+                selected_year, selected_month, start_day, end_day,
+                [WEEKDAY_NAMES.index(name) for name in selected_weekdays]
+            )
+            
+            st.info(
+                f"📅 Will assign {len(target_days)} day{'s' if len(target_days) != 1 else ''} "
+                f"between day {start_day} and day {end_day} to {len(target_ids)} "
+                f"member{'s' if len(target_ids) != 1 else ''}"
+            )
         
         with col2:
             # Shift selection
@@ -1166,29 +2076,49 @@ elif view_type == "⚡ Bulk Assign":
         
         st.divider()
         
-        # Preview
+        # Preview of the affected block: members x selected days, current -> new
         st.subheader("📋 Preview")
-        preview_data = []
-        for day in range(start_day, end_day + 1):
-            day_of_week = get_day_of_week(selected_year, selected_month, day)
-            preview_data.append({
-                'Day': day,
-                'Day of Week': day_of_week,
-                'Shift Code': shift_info['code'],
-                'Shift Name': shift_info['name'],
-                'Time': shift_info['time']
-            })
-        
-        preview_df = pd.DataFrame(preview_data)
-        st.dataframe(preview_df, use_container_width=True, hide_index=True)
+        if target_ids and len(target_days):
+            current = st.session_state.shift_schedule.rows(target_ids)[:, target_days]
+            unchanged = current == selected_shift_type
+            st.caption(
+                f"{current.size} cells selected · {int(current.size - unchanged.sum())} will change · "
+                f"{int(unchanged.sum())} already {shift_info['code'] or 'Off'}"
+            )
+            
+            preview_ids = target_ids[:BULK_PREVIEW_ROWS]
+            new_label = SHIFT_LABELS[selected_shift_type]
+            block = np.where(
+                unchanged[:len(preview_ids)],
+                new_label,
+                SHIFT_LABELS[current[:len(preview_ids)]] + f" → {new_label}"
+            )
+            preview_df = pd.DataFrame(
+                block,
+                index=[member_index.label(member_id) for member_id in preview_ids],
+                columns=[f"{get_day_of_week(selected_year, selected_month, day + 1)} {day + 1}" for day in target_days]
+            )
+            change_css = np.where(unchanged[:len(preview_ids)], '', SHIFT_CODE_CSS[shift_info['code']])
+            st.dataframe(
+                preview_df.style.apply(lambda _: change_css, axis=None),
+                use_container_width=True
+            )
+            if len(target_ids) > BULK_PREVIEW_ROWS:
+                st.caption(f"Showing the first {BULK_PREVIEW_ROWS} of {len(target_ids)} members")
+        else:
+            st.info("Select at least one member and one day to see the affected block.")
         
         # Apply button
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
-            if st.button("✅ Apply Bulk Assignment", use_container_width=True, type="primary"):
-                success = bulk_update_shifts(selected_member, start_day - 1, end_day - 1, selected_shift_type)
+            if st.button("✅ Apply Bulk Assignment", use_container_width=True, type="primary",
+                         disabled=not target_ids or not len(target_days)):
+                success = bulk_assign_shifts(target_ids, target_days, selected_shift_type)
                 if success:
-                    st.success(f"✅ Successfully assigned {shift_info['name']} to {selected_member} for days {start_day}-{end_day}")
+                    st.success(
+                        f"✅ Successfully assigned {shift_info['name']} to {len(target_ids)} members "
+                        f"on {len(target_days)} days"
+                    )
                     st.balloons()
                     st.rerun()
                 else:
@@ -1208,7 +2138,7 @@ elif view_type == "🔄 Shift Patterns":
         </div>
         """, unsafe_allow_html=True)
         
-        tab1, tab2 = st.tabs(["Create Pattern", "Apply Pattern"])
+        tab1, tab2, tab3 = st.tabs(["Create Pattern", "Apply Pattern", "Team Rotation"])
         
         with tab1:
             st.subheader("➕ Create New Pattern")
@@ -1252,11 +2182,14 @@ elif view_type == "🔄 Shift Patterns":
                 with col1:
                     if st.button("💾 Save Pattern", use_container_width=True, type="primary"):
                         if pattern_name:
-                            st.session_state.shift_patterns[pattern_name] = st.session_state.temp_pattern.copy()
-                            save_shift_patterns(st.session_state.shift_patterns)
-                            st.success(f"✅ Pattern '{pattern_name}' saved!")
-                            st.session_state.temp_pattern = []
-                            st.rerun()
+                            # On a failed save the pattern is kept so it can be saved again
+                            if save_shift_patterns({
+                                **st.session_state.shift_patterns,
+                                pattern_name: st.session_state.temp_pattern.copy()
+                            }):
+                                st.success(f"✅ Pattern '{pattern_name}' saved!")
+                                st.session_state.temp_pattern = []
+                                st.rerun()
                         else:
                             st.error("Please enter a pattern name")
                 
@@ -1275,12 +2208,9 @@ elif view_type == "🔄 Shift Patterns":
                 
                 with col1:
                     # Member selection
-                    all_members = []
-                    for team_name, members in st.session_state.team_members.items():
-                        all_members.extend([f"{m['name']} ({team_name})" for m in members])
-                    
-                    selected_member_display = st.selectbox("Select Member", all_members, key="apply_member")
-                    selected_member = selected_member_display.split(' (')[0]
+                    selected_member = st.selectbox(
+                        "Select Member", member_index.ids(), format_func=member_index.label, key="apply_member"
+                    )
                     
                     # Pattern selection
                     pattern_name = st.selectbox("Select Pattern", list(st.session_state.shift_patterns.keys()))
@@ -1288,6 +2218,10 @@ elif view_type == "🔄 Shift Patterns":
                     # Start day
                     days = get_days_in_month(selected_year, st.session_state.current_month)
                     start_day = st.number_input("Start from Day", min_value=1, max_value=days, value=1, key="pattern_start")
+                    continue_pattern = st.checkbox(
+                        "Continue into following months", value=True, key="pattern_continue",
+                        help="Anchor the pattern to this date so later months pick it up without drifting"
+                    )
                 
                 with col2:
                     # Preview pattern
@@ -1318,9 +2252,18 @@ elif view_type == "🔄 Shift Patterns":
                 col1, col2, col3 = st.columns([1, 2, 1])
                 with col2:
                     if st.button("✅ Apply Pattern", use_container_width=True, type="primary"):
-                        success = apply_shift_pattern(selected_member, selected_pattern, start_day - 1)
+                        success = apply_shift_pattern(
+                            selected_member, selected_pattern, start_day - 1,
+                            anchors=pattern_anchor_updates(
+                                [selected_member], pattern_name, selected_pattern,
+                                [date(selected_year, selected_month, start_day) if continue_pattern else None]
+                            )
+                        )
                         if success:
-                            st.success(f"✅ Applied pattern '{pattern_name}' to {selected_member} starting from day {start_day}")
+                            st.success(
+                                f"✅ Applied pattern '{pattern_name}' to {member_index.name_of(selected_member)} "
+                                f"starting from day {start_day}"
+                            )
                             st.balloons()
                             st.rerun()
                         else:
@@ -1346,29 +2289,245 @@ elif view_type == "🔄 Shift Patterns":
                         st.dataframe(df, use_container_width=True, hide_index=True)
                         
                         if st.button(f"🗑️ Delete '{pname}'", key=f"del_{pname}"):
-                            del st.session_state.shift_patterns[pname]
-                            save_shift_patterns(st.session_state.shift_patterns)
-                            st.success(f"Deleted pattern '{pname}'")
-                            st.rerun()
+                            if save_shift_patterns({
+                                name: pattern for name, pattern in st.session_state.shift_patterns.items()
+                                if name != pname
+                            }):
+                                st.success(f"Deleted pattern '{pname}'")
+                                st.rerun()
+            else:
+                st.info("No saved patterns yet. Create one in the 'Create Pattern' tab!")
+            
+            # Date-anchored patterns
+            anchored_ids = [member_id for member_id in st.session_state.pattern_anchors if member_id in member_index]
+            if anchored_ids:
+                st.divider()
+                st.subheader("📆 Patterns Continuing Across Months")
+                st.caption(
+                    "These members follow a pattern anchored to a start date. Months you open are filled in "
+                    "automatically for anyone without shifts there yet; use the button below to lay the "
+                    "patterns over upcoming months now (this replaces those members' shifts in them)."
+                )
+                month_start = date(selected_year, selected_month, 1)
+                anchor_rows = []
+                for member_id in anchored_ids:
+                    entry = st.session_state.pattern_anchors[member_id]
+                    first_shift = shift_on(entry, month_start)
+                    anchor_rows.append({
+                        'Member': member_index.label(member_id),
+                        'Pattern': entry['name'],
+                        'Anchored On': anchor_date(entry).strftime('%d %b %Y'),
+                        f'Shift on {month_start:%d %b}': '-' if first_shift is None else SHIFT_LABELS[first_shift]
+                    })
+                st.dataframe(pd.DataFrame(anchor_rows), use_container_width=True, hide_index=True)
+                
+                fill_col1, fill_col2 = st.columns([1, 2])
+                with fill_col1:
+                    months_ahead = st.number_input("Months Ahead", min_value=1, max_value=12, value=3)
+                with fill_col2:
+                    st.write("")
+                    st.write("")
+                    if st.button(f"📆 Fill Next {months_ahead} Months", use_container_width=True):
+                        filled = fill_anchored_months(months_ahead)
+                        st.success(f"✅ Continued anchored patterns through {filled} upcoming month{'s' if filled != 1 else ''}")
+        
+        with tab3:
+            st.subheader("👥 Apply Rotation to Team")
+            st.caption(
+                "Every member works the same pattern, each starting at a different point in the cycle, "
+                "chosen so the number of people working each day stays as even as possible."
+            )
+            
+            if st.session_state.shift_patterns:
+                col1, col2 = st.columns(2)
+                with col1:
+                    rotation_team = st.selectbox("Select Team", member_index.teams, key="rotation_team")
+                    rotation_pattern_name = st.selectbox(
+                        "Select Pattern", list(st.session_state.shift_patterns.keys()), key="rotation_pattern"
+                    )
+                with col2:
+                    days = get_days_in_month(selected_year, st.session_state.current_month)
+                    rotation_start = st.number_input(
+                        "Start from Day", min_value=1, max_value=days, value=1, key="rotation_start"
+                    )
+                    continue_rotation = st.checkbox(
+                        "Continue into following months", value=True, key="rotation_continue"
+                    )
+                
+                rotation_ids = member_index.ids({rotation_team})
+                rotation_pattern = st.session_state.shift_patterns[rotation_pattern_name]
+                
+                if rotation_ids and rotation_pattern:
+                    # The whole team's month as one tiled block
+                    span = days - rotation_start + 1
+                    offsets = stagger_offsets(rotation_pattern, len(rotation_ids), span)
+                    block = rotation_block(rotation_pattern, offsets, span)
+                    current = st.session_state.shift_schedule.rows(rotation_ids)
+                    proposed = current.copy()
+                    proposed[:, rotation_start - 1:] = block
+                    
+                    st.markdown("**Coverage Preview** (team members working each day)")
+                    before = (current != 0).sum(axis=0)
+                    after = (proposed != 0).sum(axis=0)
+                    coverage_df = pd.DataFrame(
+                        {'Current': before, 'With rotation': after},
+                        index=pd.Index(range(1, days + 1), name='Day')
+                    )
+                    st.line_chart(coverage_df)
+                    
+                    rotated = after[rotation_start - 1:]
+                    metric_cols = st.columns(3)
+                    with metric_cols[0]:
+                        st.metric("Fewest Working", int(rotated.min()))
+                    with metric_cols[1]:
+                        st.metric("Most Working", int(rotated.max()))
+                    with metric_cols[2]:
+                        st.metric("Average Working", f"{rotated.mean():.1f}")
+                    
+                    with st.expander("Member offsets and schedule"):
+                        preview_df = pd.DataFrame(
+                            SHIFT_CODES[proposed],
+                            columns=[f'Day {day}' for day in range(1, days + 1)]
+                        )
+                        preview_df.insert(0, 'Member', [member_index.name_of(member_id) for member_id in rotation_ids])
+                        preview_df.insert(1, 'Offset', offsets)
+                        st.dataframe(
+                            preview_df.style.map(SHIFT_CODE_CSS.get, subset=preview_df.columns[2:]),
+                            use_container_width=True,
+                            hide_index=True
+                        )
+                    
+                    col1, col2, col3 = st.columns([1, 2, 1])
+                    with col2:
+                        if st.button("✅ Apply Rotation", use_container_width=True, type="primary"):
+                            start_date = date(selected_year, selected_month, rotation_start)
+                            success = apply_team_rotation(
+                                rotation_ids, rotation_pattern, offsets, rotation_start - 1,
+                                anchors=pattern_anchor_updates(
+                                    rotation_ids, rotation_pattern_name, rotation_pattern,
+                                    [start_date - timedelta(days=int(offset)) if continue_rotation else None
+                                     for offset in offsets]
+                                )
+                            )
+                            if success:
+                                st.success(
+                                    f"✅ Applied '{rotation_pattern_name}' to {len(rotation_ids)} members of "
+                                    f"{rotation_team} from day {rotation_start}"
+                                )
+                                st.rerun()
+                            else:
+                                st.error("❌ Failed to apply rotation")
+                else:
+                    st.info("This team has no members yet.")
             else:
                 st.info("No saved patterns yet. Create one in the 'Create Pattern' tab!")
 
+elif view_type == "🤖 Auto Roster":
+    st.header(f"🤖 Auto Roster - {selected_month_name} {selected_year}")
+    
+    staffed_teams = [team for team in member_index.teams if team in st.session_state.staffing['teams']]
+    if total_members == 0:
+        st.warning("No team members added yet. Go to 'Team Setup' to add members.")
+    elif not staffed_teams:
+        st.warning("No staffing requirements set yet. Add them under Team Setup → Staffing Requirements.")
+    else:
+        st.markdown("""
+        <div class='info-box'>
+            <strong>💡 How it works</strong><br>
+            Fills the month so every team meets its staffing requirements while keeping to the
+            working-time rules and sharing shifts evenly. Leave, sick days and training are never changed.
+            You get a draft to review first; nothing is saved until you write it to the schedule.
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            roster_teams = st.multiselect("Teams", staffed_teams, default=staffed_teams,
+                                          help="Only teams with staffing requirements can be rostered")
+        with col2:
+            time_budget = st.slider("Time budget (seconds)", 1, 60, 10,
+                                    help="Longer searches resolve more conflicts on large rosters")
+        keep_existing = st.checkbox("Keep shifts already in the schedule",
+                                    help="Only fill empty days instead of rebuilding the month")
+        
+        if st.button("🤖 Generate Draft", type="primary", use_container_width=True, disabled=not roster_teams):
+            with st.spinner(f"Searching for up to {time_budget} seconds..."):
+                st.session_state.roster_draft = draft_auto_roster(roster_teams, time_budget, keep_existing)
+        
+        # Outcome of a draft written on the previous run
+        if 'roster_written' in st.session_state:
+            written, skipped = st.session_state.pop('roster_written')
+            st.success(f"✅ Saved {written} shift changes")
+            if skipped:
+                st.warning(f"⚠️ {skipped} cells were edited after the draft was made and kept their newer value")
+        
+        roster_draft = st.session_state.get('roster_draft')
+        if roster_draft and roster_draft['month'] == partition_key(selected_year, selected_month):
+            summary = roster_draft['summary']
+            changed = roster_draft['draft'] != roster_draft['original']
+            st.divider()
+            st.subheader("👀 Draft Preview")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Short shifts", summary['short'], delta=summary['short'] - summary['short_before'],
+                          delta_color="inverse")
+            with col2:
+                st.metric("Overstaffed shifts", summary['over'])
+            with col3:
+                st.metric("Rule breaches", summary['excess'])
+            with col4:
+                st.metric("Cells changed", int(changed.sum()))
+            st.caption(f"{summary['moves']:,} moves tried in {summary['seconds']:.1f}s")
+            
+            preview_rows = min(len(roster_draft['ids']), BULK_PREVIEW_ROWS)
+            preview_ids = roster_draft['ids'][:preview_rows]
+            labels = SHIFT_LABELS[roster_draft['draft'][:preview_rows]]
+            days = roster_draft['draft'].shape[1]
+            preview_df = pd.DataFrame(
+                labels,
+                index=[member_index.label(member_id) if member_id in member_index else member_id
+                       for member_id in preview_ids],
+                columns=[f"{get_day_of_week(selected_year, selected_month, day + 1)} {day + 1}" for day in range(days)]
+            )
+            # Changed cells in their shift colour, unchanged ones plain
+            change_css = np.where(
+                changed[:preview_rows], SHIFT_CODE_CSS_BY_TYPE[roster_draft['draft'][:preview_rows]], ''
+            )
+            st.dataframe(preview_df.style.apply(lambda _: change_css, axis=None), use_container_width=True)
+            if len(roster_draft['ids']) > preview_rows:
+                st.caption(f"Showing the first {preview_rows} of {len(roster_draft['ids'])} members")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("✅ Write Draft to Schedule", type="primary", use_container_width=True,
+                             disabled=not changed.any()):
+                    result = write_auto_roster(roster_draft)
+                    if result is not None:
+                        del st.session_state.roster_draft
+                        st.session_state.roster_written = result
+                        st.rerun()
+            with col2:
+                if st.button("🗑️ Discard Draft", use_container_width=True):
+                    del st.session_state.roster_draft
+                    st.rerun()
+
 elif view_type == "📋 Card View":
     st.header(f"📋 Team Overview - {selected_month_name} {selected_year}")
     
     if total_members == 0:
         st.warning("No team members added yet. Go to 'Team Setup' to add members.")
     else:
-        for team_name, members in st.session_state.team_members.items():
+        for team_name in member_index.teams:
+            members = member_index.members(team_name)
             st.subheader(f"👥 {team_name}")
             
             member_cols = st.columns(3)
+            scheduled_counts = st.session_state.shift_schedule.scheduled_for([m['id'] for m in members])
             
             for idx, member in enumerate(members):
                 with member_cols[idx % 3]:
                     # Count scheduled shifts
-                    schedule = st.session_state.shift_schedule.get(member['name'], [])
-                    scheduled_count = sum(1 for shift in schedule if shift > 0)
+                    scheduled_count = int(scheduled_counts[idx])
                     
                     st.markdown(f"""
                     <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
@@ -1396,16 +2555,13 @@ elif view_type == "📈 Team Summary":
         # Overall stats
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Total Teams", len(st.session_state.team_members))
+            st.metric("Total Teams", len(member_index.teams))
         with col2:
             st.metric("Total Members", total_members)
         with col3:
             st.metric("Active Month", f"{selected_month_name} {selected_year}")
         with col4:
-            scheduled_count = sum(
-                sum(1 for shift in schedule if shift > 0)
-                for schedule in st.session_state.shift_schedule.values()
-            )
+            scheduled_count = st.session_state.shift_schedule.scheduled_total()
             st.metric("Total Scheduled Shifts", scheduled_count)
         
         st.divider()
@@ -1413,16 +2569,11 @@ elif view_type == "📈 Team Summary":
         # Shift type breakdown
         st.subheader("📊 Shift Type Distribution")
         
+        type_counts = st.session_state.shift_schedule.counts_by_type()
         shift_counts = {}
         for shift_type, info in SHIFT_TYPES.items():
             if shift_type > 0:
-                shift_counts[info['name']] = 0
-        
-        for schedule in st.session_state.shift_schedule.values():
-            for shift in schedule:
-                if shift > 0:
-                    info = get_shift_info(shift)
-                    shift_counts[info['name']] = shift_counts.get(info['name'], 0) + 1
+                shift_counts[info['name']] = int(type_counts[shift_type])
         
         if any(count > 0 for count in shift_counts.values()):
             chart_data = pd.DataFrame({
@@ -1435,23 +2586,126 @@ elif view_type == "📈 Team Summary":
         
         st.divider()
         
+        # Hours from parsed shift times
+        st.subheader("⏱️ Hours Worked")
+        st.caption("Overnight shifts count towards the day they start. Leave and training count as 0 hours.")
+        
+        year, month = st.session_state.current_year, st.session_state.current_month
+        hour_ids, hour_names, hour_teams, _ = get_roster()
+        week_starts, weekly_hours = SHIFT_TIMES.hours_per_week(
+            st.session_state.shift_schedule.rows(hour_ids), date(year, month, 1)
+        )
+        hours_df = pd.DataFrame(weekly_hours, columns=[f"Wk {d.strftime('%d %b')}" for d in week_starts])
+        hours_df.insert(0, 'Month', weekly_hours.sum(axis=1))
+        hours_df.insert(0, 'Team', hour_teams)
+        hours_df.insert(0, 'Member', hour_names)
+        st.dataframe(
+            hours_df.style.format("{:g}", subset=hours_df.columns[2:]),
+            use_container_width=True, hide_index=True
+        )
+        
+        st.subheader("🕐 Hour-of-Day Coverage")
+        col1, col2 = st.columns(2)
+        with col1:
+            month_days = get_days_in_month(year, month)
+            coverage_range = st.date_input(
+                "Date range",
+                value=(date(year, month, 1), date(year, month, month_days)),
+                key="coverage_range"
+            )
+        with col2:
+            coverage_team = st.selectbox("Team", ["All Teams"] + member_index.teams, key="coverage_team")
+        
+        if len(coverage_range) == 2:
+            range_start, range_end = coverage_range
+            if (range_end - range_start).days > 92:
+                range_end = range_start + timedelta(days=92)
+                st.caption(f"Showing the first 93 days, up to {range_end.strftime('%d %b %Y')}")
+            coverage_ids = member_index.ids(None if coverage_team == "All Teams" else [coverage_team])
+            # One leading day so overnight shifts spill into the first day of the range
+            block = load_schedule_block(coverage_ids, range_start - timedelta(days=1), range_end)
+            coverage = SHIFT_TIMES.hour_coverage(block)[1:]
+            coverage_df = pd.DataFrame(
+                coverage,
+                index=[(range_start + timedelta(days=d)).strftime('%a %d %b') for d in range(len(coverage))],
+                columns=[f"{hour:02d}" for hour in range(24)]
+            )
+            st.dataframe(
+                coverage_df.style.map(heat_css(float(coverage.max(initial=0)))).format("{:g}"),
+                use_container_width=True
+            )
+            st.caption("People on shift in each hour (SAST); partly worked hours count fractionally.")
+        
+        st.divider()
+        
+        # Working-time rules over the whole roster
+        st.subheader("🛑 Working-Time Rules")
+        limits = get_rule_limits()
+        with st.expander("Rule limits"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                min_rest = st.number_input("Minimum rest between shifts (hours)", 0, 24, int(limits['min_rest_hours']))
+            with col2:
+                max_consecutive = st.number_input("Maximum working days in a row", 1, 31, int(limits['max_consecutive_days']))
+            with col3:
+                max_nights = st.number_input("Maximum night shifts per week", 0, 7, int(limits['max_nights_per_week']))
+            if st.button("💾 Save Rule Limits"):
+                rules = {
+                    'min_rest_hours': int(min_rest),
+                    'max_consecutive_days': int(max_consecutive),
+                    'max_nights_per_week': int(max_nights)
+                }
+                if save_settings({**st.session_state.settings, 'rules': rules}):
+                    st.session_state.pop('rule_warnings', None)
+                    st.success("✅ Rule limits saved")
+        
+        rule_ids = member_index.ids()
+        violations = check_schedule_rules(rule_ids, year, month)
+        col1, col2, col3 = st.columns(3)
+        for col, rule in zip((col1, col2, col3), RULE_LABELS):
+            with col:
+                st.metric(RULE_LABELS[rule], sum(1 for v in violations if v['rule'] == rule))
+        if violations:
+            st.dataframe(
+                pd.DataFrame({
+                    'Member': [member_index.name_of(v['member']) for v in violations],
+                    'Team': [member_index.team_of(v['member']) for v in violations],
+                    'Date': [v['date'] for v in violations],
+                    'Rule': [RULE_LABELS[v['rule']] for v in violations],
+                    'Detail': [describe_violation(v) for v in violations]
+                }),
+                use_container_width=True, hide_index=True
+            )
+        else:
+            st.success(f"✅ No rule violations in {selected_month_name} {selected_year}")
+        
+        st.divider()
+        
         # Team breakdown
         st.subheader("👥 Team Breakdown")
         
-        for team, members in st.session_state.team_members.items():
+        for team in member_index.teams:
+            members = member_index.members(team)
             with st.expander(f"**{team}** ({len(members)} members)", expanded=True):
                 if len(members) > 0:
                     # Member details
-                    team_df = pd.DataFrame(members)
+                    team_df = pd.DataFrame(members, columns=['name', 'location', 'whmcs'])
                     st.dataframe(team_df, use_container_width=True, hide_index=True)
                     
                     # Shift statistics for this team
                     st.markdown("**Shift Statistics:**")
-                    team_shifts = {}
-                    for member in members:
-                        schedule = st.session_state.shift_schedule.get(member['name'], [])
-                        total_shifts = sum(1 for shift in schedule if shift > 0)
-                        team_shifts[member['name']] = total_shifts
+                    team_counts = st.session_state.shift_schedule.group_type_counts(team)
+                    st.caption(
+                        f"{int(team_counts[1:].sum())} scheduled shifts · "
+                        + " · ".join(
+                            f"{SHIFT_TYPES[t]['code']}: {int(team_counts[t])}"
+                            for t in SHIFT_TYPES if t > 0 and team_counts[t] > 0
+                        )
+                    )
+                    team_shifts = dict(zip(
+                        [m['name'] for m in members],
+                        st.session_state.shift_schedule.scheduled_for([m['id'] for m in members]).tolist()
+                    ))
                     
                     if team_shifts:
                         shift_df = pd.DataFrame(
@@ -1471,3 +2725,5 @@ st.markdown(f"""
     <p>📊 Features: Bulk Assignment • Shift Patterns • Calendar View • Excel Export</p>
 </div>
 """, unsafe_allow_html=True)
+
+remember_rendered_versions()
@@ -0,0 +1,71 @@
+"""Process-wide caching of generated export files.
+
+Every save bumps a ``VersionCounter``; exports are cached under a key that
+includes that version, so a cached workbook is served until real data
+changes and is rebuilt only after an edit.
+"""
+import threading
+from collections import OrderedDict
+
+
+class VersionCounter:
+    """Monotonically increasing data version shared by all sessions"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self):
+        return self._value
+
+    def bump(self):
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class ArtifactCache:
+    """Thread-safe LRU of generated file bytes, bounded by total size"""
+
+    def __init__(self, max_bytes=64 * 2**20):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        """Cache ``data`` under ``key``, evicting least recently used entries to fit"""
+        if len(data) > self.max_bytes:
+            return data
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+        return data
+
+    def get_or_build(self, key, build):
+        """Return cached bytes for ``key``, calling ``build()`` on a miss"""
+        data = self.get(key)
+        if data is None:
+            data = self.put(key, build())
+        return data
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,278 @@
+"""Automatic month roster: greedy construction followed by local search.
+
+``generate_roster`` fills a month for every team that has staffing
+requirements (see ``staffing``). Fixed cells (leave, sick days, training,
+or every existing shift if asked to keep them) never change; all other
+cells are rebuilt.
+
+1. Construction walks the month day by day and, for each team and required
+   shift, puts the members with the fewest days so far on it, avoiding short
+   rests and over-long streaks where it can.
+2. Local search then runs simulated annealing for the remaining time
+   budget. A move either sets one cell (often a targeted move onto a short
+   shift) or swaps two teammates' shifts on one day. The cost weighs:
+   - shortfall against requirements
+   - rule excess from ``roster_rules.penalty_scores``
+   - overstaffing
+   - uneven workload within a team
+
+Coverage, workload and rule scores are updated incrementally, so each move is
+scored in microseconds and a 500 x 31 month gets hundreds of thousands of
+moves in a few seconds. The best roster seen is returned with a summary.
+"""
+import math
+import time
+
+import numpy as np
+
+from roster_rules import DEFAULT_RULES, penalty_scores
+from staffing import analyze_gaps
+
+
+SHORT_WEIGHT = 100
+RULE_WEIGHT = 40
+OVER_WEIGHT = 3
+FAIRNESS_WEIGHT = 1
+
+
+def _cell_cost(needed, scheduled):
+    if scheduled < needed:
+        return SHORT_WEIGHT * (needed - scheduled)
+    return OVER_WEIGHT * (scheduled - needed)
+
+
+class _Search:
+    """Mutable roster state with incrementally maintained cost terms"""
+
+    def __init__(self, block, fixed, row_teams, kinds, required, shift_times, first_day, rules, lead, seed):
+        self.shifts = np.array(block, dtype=np.uint8)
+        self.lead = lead
+        self.first_day = first_day
+        self.shift_times = shift_times
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.rng = np.random.default_rng(seed)
+        self.row_teams = np.asarray(row_teams, dtype=np.int64)
+        self.kinds = np.asarray(kinds)
+        self.required = required
+        self.works = shift_times.minutes > 0
+        # Off, leave and other untimed types are never required or overstaffed
+        self.needed = required[:, self.kinds, :] * self.works
+
+        num_teams = required.shape[0]
+        self.team_types = [np.flatnonzero(required[t].any(axis=0)) for t in range(num_teams)]
+        self.movable = ~np.asarray(fixed, dtype=bool)
+        self.movable[:, :lead] = False
+        staffed = np.array([len(self.team_types[t]) > 0 if t >= 0 else False for t in self.row_teams], dtype=bool)
+        self.movable[~staffed] = False
+        self.team_rows = [np.flatnonzero(self.row_teams == t) for t in range(num_teams)]
+        # Start from a clean slate wherever the roster may change
+        self.shifts[self.movable] = 0
+
+        # Each member's share of the team's required person-days, by availability
+        month = self.shifts[:, lead:]
+        available = (self.movable[:, lead:] | self.works[month]).sum(axis=1).astype(float)
+        self.target = np.zeros(len(self.shifts))
+        for t, rows in enumerate(self.team_rows):
+            if len(rows) and available[rows].sum():
+                self.target[rows] = self.needed[t].sum() * available[rows] / available[rows].sum()
+        self.refresh()
+
+    def refresh(self):
+        """Recompute every cost term from the current shifts"""
+        month = self.shifts[:, self.lead:]
+        self.scheduled = analyze_gaps(month, self.row_teams, self.kinds, self.required)[0].astype(np.int64) * self.works
+        self.worked = self.works[month].sum(axis=1).astype(np.int64)
+        self.penalty = penalty_scores(self.shifts, self.first_day, self.shift_times, self.rules).astype(np.int64)
+
+    def cost(self):
+        gap = self.needed - self.scheduled
+        coverage = SHORT_WEIGHT * np.maximum(gap, 0).sum() + OVER_WEIGHT * np.maximum(-gap, 0).sum()
+        staffed = self.movable.any(axis=1)
+        fairness = FAIRNESS_WEIGHT * ((self.worked - self.target)[staffed] ** 2).sum()
+        return float(coverage + RULE_WEIGHT * self.penalty.sum() + fairness)
+
+    # Construction ------------------------------------------------------------
+
+    def construct(self):
+        """Greedy day-by-day fill of every required shift"""
+        lead = self.lead
+        start = self.shift_times.start
+        minutes = self.shift_times.minutes
+        min_rest = self.rules['min_rest_hours'] * 60
+        run = np.zeros(len(self.shifts), dtype=np.int64)
+        for col in range(lead):
+            run = np.where(self.works[self.shifts[:, col]], run + 1, 0)
+        worked = np.zeros(len(self.shifts), dtype=np.int64)
+        for day in range(self.needed.shape[1]):
+            col = lead + day
+            previous = self.shifts[:, col - 1] if col else np.zeros(len(self.shifts), dtype=np.uint8)
+            for t, rows in enumerate(self.team_rows):
+                types = self.team_types[t]
+                if not len(rows) or not len(types):
+                    continue
+                for shift_type in types[np.argsort(-self.needed[t, day, types], kind='stable')]:
+                    need = self.needed[t, day, shift_type] - np.count_nonzero(self.shifts[rows, col] == shift_type)
+                    if need <= 0:
+                        continue
+                    free = rows[self.movable[rows, col] & (self.shifts[rows, col] == 0)]
+                    if not len(free):
+                        continue
+                    gap = 24 * 60 + start[shift_type] - (start[previous[free]] + minutes[previous[free]])
+                    clash = self.works[previous[free]] & (gap < min_rest)
+                    streak = run[free] >= self.rules['max_consecutive_days']
+                    score = (clash | streak) * 10 ** 6 + (worked[free] - self.target[free])
+                    chosen = free[np.argsort(score, kind='stable')[:need]]
+                    self.shifts[chosen, col] = shift_type
+                    worked[chosen] += 1
+            run = np.where(self.works[self.shifts[:, col]], run + 1, 0)
+        self.refresh()
+
+    # Local search ------------------------------------------------------------
+
+    def _row_penalty(self, row):
+        return int(penalty_scores(row[None, :], self.first_day, self.shift_times, self.rules)[0])
+
+    def _fairness_delta(self, member, change):
+        if not change:
+            return 0.0
+        before = self.worked[member] - self.target[member]
+        return FAIRNESS_WEIGHT * ((before + change) ** 2 - before ** 2)
+
+    def try_set(self, member, col, new, temperature):
+        """Propose ``shifts[member, col] = new``; apply it if accepted"""
+        old = int(self.shifts[member, col])
+        if old == new:
+            return False
+        team, day = self.row_teams[member], col - self.lead
+        delta = 0.0
+        if old:
+            needed, count = self.needed[team, day, old], self.scheduled[team, day, old]
+            delta += _cell_cost(needed, count - 1) - _cell_cost(needed, count)
+        if new:
+            needed, count = self.needed[team, day, new], self.scheduled[team, day, new]
+            delta += _cell_cost(needed, count + 1) - _cell_cost(needed, count)
+        change = int(self.works[new]) - int(self.works[old])
+        delta += self._fairness_delta(member, change)
+        row = self.shifts[member].copy()
+        row[col] = new
+        penalty = self._row_penalty(row)
+        delta += RULE_WEIGHT * (penalty - self.penalty[member])
+        if not self._accept(delta, temperature):
+            return False
+        self.shifts[member, col] = new
+        if old:
+            self.scheduled[team, day, old] -= 1
+        if new:
+            self.scheduled[team, day, new] += 1
+        self.worked[member] += change
+        self.penalty[member] = penalty
+        return True
+
+    def try_swap(self, first, second, col, temperature):
+        """Propose exchanging two teammates' shifts on one day"""
+        a, b = int(self.shifts[first, col]), int(self.shifts[second, col])
+        if a == b:
+            return False
+        change = int(self.works[b]) - int(self.works[a])
+        delta = self._fairness_delta(first, change) + self._fairness_delta(second, -change)
+        first_row, second_row = self.shifts[first].copy(), self.shifts[second].copy()
+        first_row[col], second_row[col] = b, a
+        first_penalty, second_penalty = self._row_penalty(first_row), self._row_penalty(second_row)
+        delta += RULE_WEIGHT * (first_penalty + second_penalty - self.penalty[first] - self.penalty[second])
+        if not self._accept(delta, temperature):
+            return False
+        self.shifts[first, col], self.shifts[second, col] = b, a
+        self.worked[first] += change
+        self.worked[second] -= change
+        self.penalty[first], self.penalty[second] = first_penalty, second_penalty
+        return True
+
+    def _accept(self, delta, temperature):
+        if delta <= 0:
+            return True
+        return temperature > 0 and self.rng.random() < math.exp(-delta / temperature)
+
+    def anneal(self, deadline, start_temperature=10.0, end_temperature=0.5):
+        """Run moves until ``deadline`` (``time.perf_counter`` value); return the move count"""
+        movable_cells = np.argwhere(self.movable)
+        if not len(movable_cells):
+            return 0
+        started = time.perf_counter()
+        span = max(deadline - started, 1e-9)
+        best_cost, best_shifts = self.cost(), self.shifts.copy()
+        iterations = 0
+        while True:
+            if iterations % 256 == 0:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                progress = (now - started) / span
+                temperature = start_temperature * (end_temperature / start_temperature) ** progress
+                cost = self.cost()
+                if cost < best_cost:
+                    best_cost, best_shifts = cost, self.shifts.copy()
+                # Shifts off their requirement and members over the rules get targeted moves
+                off_target = np.argwhere(self.needed != self.scheduled)
+                breaking = np.flatnonzero(self.penalty > 0)
+            iterations += 1
+            move = self.rng.random()
+            if move < 0.35 and len(off_target):
+                # Put someone on a short shift, or take someone off an overstaffed one
+                team, day, shift_type = off_target[self.rng.integers(len(off_target))]
+                col = self.lead + day
+                short = self.needed[team, day, shift_type] > self.scheduled[team, day, shift_type]
+                rows = self.team_rows[team]
+                rows = rows[self.movable[rows, col] & ((self.shifts[rows, col] == shift_type) != short)]
+                if len(rows):
+                    member = rows[self.rng.integers(len(rows))]
+                    self.try_set(member, col, int(shift_type) if short else 0, temperature)
+                continue
+            if move < 0.7 and len(breaking):
+                member = breaking[self.rng.integers(len(breaking))]
+                cols = np.flatnonzero(self.movable[member])
+                if not len(cols):
+                    continue
+                col = cols[self.rng.integers(len(cols))]
+            else:
+                member, col = movable_cells[self.rng.integers(len(movable_cells))]
+            if self.rng.random() < 0.5:
+                rows = self.team_rows[self.row_teams[member]]
+                other = rows[self.rng.integers(len(rows))]
+                if other != member and self.movable[other, col]:
+                    self.try_swap(member, other, col, temperature)
+            else:
+                types = self.team_types[self.row_teams[member]]
+                choice = self.rng.integers(len(types) + 1)
+                self.try_set(member, col, int(types[choice - 1]) if choice else 0, temperature)
+        if self.cost() > best_cost:
+            self.shifts = best_shifts
+            self.refresh()
+        return iterations
+
+
+def generate_roster(block, fixed, row_teams, kinds, required, shift_times, first_day,
+                    rules=None, lead=0, time_budget=10.0, seed=0):
+    """Build a month roster within ``time_budget`` seconds
+
+    ``block`` is ``members x (lead + days)`` current shifts starting on
+    ``first_day``; the first ``lead`` columns are days before the month, used
+    only so rests and streaks carry across the boundary. ``fixed`` marks
+    cells that must keep their shift. ``row_teams``, ``kinds`` and
+    ``required`` are as for ``staffing.analyze_gaps``.
+
+    Returns ``(draft, summary)``: the ``members x days`` month and a dict with
+    the remaining ``short`` and ``over`` person-shifts, the rule ``excess``
+    (``penalty_scores`` total), ``moves`` tried and ``seconds`` taken.
+    """
+    started = time.perf_counter()
+    search = _Search(block, fixed, row_teams, kinds, required, shift_times, first_day, rules, lead, seed)
+    search.construct()
+    moves = search.anneal(started + time_budget)
+    gap = search.needed - search.scheduled
+    return search.shifts[:, lead:].copy(), {
+        'short': int(np.maximum(gap, 0).sum()),
+        'over': int(np.maximum(-gap, 0).sum()),
+        'excess': int(search.penalty.sum()),
+        'moves': moves,
+        'seconds': time.perf_counter() - started
+    }
@@ -0,0 +1,82 @@
+"""Benchmark: automatic roster generation for a large month.
+
+Run from the repository root::
+
+    python benchmarks/bench_auto_roster.py
+    python benchmarks/bench_auto_roster.py --members 500 --teams 25 --budgets 1 10 30
+
+Each team needs D1/L/N/EM cover every day at roughly 80% of its headcount,
+about 6% of cells are pre-booked leave, and the rules are tightened to five
+days in a row and two nights a week, so the local search has real conflicts
+to resolve. The whole run for each budget, construction included, has to fit
+within that budget.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from auto_roster import generate_roster  # noqa: E402
+from roster_rules import check_roster  # noqa: E402
+from shift_times import ShiftTimes  # noqa: E402
+from shift_types import SHIFT_TYPES  # noqa: E402
+from staffing import day_kinds, requirement_array  # noqa: E402
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri']
+RULES = {'min_rest_hours': 11, 'max_consecutive_days': 5, 'max_nights_per_week': 2}
+LEAVE = 12
+
+
+def make_problem(members, teams, year, month, rng):
+    team_size = members // teams
+    per_team = {
+        'D1': {**{kind: round(team_size * 0.3) for kind in WEEKDAYS}, 'Sat': round(team_size * 0.2), 'Sun': round(team_size * 0.2)},
+        'L': {kind: round(team_size * 0.15) for kind in WEEKDAYS},
+        'N': {kind: round(team_size * 0.15) for kind in WEEKDAYS + ['Sat', 'Sun']},
+        'EM': {kind: round(team_size * 0.15) for kind in WEEKDAYS}
+    }
+    names = [f"Team {t}" for t in range(teams)]
+    requirements = {'holidays': [], 'teams': {name: per_team for name in names}}
+    code_types = {info['code']: shift_type for shift_type, info in SHIFT_TYPES.items()}
+    required = requirement_array(requirements, names, code_types, max(SHIFT_TYPES) + 1)
+    kinds = day_kinds(year, month)
+    block = np.zeros((members, len(kinds)), dtype=np.uint8)
+    block[rng.random(block.shape) < 0.06] = LEAVE
+    return block, np.arange(members) % teams, kinds, required
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, default=500)
+    parser.add_argument('--teams', type=int, default=25)
+    parser.add_argument('--year', type=int, default=2026)
+    parser.add_argument('--month', type=int, default=10)
+    parser.add_argument('--budgets', type=float, nargs='+', default=[1, 10, 30, 55])
+    args = parser.parse_args()
+
+    shift_times = ShiftTimes.from_types(SHIFT_TYPES, max(SHIFT_TYPES) + 1)
+    block, row_teams, kinds, required = make_problem(
+        args.members, args.teams, args.year, args.month, np.random.default_rng(0)
+    )
+    first_day = date(args.year, args.month, 1)
+    print(f"{args.members} members x {len(kinds)} days in {args.teams} teams, "
+          f"{int(required[:, kinds].sum())} required person-shifts")
+    print(f"{'budget':>8} {'elapsed':>8} {'moves':>9} {'short':>6} {'over':>6} {'excess':>7} {'violations':>10}")
+    for budget in args.budgets:
+        start = time.perf_counter()
+        draft, summary = generate_roster(block, block == LEAVE, row_teams, kinds, required, shift_times,
+                                         first_day, RULES, time_budget=budget)
+        elapsed = time.perf_counter() - start
+        assert (draft[block == LEAVE] == LEAVE).all()
+        violations = len(check_roster(draft, first_day, shift_times, RULES))
+        print(f"{budget:>7g}s {elapsed:>7.2f}s {summary['moves']:>9} {summary['short']:>6} "
+              f"{summary['over']:>6} {summary['excess']:>7} {violations:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark: streaming Excel export vs. the original per-cell styled export.
+
+Run from the repository root::
+
+    python benchmarks/bench_excel_export.py
+    python benchmarks/bench_excel_export.py --members 1000 2000 5000 --skip-legacy
+
+Reports wall time and peak Python heap (tracemalloc) for each roster size.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from excel_export import write_schedule_workbook  # noqa: E402
+from shift_types import SHIFT_TYPES  # noqa: E402
+
+
+DAYS = 31
+
+
+def legacy_export(members, shifts):
+    """The export as it was before the streaming engine, for comparison"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Schedule"
+    header_fill = PatternFill(start_color="667EEA", end_color="667EEA", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                    top=Side(style='thin'), bottom=Side(style='thin'))
+    headers = ['Member', 'Team', 'Location', 'WHMCS'] + [f'Day {i}' for i in range(1, DAYS + 1)]
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+        cell.border = border
+    for row, (member, schedule) in enumerate(zip(members, shifts.tolist()), 2):
+        for col, value in enumerate(member, 1):
+            ws.cell(row=row, column=col, value=value).border = border
+        for day in range(DAYS):
+            info = SHIFT_TYPES.get(schedule[day], SHIFT_TYPES[0])
+            cell = ws.cell(row=row, column=day + 5, value=info['code'])
+            cell.fill = PatternFill(start_color=info['color'].replace('#', ''),
+                                    end_color=info['color'].replace('#', ''), fill_type="solid")
+            cell.font = Font(bold=True, color=info['text_color'].replace('#', ''))
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+            cell.border = border
+    for worksheet in wb.worksheets:
+        for column in worksheet.columns:
+            max_length = max(len(str(cell.value)) for cell in column)
+            worksheet.column_dimensions[get_column_letter(column[0].column)].width = min(max_length + 2, 50)
+    output = io.BytesIO()
+    wb.save(output)
+    return output
+
+
+def streaming_export(members, shifts):
+    output = io.BytesIO()
+    write_schedule_workbook(output, "Schedule", members, shifts, SHIFT_TYPES, DAYS)
+    return output
+
+
+def measure(func, members, shifts):
+    """Time one run, then repeat it under tracemalloc for the memory peak"""
+    start = time.perf_counter()
+    output = func(members, shifts)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(members, shifts)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(output.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, nargs='+', default=[250, 1000, 2000])
+    parser.add_argument('--skip-legacy', action='store_true', help="only time the streaming engine")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'members':>8} {'engine':>10} {'seconds':>9} {'peak MiB':>9} {'size KiB':>9}")
+    for count in args.members:
+        members = [(f"Member {i}", f"Team {i % 12}", "Cape Town", f"EMP{i:05d}") for i in range(count)]
+        shifts = rng.integers(0, max(SHIFT_TYPES) + 1, size=(count, DAYS), dtype=np.uint8)
+        engines = [('streaming', streaming_export)]
+        if not args.skip_legacy:
+            engines.insert(0, ('legacy', legacy_export))
+        for name, func in engines:
+            elapsed, peak, size = measure(func, members, shifts)
+            print(f"{count:>8} {name:>10} {elapsed:>9.2f} {peak / 2**20:>9.1f} {size / 2**10:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
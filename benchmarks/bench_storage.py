@@ -0,0 +1,85 @@
+"""Benchmark: JSON vs SQLite storage for single-cell updates and month loads.
+
+Run from the repository root::
+
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --members 2000 --updates 1000
+
+Each backend starts from the same month of rotating patterns in a fresh
+temporary directory. ``update`` is one ``cells`` record appended through the
+month's journal interface, as a grid edit saves it (durable on return).
+``load`` opens a new storage instance, as a freshly started server does, and
+loads the month after the updates.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from storage import open_storage  # noqa: E402
+
+YEAR, MONTH, DAYS = 2026, 10, 31
+
+
+def make_schedule(members, rng):
+    pattern = np.array([1, 1, 1, 1, 1, 0, 0, 5, 5, 5, 5, 0, 0, 0])
+    offsets = rng.integers(len(pattern), size=members)
+    rows = pattern[(np.arange(DAYS)[None, :] + offsets[:, None]) % len(pattern)]
+    return {f"member{i:05d}": row.tolist() for i, row in enumerate(rows)}
+
+
+def percentile(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+
+def run(backend, schedule, updates, loads, rng):
+    with tempfile.TemporaryDirectory() as root:
+        storage = open_storage(backend, root)
+        journal = storage.schedules.journal(YEAR, MONTH)
+        journal.write_snapshot(schedule)
+        members = list(schedule)
+
+        update_times = []
+        for _ in range(updates):
+            record = {'op': 'cells', 'cells': [[members[rng.integers(len(members))], int(rng.integers(DAYS)),
+                                                int(rng.integers(1, 6))]]}
+            start = time.perf_counter()
+            journal.append(record)
+            update_times.append(time.perf_counter() - start)
+        journal.compact(wait=True)
+
+        load_times = []
+        for _ in range(loads):
+            fresh = open_storage(backend, root)
+            start = time.perf_counter()
+            loaded, _, _ = fresh.schedules.journal(YEAR, MONTH).load_versioned()
+            load_times.append(time.perf_counter() - start)
+        assert len(loaded) == len(schedule)
+    return update_times, load_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, default=500)
+    parser.add_argument('--updates', type=int, default=300)
+    parser.add_argument('--loads', type=int, default=10)
+    parser.add_argument('--backends', nargs='+', default=['json', 'sqlite'])
+    args = parser.parse_args()
+
+    schedule = make_schedule(args.members, np.random.default_rng(0))
+    print(f"{args.members} members x {DAYS} days, {args.updates} single-cell updates, {args.loads} cold loads")
+    print(f"{'backend':>8} {'update p50':>11} {'update p95':>11} {'load p50':>10} {'load max':>10}")
+    for backend in args.backends:
+        update_times, load_times = run(backend, schedule, args.updates, args.loads, np.random.default_rng(1))
+        print(f"{backend:>8} {percentile(update_times, 50):>9.2f}ms {percentile(update_times, 95):>9.2f}ms "
+              f"{statistics.median(load_times) * 1000:>8.1f}ms {max(load_times) * 1000:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
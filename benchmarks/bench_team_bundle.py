@@ -0,0 +1,73 @@
+"""Benchmark: per-team / per-month bundle export, sequential vs. process pool.
+
+Run from the repository root::
+
+    python benchmarks/bench_team_bundle.py
+    python benchmarks/bench_team_bundle.py --teams 12 --members-per-team 80 --months 3 --workers 2 4 8
+
+The speedup is bounded by the number of CPU cores available.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from excel_export import write_team_bundle  # noqa: E402
+from shift_types import SHIFT_TYPES  # noqa: E402
+
+
+def make_tasks(teams, members_per_team, months, rng):
+    tasks = []
+    for month in range(1, months + 1):
+        for team in range(teams):
+            members = [
+                (f"Member {team}-{i}", f"Team {team}", "Cape Town", f"EMP{team:02d}{i:04d}")
+                for i in range(members_per_team)
+            ]
+            shifts = rng.integers(0, max(SHIFT_TYPES) + 1, size=(members_per_team, 31), dtype=np.uint8)
+            tasks.append((f"2026-{month:02d}/Team {team}.xlsx", f"Schedule {month}-2026", members, shifts, 31))
+    return tasks
+
+
+def run(tasks, executor):
+    output = io.BytesIO()
+    start = time.perf_counter()
+    write_team_bundle(output, tasks, SHIFT_TYPES, executor=executor)
+    elapsed = time.perf_counter() - start
+    assert len(zipfile.ZipFile(io.BytesIO(output.getvalue())).namelist()) == len(tasks)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teams', type=int, default=12)
+    parser.add_argument('--members-per-team', type=int, default=80)
+    parser.add_argument('--months', type=int, default=3)
+    parser.add_argument('--workers', type=int, nargs='+', default=[os.cpu_count() or 2])
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.teams, args.members_per_team, args.months, np.random.default_rng(0))
+    print(f"{len(tasks)} workbooks ({args.teams} teams x {args.months} months, "
+          f"{args.members_per_team} members each) on {os.cpu_count()} CPUs")
+
+    baseline = run(tasks, None)
+    print(f"{'sequential':>12} {baseline:>8.2f}s")
+    context = multiprocessing.get_context('spawn')
+    for workers in args.workers:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            # Warm the workers up so process start-up is not counted
+            list(pool.map(abs, range(workers)))
+            elapsed = run(tasks, pool)
+        print(f"{f'{workers} workers':>12} {elapsed:>8.2f}s  {baseline / elapsed:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Streaming Excel export for shift schedules.
+
+Workbooks are generated with openpyxl's write-only mode: rows are streamed
+straight to the output instead of being held as cell objects. Every shift
+type gets one named style that is created once per workbook, and one
+pre-styled prototype cell per type is reused for every day cell, so
+per-cell work is just a list lookup. Column widths come from the known
+lengths of the data instead of a scan over every written cell.
+
+Nothing here depends on Streamlit, so it can run in worker processes;
+``write_team_bundle`` fans per-team/per-month workbooks out over a process
+pool and packs them into a single ZIP.
+"""
+import io
+import re
+import zipfile
+from concurrent.futures import as_completed
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+
+HEADER_STYLE = 'Schedule Header'
+TEXT_STYLE = 'Schedule Text'
+LEGEND_HEADER_STYLE = 'Legend Header'
+MAX_COLUMN_WIDTH = 50
+PROGRESS_EVERY = 250
+MEMBER_COLUMNS = ['Member', 'Team', 'Location', 'WHMCS']
+
+_THIN = Side(style='thin')
+_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_CENTER = Alignment(horizontal='center', vertical='center')
+
+
+def shift_style_name(shift_type):
+    return f"Shift {shift_type}"
+
+
+def _named_styles(shift_types):
+    """One named style per shift type plus the header/text styles"""
+    styles = [
+        NamedStyle(
+            name=HEADER_STYLE,
+            fill=PatternFill(start_color="667EEA", end_color="667EEA", fill_type="solid"),
+            font=Font(bold=True, color="FFFFFF", size=12),
+            alignment=_CENTER,
+            border=_BORDER
+        ),
+        NamedStyle(name=TEXT_STYLE, border=_BORDER),
+        NamedStyle(name=LEGEND_HEADER_STYLE, font=Font(bold=True)),
+    ]
+    for shift_type, info in shift_types.items():
+        color = info['color'].replace('#', '')
+        styles.append(NamedStyle(
+            name=shift_style_name(shift_type),
+            fill=PatternFill(start_color=color, end_color=color, fill_type="solid"),
+            font=Font(bold=True, color=info['text_color'].replace('#', '')),
+            alignment=_CENTER,
+            border=_BORDER
+        ))
+    return styles
+
+
+def _column_width(max_length):
+    return min(max_length + 2, MAX_COLUMN_WIDTH)
+
+
+def _styled_cell(ws, style, value=None):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _write_schedule_sheet(wb, title, members, shifts, shift_types, days, progress=None):
+    ws = wb.create_sheet(title)
+
+    # Column widths must be set before the first row is streamed
+    lengths = [len(header) for header in MEMBER_COLUMNS]
+    for member in members:
+        for col, value in enumerate(member):
+            lengths[col] = max(lengths[col], len(str(value)))
+    day_width = _column_width(max(
+        len(f'Day {days}'),
+        max(len(info['code']) for info in shift_types.values())
+    ))
+    for col, length in enumerate(lengths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = _column_width(length)
+    for col in range(len(MEMBER_COLUMNS) + 1, len(MEMBER_COLUMNS) + days + 1):
+        ws.column_dimensions[get_column_letter(col)].width = day_width
+
+    ws.append([
+        _styled_cell(ws, HEADER_STYLE, header)
+        for header in MEMBER_COLUMNS + [f'Day {i}' for i in range(1, days + 1)]
+    ])
+
+    # Prototype cells: the writer serializes each cell as soon as it is
+    # appended, so the same styled cell can be reused for every occurrence
+    num_types = max(shift_types) + 1
+    off_cell = _styled_cell(ws, shift_style_name(0), shift_types[0]['code'] or None)
+    type_cells = np.empty(num_types, dtype=object)
+    type_cells[:] = [off_cell] * num_types
+    for shift_type, info in shift_types.items():
+        type_cells[shift_type] = _styled_cell(ws, shift_style_name(shift_type), info['code'] or None)
+    text_cells = [_styled_cell(ws, TEXT_STYLE) for _ in MEMBER_COLUMNS]
+
+    shifts = np.asarray(shifts)[:, :days]
+    shifts = np.where(shifts < num_types, shifts, 0)
+    for row, (member, row_cells) in enumerate(zip(members, type_cells[shifts])):
+        for cell, value in zip(text_cells, member):
+            cell.value = value
+        ws.append(text_cells + row_cells.tolist())
+        if progress is not None and row % PROGRESS_EVERY == 0:
+            progress(row / len(members))
+
+
+def _write_legend_sheet(wb, shift_types):
+    ws = wb.create_sheet("Legend")
+    rows = [(info['code'], info['name'], info['time']) for shift_type, info in shift_types.items() if shift_type > 0]
+    headers = ["Shift Code", "Shift Name", "Time"]
+    for col, header in enumerate(headers):
+        length = max([len(header)] + [len(row[col]) for row in rows])
+        ws.column_dimensions[get_column_letter(col + 1)].width = _column_width(length)
+    ws.append([_styled_cell(ws, LEGEND_HEADER_STYLE, header) for header in headers])
+    for row in rows:
+        ws.append(list(row))
+
+
+def write_schedule_workbook(output, title, members, shifts, shift_types, days, progress=None):
+    """Stream a schedule workbook to ``output`` (a path or binary file object)
+
+    ``members`` is a sequence of ``(name, team, location, whmcs)`` tuples and
+    ``shifts`` a matching ``len(members) x days`` array of shift type codes.
+    ``progress``, if given, is called with the fraction of rows written.
+    """
+    wb = Workbook(write_only=True)
+    for style in _named_styles(shift_types):
+        wb.add_named_style(style)
+    _write_schedule_sheet(wb, title, members, shifts, shift_types, days, progress)
+    _write_legend_sheet(wb, shift_types)
+    wb.save(output)
+    return output
+
+
+def write_schedule_archive(output, entries, members, shift_types, load_shifts, progress=None):
+    """Stream a ZIP with one schedule workbook per ``(entry_name, title, year, month, days)``
+
+    ``load_shifts(year, month)`` returns the ``len(members) x days`` shift
+    array for that month, so only one month is held in memory at a time.
+    """
+    # .xlsx files are already deflated, so entries are stored as-is
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for done, (entry_name, title, year, month, days) in enumerate(entries):
+            buffer = io.BytesIO()
+            write_schedule_workbook(buffer, title, members, load_shifts(year, month), shift_types, days)
+            archive.writestr(entry_name, buffer.getvalue())
+            if progress is not None:
+                progress((done + 1) / len(entries))
+    return output
+
+
+def safe_file_name(name):
+    """Make a team name usable as a ZIP entry / file name"""
+    return re.sub(r'[^A-Za-z0-9._ -]+', '_', name).strip() or 'team'
+
+
+def build_workbook_bytes(title, members, shifts, shift_types, days):
+    """Build one workbook in memory; top-level so worker processes can run it"""
+    output = io.BytesIO()
+    write_schedule_workbook(output, title, members, shifts, shift_types, days)
+    return output.getvalue()
+
+
+def write_team_bundle(output, tasks, shift_types, executor=None, progress=None):
+    """Stream a ZIP with one workbook per ``(entry_name, title, members, shifts, days)`` task
+
+    With an ``executor`` (e.g. a ``ProcessPoolExecutor``) the workbooks are
+    generated in parallel and written as they complete; without one they are
+    generated sequentially in this process.
+    """
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        if executor is None:
+            for done, (entry_name, title, members, shifts, days) in enumerate(tasks):
+                archive.writestr(entry_name, build_workbook_bytes(title, members, shifts, shift_types, days))
+                if progress is not None:
+                    progress((done + 1) / len(tasks))
+            return output
+
+        futures = {
+            executor.submit(build_workbook_bytes, title, members, shifts, shift_types, days): entry_name
+            for entry_name, title, members, shifts, days in tasks
+        }
+        for done, future in enumerate(as_completed(futures)):
+            archive.writestr(futures[future], future.result())
+            if progress is not None:
+                progress((done + 1) / len(tasks))
+    return output
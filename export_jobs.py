@@ -0,0 +1,114 @@
+"""Background export jobs.
+
+Exports are submitted to a small, bounded thread pool so the Streamlit script
+run never blocks on ``wb.save``. Jobs are keyed by their inputs (data
+version, period, format), so identical requests from several sessions share
+one job instead of building the same file twice.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class ExportJob:
+    """One export request and its progress"""
+
+    def __init__(self, key, label, file_name, mime):
+        self.key = key
+        self.label = label
+        self.file_name = file_name
+        self.mime = mime
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting for a worker"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def report(self, progress, message=None):
+        """Called by the export function to publish progress (0.0 - 1.0)"""
+        self.progress = min(max(progress, 0.0), 1.0)
+        if message:
+            self.message = message
+
+
+class QueueFull(Exception):
+    """Raised when too many exports are already waiting"""
+
+
+class ExportJobQueue:
+    """Bounded worker pool with de-duplication of identical export requests"""
+
+    def __init__(self, max_workers=2, max_pending=8, max_jobs=32):
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def submit(self, key, label, file_name, mime, func, *args):
+        """Queue ``func(job, *args)`` unless a live job for ``key`` already exists
+
+        ``func`` returns the finished file as bytes. A failed job with the
+        same key is replaced so the export can be retried.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != FAILED:
+                return job
+            pending = sum(1 for j in self._jobs.values() if not j.finished)
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} exports are already in progress; try again shortly")
+            job = ExportJob(key, label, file_name, mime)
+            self._jobs[key] = job
+            self._evict_finished()
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    def add_finished(self, key, label, file_name, mime, data):
+        """Register an already-built file (e.g. from the export cache) as a done job"""
+        job = ExportJob(key, label, file_name, mime)
+        job.status = DONE
+        job.progress = 1.0
+        job.message = "Ready"
+        job.result = data
+        with self._lock:
+            self._jobs[key] = job
+            self._evict_finished()
+        return job
+
+    def _run(self, job, func, args):
+        job.status = RUNNING
+        job.message = "Starting"
+        try:
+            job.result = func(job, *args)
+            job.progress = 1.0
+            job.message = "Ready"
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.message = "Failed"
+            job.status = FAILED
+
+    def _evict_finished(self):
+        """Drop the oldest finished jobs once more than ``max_jobs`` are held"""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for key in [k for k, j in self._jobs.items() if j.finished][:excess]:
+            del self._jobs[key]
@@ -0,0 +1,312 @@
+"""Compact binary archive of schedule history, readable through ``mmap``.
+
+Years of rosters kept for audits and fairness analysis would be bulky as
+JSON and have to be parsed in full. An archive stores one byte per
+member-day instead::
+
+    offset 0   b"SHIFTARC"                magic
+    offset 8   uint32 little-endian       format version (1)
+    offset 12  uint32 little-endian       header length in bytes
+    offset 16  UTF-8 JSON header          padded with zeros to a multiple of 16
+    ...        uint8[members][days]       shift bytes, one member's days contiguous
+
+The header holds the date range (``start`` and ``days``), the member table
+(``id``, plus ``name`` and ``team`` when known) in row order, and the shift
+dictionary mapping each byte value to a code and name from ``SHIFT_TYPES``.
+``UNLISTED`` marks days in a month a member was not on the roster for.
+
+``HistoryArchive`` maps the file and exposes the cells as a read-only NumPy
+view, so one member's year is a contiguous slice and one day across all
+members a strided column, and neither loads the rest of the file.
+
+Run from the repository root (stop the app before importing)::
+
+    python history_archive.py export history.shiftarc --from 2024-01 --to 2026-12
+    python history_archive.py import history.shiftarc --months 2025-01 2025-02
+    python history_archive.py info history.shiftarc
+"""
+import argparse
+import calendar
+import json
+import mmap
+import os
+import struct
+from datetime import date, timedelta
+
+import numpy as np
+
+from json_documents import write_atomic
+from member_index import MemberIndex
+from shift_types import SHIFT_TYPES
+
+
+MAGIC = b"SHIFTARC"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('<8sII')
+ALIGNMENT = 16
+# Byte for days a member was not on the roster (absent from that month)
+UNLISTED = 255
+
+
+def month_range(first, last):
+    """(year, month) pairs from ``first`` to ``last`` inclusive"""
+    index, end = first[0] * 12 + first[1] - 1, last[0] * 12 + last[1] - 1
+    return [(i // 12, i % 12 + 1) for i in range(index, end + 1)]
+
+
+def shift_dictionary(shift_types):
+    """Header shift dictionary: ``[[value, code, name], ...]`` for each shift type"""
+    return [[value, info['code'], info['name']] for value, info in sorted(shift_types.items())]
+
+
+def write_history_archive(path, months, load_month, members=None, shift_types=SHIFT_TYPES):
+    """Write the schedules of consecutive ``months`` to an archive at ``path``
+
+    ``load_month(year, month)`` returns that month's ``{member_id: [shift, ...]}``.
+    ``members`` optionally maps member ID -> ``{'name', 'team'}`` to record
+    alongside the IDs. Returns the number of members written.
+    """
+    if not months:
+        raise ValueError("No months to archive")
+    if any(value >= UNLISTED for value in shift_types):
+        raise ValueError(f"Shift type values must be below {UNLISTED}")
+    members = members or {}
+    rows = {}
+    blocks = []
+    for year, month in months:
+        schedule = load_month(year, month)
+        days = calendar.monthrange(year, month)[1]
+        block = np.full((len(schedule), days), UNLISTED, dtype=np.uint8)
+        for i, (member_id, shifts) in enumerate(schedule.items()):
+            rows.setdefault(member_id, len(rows))
+            shifts = np.asarray(shifts[:days], dtype=np.int64)
+            unknown = set(np.unique(shifts).tolist()) - set(shift_types)
+            if unknown:
+                raise ValueError(f"{year}-{month:02d}: unknown shift types {sorted(unknown)} for {member_id}")
+            block[i, :len(shifts)] = shifts
+            block[i, len(shifts):] = 0
+        blocks.append((list(schedule), block))
+
+    cells = np.full((len(rows), sum(block.shape[1] for _, block in blocks)), UNLISTED, dtype=np.uint8)
+    offset = 0
+    for member_ids, block in blocks:
+        cells[[rows[member_id] for member_id in member_ids], offset:offset + block.shape[1]] = block
+        offset += block.shape[1]
+
+    header = {
+        'start': date(*months[0], 1).isoformat(),
+        'days': cells.shape[1],
+        'members': [
+            {'id': member_id, **{k: members[member_id][k] for k in ('name', 'team') if k in members.get(member_id, {})}}
+            for member_id in rows
+        ],
+        'shifts': shift_dictionary(shift_types),
+        'unlisted': UNLISTED
+    }
+    encoded = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    padding = -(PREAMBLE.size + len(encoded)) % ALIGNMENT
+    payload = b''.join([
+        PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(encoded)), encoded, b'\0' * padding, cells.tobytes()
+    ])
+    write_atomic(path, payload)
+    return len(rows)
+
+
+class HistoryArchive:
+    """Read-only, memory-mapped view of an archive file
+
+    ``cells`` is the ``(members, days)`` uint8 array of archived byte values;
+    slices of it are views into the mapped file. Views handed out stay
+    valid after ``close``: the mapping is then released once the last of
+    them is gone. Use as a context manager to close automatically.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, header_size = PREAMBLE.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a schedule archive")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"{path} has unsupported archive version {version}")
+            header = json.loads(self._mmap[PREAMBLE.size:PREAMBLE.size + header_size].decode('utf-8'))
+            data_offset = PREAMBLE.size + header_size + (-(PREAMBLE.size + header_size) % ALIGNMENT)
+            self.start = date.fromisoformat(header['start'])
+            self.days = header['days']
+            self.members = header['members']
+            self.shifts = {value: (code, name) for value, code, name in header['shifts']}
+            self.unlisted = header['unlisted']
+            self.cells = np.frombuffer(
+                self._mmap, dtype=np.uint8, count=len(self.members) * self.days, offset=data_offset
+            ).reshape(len(self.members), self.days)
+        except (struct.error, KeyError, TypeError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a valid schedule archive: {e}") from e
+        except ValueError:
+            self._mmap.close()
+            raise
+        self.rows = {member['id']: row for row, member in enumerate(self.members)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._mmap is None:
+            return
+        self.cells = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views from member()/day() still point into the mapping; it is
+            # unmapped when they are garbage collected
+            pass
+        self._mmap = None
+
+    @property
+    def end(self):
+        """Last archived date"""
+        return self.start + timedelta(days=self.days - 1)
+
+    @property
+    def months(self):
+        """(year, month) pairs covered by the archive"""
+        return month_range((self.start.year, self.start.month), (self.end.year, self.end.month))
+
+    def offset(self, day):
+        """Column of a ``date``; raises ``KeyError`` outside the archived range"""
+        offset = (day - self.start).days
+        if not 0 <= offset < self.days:
+            raise KeyError(f"{day} is outside {self.start} - {self.end}")
+        return offset
+
+    def member(self, member_id, start=None, end=None):
+        """One member's byte values from ``start`` to ``end`` (inclusive dates), as a view"""
+        first = self.offset(start) if start else 0
+        last = self.offset(end) if end else self.days - 1
+        return self.cells[self.rows[member_id], first:last + 1]
+
+    def day(self, day):
+        """Every member's byte value on one ``date``, in member-table order, as a view"""
+        return self.cells[:, self.offset(day)]
+
+    def translation(self, shift_types=SHIFT_TYPES):
+        """Lookup array from archived byte values to ``shift_types`` values, matched by code
+
+        Archived values whose code no longer exists map to -1.
+        """
+        codes = {info['code']: value for value, info in shift_types.items()}
+        table = np.full(256, -1, dtype=np.int16)
+        for value, (code, _) in self.shifts.items():
+            table[value] = codes.get(code, -1)
+        table[self.unlisted] = 0
+        return table
+
+    def month(self, year, month, shift_types=SHIFT_TYPES):
+        """``{member_id: [shift, ...]}`` for the members on the roster in one month
+
+        Shifts are translated to ``shift_types`` by code. Raises
+        ``ValueError`` for codes ``shift_types`` no longer has.
+        """
+        first = self.offset(date(year, month, 1))
+        block = self.cells[:, first:first + calendar.monthrange(year, month)[1]]
+        listed = np.flatnonzero((block != self.unlisted).any(axis=1))
+        translated = self.translation(shift_types)[block[listed]]
+        if (translated < 0).any():
+            missing = sorted({self.shifts[value][0] for value in np.unique(block[listed][translated < 0]).tolist()})
+            raise ValueError(f"{year}-{month:02d}: shift codes {missing} no longer exist")
+        return {self.members[row]['id']: shifts.tolist() for row, shifts in zip(listed, translated)}
+
+
+def export_history(storage, path, months, log=print):
+    """Archive ``months`` of ``storage``'s schedules to ``path``"""
+    data, _ = storage.read_document('team_members')
+    member_index, _ = MemberIndex.from_dict(data or {})
+    members = {
+        member_id: {'name': record['name'], 'team': member_index.member_teams[member_id]}
+        for member_id, record in member_index.records.items()
+    }
+
+    def load_month(year, month):
+        schedule, warnings = storage.schedules.load_month(year, month)
+        for warning in warnings:
+            log(f"{year}-{month:02d}: {warning}")
+        return schedule
+
+    count = write_history_archive(path, months, load_month, members)
+    log(f"Archived {count} members, {months[0][0]}-{months[0][1]:02d} to {months[-1][0]}-{months[-1][1]:02d}, "
+        f"{os.path.getsize(path)} bytes")
+
+
+def import_history(storage, path, months=None, log=print):
+    """Replace ``storage``'s schedules for ``months`` (default: all) with those in the archive at ``path``"""
+    with HistoryArchive(path) as archive:
+        covered = [
+            (year, month) for year, month in archive.months
+            if archive.start <= date(year, month, 1)
+            and date(year, month, calendar.monthrange(year, month)[1]) <= archive.end
+        ]
+        for year, month in months or covered:
+            if (year, month) not in covered:
+                raise ValueError(f"{year}-{month:02d} is not fully covered by the archive")
+        for year, month in months or covered:
+            schedule = archive.month(year, month)
+            storage.schedules.journal(year, month).write_snapshot(schedule)
+            log(f"{year}-{month:02d}: {len(schedule)} members")
+
+
+def parse_month(value):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        date(year, month, 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+    return year, month
+
+
+def main():
+    from storage import open_storage
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='data', help="data directory (default: data)")
+    parser.add_argument('--storage', choices=['json', 'sqlite'], default=os.environ.get('SHIFT_STORAGE', 'json'))
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help="archive months from the live store")
+    export_parser.add_argument('path')
+    export_parser.add_argument('--from', dest='first', type=parse_month, help="first month (default: earliest saved)")
+    export_parser.add_argument('--to', dest='last', type=parse_month, help="last month (default: latest saved)")
+    import_parser = commands.add_parser('import', help="replace months in the live store with archived ones")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--months', nargs='+', type=parse_month, help="months to import (default: all)")
+    info_parser = commands.add_parser('info', help="describe an archive")
+    info_parser.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        try:
+            archive = HistoryArchive(args.path)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        with archive:
+            print(f"{archive.start} to {archive.end}: {len(archive.members)} members x {archive.days} days")
+            print("Shifts: " + ", ".join(f"{value}={code or 'Off'}" for value, (code, _) in archive.shifts.items()))
+        return
+
+    storage = open_storage(args.storage, args.data)
+    if args.command == 'export':
+        saved = storage.schedules.partitions()
+        if not saved and not (args.first and args.last):
+            parser.error("no saved months; give --from and --to")
+        months = month_range(args.first or saved[0], args.last or saved[-1])
+        if not months:
+            parser.error("--from must not be after --to")
+        export_history(storage, args.path, months)
+    else:
+        import_history(storage, args.path, args.months)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Versioned JSON documents shared by concurrent sessions.
+
+Team members, shift patterns, pattern anchors, staffing requirements and
+settings each live in one small JSON file that every browser session edits
+from its own copy. ``read_document`` returns the parsed file with an ETag
+(a hash of its bytes); ``save_document`` writes a new version only if the
+file still has that ETag. If another session saved in between, the three
+versions are merged instead:
+
+- dict keys changed on one side only keep that side's value
+- lists of records with an ``'id'`` (team members) merge record by record
+- anything else changed differently on both sides raises ``ConflictError``
+
+Writes go to a temporary file in the same directory and are renamed over the
+original, so readers never see a half-written file. Each file has its own
+lock, held only while comparing and writing, so saves to different files
+never wait on each other.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+
+class ConflictError(Exception):
+    """A save overlapped another session's change to the same data
+
+    ``cells`` lists what clashed: ``(member, day)`` pairs for schedules, key
+    paths for JSON documents.
+    """
+
+    def __init__(self, message, cells=()):
+        super().__init__(message)
+        self.cells = list(cells)
+
+
+_MISSING = object()
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path):
+    key = os.path.abspath(path)
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def etag(payload):
+    """ETag of a document's serialized bytes"""
+    return hashlib.sha1(payload).hexdigest()
+
+
+def _serialize(data):
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_atomic(path, payload):
+    """Write bytes to a temporary file beside ``path`` and rename it into place"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=path.name + '.', suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def document_etag(path):
+    """ETag of the file as it is now, or None if it does not exist"""
+    payload = _read(path)
+    return None if payload is None else etag(payload)
+
+
+def read_document(path):
+    """Return ``(data, etag)``; a missing file reads as ``(None, None)``"""
+    payload = _read(path)
+    if payload is None:
+        return None, None
+    return json.loads(payload), etag(payload)
+
+
+def save_document(path, data, base=None, base_etag=None):
+    """Save ``data``, merging with any change made since ``base`` was read
+
+    ``base`` and ``base_etag`` are what ``read_document`` (or the previous
+    ``save_document``) returned. Returns ``(saved, etag)``: ``saved`` is
+    ``data`` itself, or the merged document when someone else saved first.
+    Raises ``ConflictError`` without writing if the two saves changed the
+    same value differently.
+    """
+    with _lock_for(path):
+        current = _read(path)
+        current_etag = None if current is None else etag(current)
+        if current_etag != base_etag:
+            theirs = _MISSING if current is None else json.loads(current)
+            data = merge(_MISSING if base is None else base, data, theirs)
+        payload = _serialize(data)
+        write_atomic(path, payload)
+        return data, etag(payload)
+
+
+def merge(base, mine, theirs, path=()):
+    """Three-way merge of JSON values; raises ``ConflictError`` on a clash"""
+    if mine == theirs or mine == base:
+        return theirs
+    if theirs == base:
+        return mine
+    if all(isinstance(value, dict) for value in (mine, theirs)):
+        return _merge_keyed(
+            base if isinstance(base, dict) else {}, mine, theirs, path, dict
+        )
+    if all(_is_record_list(value) for value in (mine, theirs)):
+        return _merge_keyed(
+            _by_id(base) if _is_record_list(base) else {}, _by_id(mine), _by_id(theirs), path, list
+        )
+    where = '/'.join(str(part) for part in path) or 'document'
+    raise ConflictError(f"{where} was changed by someone else in the meantime", cells=[path])
+
+
+def _is_record_list(value):
+    return isinstance(value, list) and all(isinstance(item, dict) and 'id' in item for item in value)
+
+
+def _by_id(records):
+    return {record['id']: record for record in records}
+
+
+def _merge_keyed(base, mine, theirs, path, kind):
+    merged = {}
+    for key in list(theirs) + [key for key in mine if key not in theirs]:
+        value = merge(base.get(key, _MISSING), mine.get(key, _MISSING), theirs.get(key, _MISSING), path + (key,))
+        if value is not _MISSING:
+            merged[key] = value
+    return merged if kind is dict else list(merged.values())
@@ -0,0 +1,171 @@
+"""Team members keyed by stable IDs.
+
+Every member record carries a persistent ``id`` that schedules are keyed by,
+so renaming someone or moving them to another team never touches schedule
+data, and two people with the same name in different teams stay distinct.
+
+``MemberIndex`` owns the ``{team: [record, ...]}`` layout stored in
+``team_members.json`` and keeps id -> record, id -> team and name -> ids
+maps current on every mutation, so lookups, renames and team moves are O(1).
+"""
+import uuid
+
+
+def new_member_id(taken=()):
+    """Short random ID that is not already in ``taken``"""
+    while True:
+        member_id = uuid.uuid4().hex[:12]
+        if member_id not in taken:
+            return member_id
+
+
+class MemberIndex:
+    """In-memory index over team member records"""
+
+    def __init__(self):
+        # team -> {id: record} and name -> {id: None}, both in insertion order
+        self._teams = {}
+        self._by_name = {}
+        self.records = {}
+        self.member_teams = {}
+
+    # Conversion --------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, team_members):
+        """Build the index from the JSON ``{team: [record, ...]}`` layout
+
+        Returns ``(index, assigned)`` where ``assigned`` maps member name ->
+        list of IDs given to records that did not have one yet, so schedules
+        still keyed by name can be migrated.
+        """
+        index = cls()
+        assigned = {}
+        for team, members in team_members.items():
+            index.add_team(team)
+            for record in members:
+                record = dict(record)
+                if not record.get('id') or record['id'] in index.records:
+                    fields = {k: v for k, v in record.items() if k != 'id'}
+                    record = {'id': new_member_id(index.records), **fields}
+                    assigned.setdefault(record['name'], []).append(record['id'])
+                index._insert(team, record)
+        return index, assigned
+
+    def to_dict(self):
+        """Convert back to the JSON ``{team: [record, ...]}`` layout"""
+        return {team: list(members.values()) for team, members in self._teams.items()}
+
+    def copy(self):
+        """Independent copy, to edit without touching an index other sessions share"""
+        return type(self).from_dict(self.to_dict())[0]
+
+    # Access ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, member_id):
+        return member_id in self.records
+
+    def get(self, member_id):
+        return self.records.get(member_id)
+
+    def team_of(self, member_id):
+        return self.member_teams.get(member_id)
+
+    def name_of(self, member_id):
+        return self.records[member_id]['name']
+
+    def ids_for_name(self, name):
+        return list(self._by_name.get(name, ()))
+
+    def name_map(self):
+        """``{name: [id, ...]}`` for every member"""
+        return {name: list(ids) for name, ids in self._by_name.items()}
+
+    def find(self, team, name):
+        """ID of the member called ``name`` in ``team``, or None"""
+        for member_id in self._by_name.get(name, ()):
+            if self.member_teams[member_id] == team:
+                return member_id
+        return None
+
+    @property
+    def teams(self):
+        return list(self._teams)
+
+    def members(self, team):
+        """Member records of one team, in display order"""
+        return list(self._teams.get(team, {}).values())
+
+    def ids(self, teams=None):
+        """Member IDs of the given teams (default all), in display order"""
+        return [
+            member_id
+            for team, members in self._teams.items()
+            if teams is None or team in teams
+            for member_id in members
+        ]
+
+    def label(self, member_id):
+        """``"name (team)"`` display label for selectboxes"""
+        return f"{self.records[member_id]['name']} ({self.member_teams[member_id]})"
+
+    # Mutation ----------------------------------------------------------------
+
+    def add_team(self, team):
+        self._teams.setdefault(team, {})
+
+    def _insert(self, team, record):
+        member_id = record['id']
+        self._teams[team][member_id] = record
+        self.records[member_id] = record
+        self.member_teams[member_id] = team
+        self._by_name.setdefault(record['name'], {})[member_id] = None
+
+    def add(self, team, record):
+        """Add a member to ``team`` (created if needed) and return its new ID"""
+        record = {'id': new_member_id(self.records), **record}
+        self.add_team(team)
+        self._insert(team, record)
+        return record['id']
+
+    def restore(self, team, record, position=None):
+        """Put back a removed member's record, keeping its ID, at ``position`` in ``team`` (default: last)"""
+        self.add_team(team)
+        self._insert(team, dict(record))
+        if position is not None:
+            members = list(self._teams[team].items())
+            members.insert(position, members.pop())
+            self._teams[team] = dict(members)
+
+    def remove(self, member_id):
+        """Remove a member, returning its record; the team is kept even if empty"""
+        record = self.records.pop(member_id)
+        team = self.member_teams.pop(member_id)
+        del self._teams[team][member_id]
+        self._unlink_name(record['name'], member_id)
+        return record
+
+    def rename(self, member_id, name):
+        record = self.records[member_id]
+        self._unlink_name(record['name'], member_id)
+        record['name'] = name
+        self._by_name.setdefault(name, {})[member_id] = None
+
+    def move(self, member_id, team):
+        """Move a member to another team (created if needed), appending it there"""
+        old = self.member_teams[member_id]
+        if old == team:
+            return
+        record = self._teams[old].pop(member_id)
+        self.add_team(team)
+        self._teams[team][member_id] = record
+        self.member_teams[member_id] = team
+
+    def _unlink_name(self, name, member_id):
+        ids = self._by_name[name]
+        del ids[member_id]
+        if not ids:
+            del self._by_name[name]
@@ -0,0 +1,60 @@
+"""Copy all data from one storage backend to another.
+
+Run from the repository root (stop the app first)::
+
+    python migrate_storage.py                      # data/*.json -> data/shifts.db
+    python migrate_storage.py --source sqlite --target json
+    python migrate_storage.py --data /path/to/data
+
+Every document and every month partition is copied; anything already in the
+target is overwritten. Then start the app with ``SHIFT_STORAGE=sqlite`` (or
+``json``) to use the target. The source is left untouched.
+
+Members saved before IDs existed are given one in the target and their
+schedules re-keyed, as the app does on first start. A flat
+``shift_schedule.json`` from before months were stored separately is not
+copied; the app moves it into the target when it first starts.
+"""
+import argparse
+
+from member_index import MemberIndex
+from storage import DOCUMENT_KEYS, open_storage
+
+
+def migrate(source, target, log=print):
+    """Copy every document and month from ``source`` to ``target`` storage"""
+    assigned = {}
+    for key in DOCUMENT_KEYS:
+        data, _ = source.read_document(key)
+        if data is None:
+            continue
+        if key == 'team_members':
+            member_index, assigned = MemberIndex.from_dict(data)
+            data = member_index.to_dict()
+        current, etag = target.read_document(key)
+        target.save_document(key, data, current, etag)
+        log(f"{key}: copied")
+    for year, month in source.schedules.partitions():
+        schedule, rules, warnings = source.schedules.journal(year, month).load_with_rules()
+        for warning in warnings:
+            log(f"{year}-{month:02d}: {warning}")
+        target.schedules.journal(year, month).write_snapshot(schedule, rules)
+        log(f"{year}-{month:02d}: {len(schedule)} members")
+    if assigned:
+        target.schedules.rekey_members(assigned)
+        log(f"Gave IDs to {sum(len(ids) for ids in assigned.values())} members")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='data', help="data directory (default: data)")
+    parser.add_argument('--source', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--target', choices=['json', 'sqlite'], default='sqlite')
+    args = parser.parse_args()
+    if args.source == args.target:
+        parser.error("source and target must differ")
+    migrate(open_storage(args.source, args.data), open_storage(args.target, args.data))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Shift patterns anchored to an absolute start date.
+
+An anchor ties a member to a pattern and the calendar date its first entry
+falls on, so the shift on any date is ``pattern[(date - anchor) % len]`` and
+a rotation carries on across month and year boundaries without drifting.
+Anchors are stored in ``pattern_anchors.json`` as::
+
+    {member_id: {"name": "4on-4off", "pattern": [1, 1, 1, 1, 0, 0, 0, 0], "anchor": "2026-10-01"}}
+
+A month is materialized when it is opened, as ``rotation`` schedule records
+(see ``schedule_journal.apply_record``) that are journaled like any other
+edit. Months that are only read, such as the margins of a rule check, get
+the anchored shifts from ``materialize`` in memory instead.
+"""
+import calendar
+from datetime import date, timedelta
+
+import numpy as np
+
+
+def make_anchor(name, pattern, anchor):
+    return {'name': name, 'pattern': list(pattern), 'anchor': anchor.isoformat()}
+
+
+def anchor_date(entry):
+    return date.fromisoformat(entry['anchor'])
+
+
+def shift_on(entry, day):
+    """Shift for ``day`` under one anchor, or None before the anchor date"""
+    elapsed = (day - anchor_date(entry)).days
+    if elapsed < 0:
+        return None
+    pattern = entry['pattern']
+    return pattern[elapsed % len(pattern)]
+
+
+def materialize(anchors, member_ids, start, end):
+    """``len(member_ids) x days`` array of anchored shifts for ``start``..``end`` inclusive
+
+    Also returns a boolean mask of the cells an anchor actually covers
+    (members without an anchor, and dates before their anchor, are False).
+    """
+    days = (end - start).days + 1
+    shifts = np.zeros((len(member_ids), max(days, 0)), dtype=np.uint8)
+    covered = np.zeros(shifts.shape, dtype=bool)
+    elapsed_from_start = np.arange(max(days, 0))
+    for row, member_id in enumerate(member_ids):
+        entry = anchors.get(member_id)
+        if entry is None or not entry['pattern']:
+            continue
+        elapsed = elapsed_from_start + (start - anchor_date(entry)).days
+        pattern = np.asarray(entry['pattern'], dtype=np.uint8)
+        covered[row] = elapsed >= 0
+        shifts[row] = np.where(covered[row], pattern[elapsed % len(pattern)], 0)
+    return shifts, covered
+
+
+def month_records(anchors, member_ids, year, month):
+    """``rotation`` records that lay the anchored patterns over one month
+
+    Members sharing a pattern and a first covered day are grouped into one
+    record; anchors starting after the month are skipped.
+    """
+    first = date(year, month, 1)
+    days = calendar.monthrange(year, month)[1]
+    groups = {}
+    for member_id in member_ids:
+        entry = anchors.get(member_id)
+        if entry is None or not entry['pattern']:
+            continue
+        start = max((anchor_date(entry) - first).days, 0)
+        if start >= days:
+            continue
+        offset = (first + timedelta(days=start) - anchor_date(entry)).days % len(entry['pattern'])
+        group = groups.setdefault((tuple(entry['pattern']), start), ([], []))
+        group[0].append(member_id)
+        group[1].append(offset)
+    return [
+        {'op': 'rotation', 'members': members, 'pattern': list(pattern), 'offsets': offsets, 'start': start}
+        for (pattern, start), (members, offsets) in groups.items()
+    ]
@@ -0,0 +1,66 @@
+"""Ranked cover candidates for one shift.
+
+When someone drops out of a shift, ``rank_replacements`` lists the
+teammates who could take it. Candidates are taken straight from the
+``ScheduleMatrix`` availability bitsets (Off that day AND in the team),
+plus teammates with no row this month, who are Off every day.
+Each candidate's row is then scored with the shift added:
+- rule breaches it would add (``roster_rules.penalty_scores``)
+- rest hours either side
+- hours already worked this month
+
+All candidates are scored as one block, so a query takes milliseconds even
+for large teams. Rules are judged within the month only.
+"""
+import numpy as np
+
+from roster_rules import penalty_scores
+
+
+def rank_replacements(matrix, member, day, shift_type, group, shift_times, first_day, rules=None):
+    """Teammates in ``group`` who are Off on ``day``, best cover for ``shift_type`` first
+
+    Returns a list of dicts with ``member``, ``breaches`` (rule breaches the
+    shift would add), ``rest_before``/``rest_after`` (hours to the previous
+    shift's end and the next shift's start, None if not working) and
+    ``hours`` (worked so far this month). Candidates adding no breaches come
+    first, then those with the lightest load.
+    """
+    rows = matrix.off_rows(day, group)
+    rows = rows[rows != matrix.index.get(member, -1)]
+    candidates = [matrix.members[row] for row in rows] + [
+        unlisted for unlisted in matrix.unlisted_members(group) if unlisted != member
+    ]
+    if not candidates:
+        return []
+    block = np.zeros((len(candidates), matrix.days), dtype=np.uint8)
+    block[:len(rows)] = matrix.data[rows]
+    trial = block.copy()
+    trial[:, day] = shift_type
+    breaches = (penalty_scores(trial, first_day, shift_times, rules)
+                - penalty_scores(block, first_day, shift_times, rules))
+    hours = shift_times.minutes[block].sum(axis=1) / 60
+
+    start, minutes = shift_times.start, shift_times.minutes
+    rest_before = np.full(len(candidates), np.nan)
+    rest_after = np.full(len(candidates), np.nan)
+    if day > 0:
+        previous = block[:, day - 1]
+        working = minutes[previous] > 0
+        rest_before[working] = (24 * 60 + start[shift_type] - start[previous] - minutes[previous])[working] / 60
+    if day + 1 < block.shape[1]:
+        following = block[:, day + 1]
+        working = minutes[following] > 0
+        rest_after[working] = (24 * 60 + start[following] - start[shift_type] - minutes[shift_type])[working] / 60
+
+    order = np.lexsort((hours, breaches))
+    return [
+        {
+            'member': candidates[i],
+            'breaches': int(breaches[i]),
+            'rest_before': None if np.isnan(rest_before[i]) else float(rest_before[i]),
+            'rest_after': None if np.isnan(rest_after[i]) else float(rest_after[i]),
+            'hours': float(hours[i])
+        }
+        for i in order
+    ]
@@ -0,0 +1,112 @@
+"""Working-time rules checked across a whole roster at once.
+
+Three rules are evaluated over a ``members x days`` block of shift codes
+(``ScheduleMatrix.rows``, or several months joined by ``load_schedule_block``):
+
+- ``rest``: hours between the end of one day's shift and the start of the
+  next day's must be at least ``min_rest_hours``
+- ``consecutive``: no more than ``max_consecutive_days`` working days in a row
+- ``nights``: no more than ``max_nights_per_week`` overnight shifts in a
+  Monday-start week
+
+Shift lengths and overnight flags come from ``ShiftTimes``; types without a
+time range (Off, leave, training) are not working days. Each rule is a few
+whole-array operations, so checking hundreds of members after every edit is
+cheap.
+"""
+import numpy as np
+
+
+DEFAULT_RULES = {
+    'min_rest_hours': 11,
+    'max_consecutive_days': 6,
+    'max_nights_per_week': 4
+}
+RULE_LABELS = {
+    'rest': "Short rest",
+    'consecutive': "Too many days in a row",
+    'nights': "Too many nights in a week"
+}
+
+
+def _run_lengths(flags):
+    """Length of the run of True cells ending at each cell, along axis 1"""
+    counts = np.cumsum(flags, axis=1)
+    # Count at the most recent False cell, carried forward
+    reset = np.maximum.accumulate(np.where(flags, 0, counts), axis=1)
+    return counts - reset
+
+
+def penalty_scores(block, first_day, shift_times, rules=None):
+    """Per-member count of how far each row is over the rules
+
+    Counts short rests, working days past the consecutive limit and night
+    shifts past the weekly limit, so the score falls step by step as a row
+    gets closer to compliant (``check_roster`` reports each run or week once).
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    block = np.asarray(block)
+    num_days = block.shape[1]
+    minutes = shift_times.minutes[block]
+    working = minutes > 0
+    ends = shift_times.start[block[:, :-1]] + minutes[:, :-1]
+    gaps = 24 * 60 + shift_times.start[block[:, 1:]] - ends
+    rest = (working[:, :-1] & working[:, 1:] & (gaps < rules['min_rest_hours'] * 60)).sum(axis=1)
+    consecutive = (_run_lengths(working) > rules['max_consecutive_days']).sum(axis=1)
+    week = (first_day.weekday() + np.arange(num_days)) // 7
+    membership = np.zeros((num_days, week[-1] + 1 if num_days else 0), dtype=np.int64)
+    membership[np.arange(num_days), week] = 1
+    nights = np.maximum(shift_times.overnight[block] @ membership - rules['max_nights_per_week'], 0).sum(axis=1)
+    return rest + consecutive + nights
+
+
+def check_roster(block, first_day, shift_times, rules=None, days=None):
+    """Violations in a ``members x days`` block starting on ``first_day``
+
+    ``days`` optionally limits the report to a ``(start, stop)`` column range,
+    so padding columns can be passed in for context across month
+    boundaries without being reported on. Returns a list of
+    ``{'row', 'day', 'rule', 'value'}`` dicts sorted by row and day, where
+    ``day`` is the column of the shift that breaks the rule and ``value`` is
+    the rest hours, streak length or nights that week.
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    block = np.asarray(block)
+    num_days = block.shape[1]
+    start_col, stop_col = days if days is not None else (0, num_days)
+    minutes = shift_times.minutes[block]
+    working = minutes > 0
+    found = []
+
+    # Rest: gap from one shift's end to the next day's start
+    ends = shift_times.start[block[:, :-1]] + minutes[:, :-1]
+    gaps = 24 * 60 + shift_times.start[block[:, 1:]] - ends
+    short = working[:, :-1] & working[:, 1:] & (gaps < rules['min_rest_hours'] * 60)
+    rows, cols = np.nonzero(short)
+    found.append((rows, cols + 1, 'rest', gaps[rows, cols] / 60))
+
+    # Consecutive days: flag the first day past the limit, with the whole streak length
+    forward = _run_lengths(working)
+    backward = _run_lengths(working[:, ::-1])[:, ::-1]
+    rows, cols = np.nonzero(forward == rules['max_consecutive_days'] + 1)
+    found.append((rows, cols, 'consecutive', forward[rows, cols] + backward[rows, cols] - 1))
+
+    # Nights per week: flag the night that goes over, with the week's total
+    nights = shift_times.overnight[block]
+    week = (first_day.weekday() + np.arange(num_days)) // 7
+    week_first = np.searchsorted(week, week)
+    running = np.cumsum(nights, axis=1)
+    before = np.concatenate([np.zeros((len(block), 1), dtype=running.dtype), running], axis=1)[:, week_first]
+    in_week = running - before
+    week_last = np.searchsorted(week, week, side='right') - 1
+    rows, cols = np.nonzero(nights & (in_week == rules['max_nights_per_week'] + 1))
+    found.append((rows, cols, 'nights', running[rows, week_last[cols]] - before[rows, cols]))
+
+    violations = [
+        {'row': int(row), 'day': int(col), 'rule': rule, 'value': float(value)}
+        for rows, cols, rule, values in found
+        for row, col, value in zip(rows.tolist(), cols.tolist(), values.tolist())
+        if start_col <= col < stop_col
+    ]
+    violations.sort(key=lambda v: (v['row'], v['day']))
+    return violations
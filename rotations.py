@@ -0,0 +1,43 @@
+"""Staggered team rotations built from a repeating shift pattern.
+
+Every member of a team works the same cycle, each at a different phase
+offset. Offsets are chosen greedily so the number of people working each
+day stays as even as possible, and the whole team's month is then produced
+as one tiled array: ``pattern[(day + offset) % len(pattern)]``.
+"""
+import numpy as np
+
+
+def stagger_offsets(pattern, members, days):
+    """Phase offsets for ``members`` people that even out daily coverage over ``days``
+
+    Each member in turn gets the offset that minimizes the sum of squared
+    daily working counts; ties go to the least used offset, then the
+    smallest, so equal patterns spread round-robin. Coverage is scored over
+    whole cycles so a partial cycle at the end of the month does not skew
+    the choice.
+    """
+    pattern = np.asarray(pattern, dtype=np.int64)
+    length = len(pattern)
+    if members <= 0 or length == 0:
+        return np.zeros(max(members, 0), dtype=np.int64)
+    days = -(-days // length) * length
+    # working[o, d]: is someone at offset o working on day d
+    working = (pattern[(np.arange(days)[None, :] + np.arange(length)[:, None]) % length] != 0).astype(np.int64)
+    coverage = np.zeros(days, dtype=np.int64)
+    used = np.zeros(length, dtype=np.int64)
+    offsets = np.empty(members, dtype=np.int64)
+    for member in range(members):
+        cost = ((coverage + working) ** 2).sum(axis=1)
+        best = np.lexsort((np.arange(length), used, cost))[0]
+        offsets[member] = best
+        coverage += working[best]
+        used[best] += 1
+    return offsets
+
+
+def rotation_block(pattern, offsets, days):
+    """``len(offsets) x days`` array where row i is ``pattern`` shifted by ``offsets[i]``"""
+    pattern = np.asarray(pattern, dtype=np.uint8)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    return pattern[(np.arange(days)[None, :] + offsets[:, None]) % len(pattern)]
@@ -0,0 +1,488 @@
+"""Append-only change journal for the shift schedule.
+
+Every schedule mutation is written as one small line to the journal instead of
+re-serializing the whole schedule. A background compaction folds the journal
+into the JSON snapshot, and loading replays whatever the snapshot is missing.
+
+Journal line format::
+
+    <crc32 as 8 hex chars> <compact JSON record>\n
+
+Each record carries a monotonically increasing ``seq`` so replay can skip
+anything the snapshot already contains.
+
+Snapshots are written in the sparse rule + override format from
+``sparse_schedule``: replay keeps track of the pattern each member's row was
+last laid from, and only cells that differ from it are stored.
+
+Sessions editing the same month concurrently pass the ``seq`` they last saw
+to ``append``. Records other sessions wrote since then are checked cell by
+cell against the new ones: changes to different cells are merged (the caller
+gets the other records back to apply), while two different values for the
+same cell raise ``ConflictError``. Each month has its own lock, so editors of
+different months never wait on each other.
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+
+from json_documents import ConflictError, write_atomic
+from sparse_schedule import decode, encode, make_rule
+
+
+COMPACT_EVERY = 500
+# Records kept in memory for merging concurrent appends without a disk read
+RECENT_RECORDS = 2 * COMPACT_EVERY
+
+
+def apply_record(schedule, record, days=31, rules=None):
+    """Apply a single journal record to a schedule dict in place
+
+    If ``rules`` is given it is kept current as well: ``pattern`` and
+    ``rotation`` records set the base rule of the members they cover, and
+    removing or resetting a member drops theirs.
+    """
+    op = record['op']
+    member = record.get('member')
+    if rules is not None:
+        if op == 'pattern':
+            rules[member] = make_rule(record['pattern'], record['start'])
+        elif op == 'rotation':
+            for rotation_member, offset in zip(record['members'], record['offsets']):
+                rules[rotation_member] = make_rule(record['pattern'], record['start'], offset)
+        elif op in ('add', 'remove'):
+            rules.pop(member, None)
+
+    if op == 'set':
+        row = schedule.setdefault(member, [0] * days)
+        start, end = record['days']
+        for day in range(start, min(end, len(row) - 1) + 1):
+            row[day] = record['shift']
+    elif op == 'pattern':
+        row = schedule.setdefault(member, [0] * days)
+        pattern = record['pattern']
+        start = record['start']
+        for i in range(start, len(row)):
+            row[i] = pattern[(i - start) % len(pattern)]
+    elif op == 'cells':
+        for cell_member, day, shift in record['cells']:
+            row = schedule.setdefault(cell_member, [0] * days)
+            if 0 <= day < len(row):
+                row[day] = shift
+    elif op == 'fill':
+        for fill_member in record['members']:
+            row = schedule.setdefault(fill_member, [0] * days)
+            for day in record['days']:
+                if 0 <= day < len(row):
+                    row[day] = record['shift']
+    elif op == 'rotation':
+        pattern = record['pattern']
+        start = record['start']
+        for rotation_member, offset in zip(record['members'], record['offsets']):
+            row = schedule.setdefault(rotation_member, [0] * days)
+            for i in range(start, len(row)):
+                row[i] = pattern[(i - start + offset) % len(pattern)]
+    elif op == 'add':
+        schedule[member] = [0] * record.get('length', days)
+    elif op == 'remove':
+        schedule.pop(member, None)
+    else:
+        raise ValueError(f"Unknown journal op: {op}")
+
+
+def record_cells(record, days=31):
+    """``{(member, day): shift}`` for every cell a record writes; removed cells map to None"""
+    op = record['op']
+    member = record.get('member')
+    if op == 'set':
+        start, end = record['days']
+        return {(member, day): record['shift'] for day in range(start, min(end, days - 1) + 1)}
+    if op == 'pattern':
+        pattern, start = record['pattern'], record['start']
+        return {(member, i): pattern[(i - start) % len(pattern)] for i in range(start, days)}
+    if op == 'cells':
+        return {(cell_member, day): shift for cell_member, day, shift in record['cells'] if 0 <= day < days}
+    if op == 'fill':
+        return {
+            (fill_member, day): record['shift']
+            for fill_member in record['members'] for day in record['days'] if 0 <= day < days
+        }
+    if op == 'rotation':
+        pattern, start = record['pattern'], record['start']
+        return {
+            (rotation_member, i): pattern[(i - start + offset) % len(pattern)]
+            for rotation_member, offset in zip(record['members'], record['offsets'])
+            for i in range(start, days)
+        }
+    if op == 'add':
+        return {(member, day): 0 for day in range(days)}
+    if op == 'remove':
+        return {(member, day): None for day in range(days)}
+    raise ValueError(f"Unknown journal op: {op}")
+
+
+def check_conflicts(others, records, days=31):
+    """Raise ``ConflictError`` if ``records`` set any cell ``others`` set, to a different value"""
+    theirs = {}
+    for record in others:
+        theirs.update(record_cells(record, days))
+    mine = {}
+    for record in records:
+        mine.update(record_cells(record, days))
+    clashes = sorted(
+        cell for cell, shift in mine.items()
+        if cell in theirs and theirs[cell] != shift
+    )
+    if clashes:
+        raise ConflictError(
+            f"{len(clashes)} cell(s) were changed by someone else in the meantime",
+            cells=clashes
+        )
+
+
+def _encode(record):
+    payload = json.dumps(record, separators=(',', ':'))
+    crc = zlib.crc32(payload.encode('utf-8'))
+    return f"{crc:08x} {payload}\n".encode('utf-8')
+
+
+def _decode(line):
+    """Decode one journal line, returning None if it is torn or corrupt"""
+    if not line.endswith(b'\n'):
+        return None
+    try:
+        crc_hex, payload = line[:-1].split(b' ', 1)
+        if int(crc_hex, 16) != zlib.crc32(payload):
+            return None
+        record = json.loads(payload)
+    except (ValueError, json.JSONDecodeError):
+        return None
+    if not isinstance(record, dict) or 'seq' not in record or 'op' not in record:
+        return None
+    return record
+
+
+def _fsync_directory(path):
+    """Make renames in directory ``path`` durable; skipped where directories can't be opened (Windows)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_json_atomic(path, data):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(path.parent)
+
+
+class ScheduleJournal:
+    """Snapshot + append-only journal pair backing the shift schedule"""
+
+    def __init__(self, snapshot_path, journal_path, days=31, compact_every=COMPACT_EVERY):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = Path(journal_path)
+        self.sealed_path = self.journal_path.with_name(self.journal_path.name + '.compacting')
+        # Last compacted segment, kept so the .bak snapshot can still be rolled forward
+        self.previous_path = self.journal_path.with_name(self.journal_path.name + '.prev')
+        self.days = days
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._compactor = None
+        # write_snapshot calls in progress; no compaction may start meanwhile
+        self._rewriting = 0
+        self._next_seq = None
+        self._pending = 0
+        self._recent = deque(maxlen=RECENT_RECORDS)
+
+    # Reading -----------------------------------------------------------------
+
+    def exists(self):
+        """Whether anything has been saved for this month"""
+        return self.snapshot_path.exists() or self.journal_path.exists()
+
+    def _read_snapshot(self):
+        """Return (seq, schedule, rules, warning) from the snapshot or its backup"""
+        backup_path = self.snapshot_path.with_name(self.snapshot_path.name + '.bak')
+        for path in (self.snapshot_path, backup_path):
+            if not path.exists():
+                continue
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if not isinstance(data, dict):
+                continue
+            warning = None
+            if path == backup_path and self.snapshot_path.exists():
+                warning = "Schedule snapshot was unreadable; restored from the last good backup"
+            if isinstance(data.get('seq'), int) and isinstance(data.get('members'), list):
+                schedule, rules = decode(data, self.days)
+                return data['seq'], schedule, rules, warning
+            # Dense {member: [shifts]} snapshot written before the sparse format
+            if isinstance(data.get('seq'), int) and isinstance(data.get('schedule'), dict):
+                return data['seq'], data['schedule'], {}, warning
+            # Legacy flat {member: [shifts]} file written before the journal existed
+            return 0, data, {}, warning
+        if self.snapshot_path.exists():
+            return 0, {}, {}, "Schedule snapshot was unreadable and no backup exists; replaying journal only"
+        return 0, {}, {}, None
+
+    def _read_segment(self, path, repair):
+        """Read valid records from a journal file, truncating a torn/corrupt tail"""
+        if not path.exists():
+            return [], 0
+        records = []
+        good_offset = 0
+        with open(path, 'rb') as f:
+            data = f.read()
+        for line in data.splitlines(keepends=True):
+            record = _decode(line)
+            if record is None:
+                break
+            records.append(record)
+            good_offset += len(line)
+
+        dropped = len(data) - good_offset
+        if dropped and repair:
+            corrupt_path = path.with_name(f"{path.name}.corrupt-{int(time.time())}")
+            with open(corrupt_path, 'wb') as f:
+                f.write(data[good_offset:])
+            with open(path, 'r+b') as f:
+                f.truncate(good_offset)
+                f.flush()
+                os.fsync(f.fileno())
+        return records, dropped
+
+    def load(self):
+        """Load the snapshot and replay the journal on top of it
+
+        Returns ``(schedule, warnings)`` where ``warnings`` lists any recovery
+        that had to be performed (corrupt snapshot, torn journal tail).
+        """
+        schedule, _, warnings = self.load_with_rules()
+        return schedule, warnings
+
+    def load_with_rules(self):
+        """Like ``load`` but also return each member's base rule: ``(schedule, rules, warnings)``"""
+        schedule, rules, warnings, _ = self._load()
+        return schedule, rules, warnings
+
+    def load_versioned(self):
+        """Like ``load`` but also return the ``seq`` it reflects: ``(schedule, seq, warnings)``
+
+        Pass that ``seq`` as ``base_seq`` to ``append`` and ``records_since``.
+        """
+        schedule, _, warnings, seq = self._load()
+        return schedule, seq, warnings
+
+    def _load(self):
+        with self._lock:
+            warnings = []
+            self._recent.clear()
+            seq, schedule, rules, warning = self._read_snapshot()
+            if warning:
+                warnings.append(warning)
+
+            replayed = 0
+            last_seq = seq
+            for path in (self.previous_path, self.sealed_path, self.journal_path):
+                records, dropped = self._read_segment(path, repair=True)
+                if dropped:
+                    warnings.append(
+                        f"Discarded {dropped} bytes of torn or corrupt journal data from {path.name}"
+                    )
+                for record in records:
+                    self._recent.append(record)
+                    if record['seq'] <= seq:
+                        continue
+                    apply_record(schedule, record, self.days, rules)
+                    last_seq = max(last_seq, record['seq'])
+                    replayed += 1
+
+            self._next_seq = last_seq + 1
+            self._pending = replayed
+        return schedule, rules, warnings, last_seq
+
+    @property
+    def last_seq(self):
+        """``seq`` of the newest record (or snapshot) in this month"""
+        with self._lock:
+            if self._next_seq is None:
+                self._next_seq = self._scan_last_seq() + 1
+            return self._next_seq - 1
+
+    def records_since(self, base_seq):
+        """Records appended after ``base_seq`` in order, or None if they are no longer all available
+
+        None means the month was rewritten by ``write_snapshot`` (or compacted
+        past ``base_seq``), so the caller has to reload it.
+        """
+        with self._lock:
+            if self._next_seq is None:
+                self._next_seq = self._scan_last_seq() + 1
+            return self._records_since(base_seq)
+
+    def _records_since(self, base_seq):
+        last_seq = self._next_seq - 1
+        if base_seq >= last_seq:
+            return []
+        wanted = last_seq - base_seq
+        if self._recent and self._recent[0]['seq'] <= base_seq + 1:
+            records = [record for record in self._recent if record['seq'] > base_seq]
+        else:
+            records = [
+                record
+                for path in (self.previous_path, self.sealed_path, self.journal_path)
+                for record in self._read_segment(path, repair=False)[0]
+                if record['seq'] > base_seq
+            ]
+        if len(records) != wanted or records[0]['seq'] != base_seq + 1:
+            return None
+        return records
+
+    # Writing -----------------------------------------------------------------
+
+    def append(self, *records, base_seq=None, force=False):
+        """Durably append records to the journal in a single write
+
+        With ``base_seq`` (the ``seq`` the caller's copy reflects), records
+        other writers appended since then are checked first: if any of them
+        set a cell these records also set, to a different value,
+        ``ConflictError`` is raised and nothing is written, unless ``force``.
+        Returns ``(others, seq)``: those intervening records, which the caller
+        should apply before its own (None if they are no longer available and
+        the caller has to reload), and the ``seq`` of the last record written.
+        """
+        with self._lock:
+            if self._next_seq is None:
+                self._next_seq = self._scan_last_seq() + 1
+            others = []
+            if base_seq is not None and base_seq < self._next_seq - 1:
+                others = self._records_since(base_seq)
+                if not force:
+                    if others is None:
+                        raise ConflictError("this month was rewritten since it was loaded")
+                    check_conflicts(others, records, self.days)
+            lines = []
+            for record in records:
+                record = dict(record, seq=self._next_seq)
+                self._next_seq += 1
+                self._recent.append(record)
+                lines.append(_encode(record))
+            with open(self.journal_path, 'ab') as f:
+                f.write(b''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending += len(lines)
+            seq = self._next_seq - 1
+            should_compact = self._pending >= self.compact_every
+        if should_compact:
+            self.compact()
+        return others, seq
+
+    def _scan_last_seq(self):
+        seq = self._read_snapshot()[0]
+        for path in (self.sealed_path, self.journal_path):
+            records, _ = self._read_segment(path, repair=False)
+            if records:
+                seq = max(seq, records[-1]['seq'])
+        return seq
+
+    def write_snapshot(self, schedule, rules=None):
+        """Replace the snapshot with ``schedule`` and retire the journal
+
+        Without ``rules`` every non-Off cell is stored as an override. The
+        journal becomes the ``.prev`` segment once the new snapshot is on
+        disk, so the old snapshot (now ``.bak``) can still be rolled forward.
+        """
+        with self._lock:
+            self._rewriting += 1
+        try:
+            # Appends can't start a compaction now, so once the running one is
+            # done nothing else writes the snapshot until the lock is released
+            self._wait_for_compactor()
+            with self._lock:
+                if self._next_seq is None:
+                    self._next_seq = self._scan_last_seq() + 1
+                # A new seq tells sessions holding an older copy to reload rather than merge
+                self._write_snapshot(self._next_seq, schedule, rules or {})
+                self._next_seq += 1
+                self._retire_segments()
+                self._pending = 0
+                self._recent.clear()
+        finally:
+            with self._lock:
+                self._rewriting -= 1
+
+    def _retire_segments(self):
+        """Replace ``.prev`` with the sealed and live journal, which the ``.bak`` snapshot lacks"""
+        segments = [path for path in (self.sealed_path, self.journal_path) if path.exists()]
+        if segments:
+            write_atomic(self.previous_path, b''.join(path.read_bytes() for path in segments))
+            _fsync_directory(self.previous_path.parent)
+            for path in segments:
+                path.unlink()
+        elif self.previous_path.exists():
+            self.previous_path.unlink()
+
+    def _write_snapshot(self, seq, schedule, rules):
+        if self.snapshot_path.exists():
+            os.replace(self.snapshot_path, self.snapshot_path.with_name(self.snapshot_path.name + '.bak'))
+        _write_json_atomic(self.snapshot_path, {'seq': seq, **encode(schedule, rules, self.days)})
+
+    # Compaction --------------------------------------------------------------
+
+    def compact(self, wait=False):
+        """Fold the journal into the snapshot on a background thread
+
+        The live journal is sealed (renamed) under the lock so appends keep
+        going to a fresh file while the snapshot is rebuilt from disk.
+        """
+        with self._lock:
+            if self._rewriting:
+                # write_snapshot is replacing the snapshot and the journal with it
+                return
+            if self._compactor is not None and self._compactor.is_alive():
+                compactor = self._compactor
+            else:
+                if self.journal_path.exists() and not self.sealed_path.exists():
+                    os.replace(self.journal_path, self.sealed_path)
+                self._pending = 0
+                compactor = threading.Thread(target=self._compact, name='schedule-compactor', daemon=True)
+                self._compactor = compactor
+                compactor.start()
+        if wait:
+            compactor.join()
+
+    def _wait_for_compactor(self):
+        compactor = self._compactor
+        if compactor is not None and compactor.is_alive():
+            compactor.join()
+
+    def _compact(self):
+        seq, schedule, rules, _ = self._read_snapshot()
+        records, _ = self._read_segment(self.sealed_path, repair=False)
+        for record in records:
+            if record['seq'] > seq:
+                apply_record(schedule, record, self.days, rules)
+                seq = record['seq']
+        with self._lock:
+            self._write_snapshot(seq, schedule, rules)
+            if self.sealed_path.exists():
+                os.replace(self.sealed_path, self.previous_path)
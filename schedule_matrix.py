@@ -0,0 +1,418 @@
+"""NumPy-backed in-memory representation of one month's shift schedule.
+
+A ``ScheduleMatrix`` holds a ``uint8`` members x days array plus a
+member -> row index map, so coverage counts and range/pattern assignment are
+array operations instead of per-cell Python loops. The JSON layer still
+stores ``{member: [shift, ...]}`` and converts with ``from_dict``/``to_dict``.
+
+Coverage aggregates (per day x type, per member x type and per group/team x
+type) are materialized once on load and then kept current by every mutation
+in O(changed cells), so views read them without rescanning the matrix.
+
+Availability is kept the same way as bitsets over row indices, one bit per
+member packed eight to a byte (``bitorder='little'``): for every day, the
+rows that are Off, and for every group, the rows in it. "Who in this team
+is free on day d" is one AND of two short byte arrays.
+"""
+import numpy as np
+
+from rotations import rotation_block
+
+
+class ScheduleMatrix:
+    """Members x days matrix of shift type codes with maintained aggregates"""
+
+    def __init__(self, days, num_types=256):
+        self.days = days
+        self.num_types = num_types
+        self.members = []
+        self.index = {}
+        self.groups = {}
+        self._data = np.zeros((16, days), dtype=np.uint8)
+        self._member_counts = np.zeros((16, num_types), dtype=np.int32)
+        self._day_counts = np.zeros((days, num_types), dtype=np.int32)
+        self._group_counts = {}
+        self._off_bits = np.zeros((days, 2), dtype=np.uint8)
+        self._group_bits = {}
+
+    # Conversion --------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, schedule, days, num_types=256, groups=None):
+        """Build a matrix from ``{member: [shift, ...]}``, padding/truncating rows
+
+        Unknown shift codes are read as Off. ``groups`` optionally maps
+        member -> group (team) for per-group totals.
+        """
+        matrix = cls(days, num_types)
+        members = list(schedule)
+        # Row capacity is kept a multiple of 8 so bitsets pack into whole bytes
+        data = np.zeros((max(16, -(-len(members) // 8) * 8), days), dtype=np.uint8)
+        for row, member in enumerate(members):
+            shifts = schedule[member][:days]
+            data[row, :len(shifts)] = shifts
+        data[data >= num_types] = 0
+        matrix._data = data
+        matrix.members = members
+        matrix.index = {member: row for row, member in enumerate(members)}
+        matrix.groups = dict(groups or {})
+        matrix._rebuild_aggregates()
+        return matrix
+
+    def to_dict(self):
+        """Convert back to the JSON ``{member: [shift, ...]}`` layout"""
+        return dict(zip(self.members, self.data.tolist()))
+
+    def copy(self):
+        matrix = ScheduleMatrix(self.days, self.num_types)
+        matrix.members = list(self.members)
+        matrix.index = dict(self.index)
+        matrix.groups = dict(self.groups)
+        matrix._data = self._data.copy()
+        matrix._member_counts = self._member_counts.copy()
+        matrix._day_counts = self._day_counts.copy()
+        matrix._group_counts = {g: c.copy() for g, c in self._group_counts.items()}
+        matrix._off_bits = self._off_bits.copy()
+        matrix._group_bits = {g: b.copy() for g, b in self._group_bits.items()}
+        return matrix
+
+    # Access ------------------------------------------------------------------
+
+    @property
+    def data(self):
+        """View of the live rows (no copy)"""
+        return self._data[:len(self.members)]
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, member):
+        return member in self.index
+
+    def row(self, member):
+        """A member's shifts for the month (zeros if they have none)"""
+        idx = self.index.get(member)
+        if idx is None:
+            return np.zeros(self.days, dtype=np.uint8)
+        return self._data[idx]
+
+    def get(self, member, day):
+        idx = self.index.get(member)
+        if idx is None or not 0 <= day < self.days:
+            return 0
+        return int(self._data[idx, day])
+
+    def _positions(self, members):
+        return np.fromiter((self.index.get(m, -1) for m in members), dtype=np.int64, count=len(members))
+
+    def rows(self, members):
+        """Sub-matrix for ``members`` in the given order; unknown members are all Off"""
+        positions = self._positions(members)
+        block = np.zeros((len(members), self.days), dtype=np.uint8)
+        present = positions >= 0
+        block[present] = self._data[positions[present]]
+        return block
+
+    # Mutation ----------------------------------------------------------------
+
+    def ensure_member(self, member):
+        """Return the row index for ``member``, adding an all-Off row if needed"""
+        idx = self.index.get(member)
+        if idx is not None:
+            return idx
+        idx = len(self.members)
+        if idx == self._data.shape[0]:
+            self._data = np.concatenate([self._data, np.zeros_like(self._data)])
+            self._member_counts = np.concatenate([self._member_counts, np.zeros_like(self._member_counts)])
+            self._off_bits = np.concatenate([self._off_bits, np.zeros_like(self._off_bits)], axis=1)
+            self._group_bits = {g: np.concatenate([b, np.zeros_like(b)]) for g, b in self._group_bits.items()}
+        self._data[idx] = 0
+        self._member_counts[idx] = 0
+        self._member_counts[idx, 0] = self.days
+        self._day_counts[:, 0] += 1
+        self._set_off_column(idx, True)
+        self.members.append(member)
+        self.index[member] = idx
+        group = self.groups.get(member)
+        if group is not None:
+            self._group_totals(group)[0] += self.days
+            self._set_group_bit(group, idx, True)
+        return idx
+
+    def remove_member(self, member):
+        """Drop a member's row in O(days) by moving the last row into its slot"""
+        idx = self.index.pop(member, None)
+        if idx is None:
+            return
+        self._day_counts[np.arange(self.days), self._data[idx]] -= 1
+        group = self.groups.get(member)
+        if group is not None:
+            self._group_counts[group] -= self._member_counts[idx]
+            self._set_group_bit(group, idx, False)
+        last = len(self.members) - 1
+        if idx != last:
+            moved = self.members[last]
+            self._data[idx] = self._data[last]
+            self._member_counts[idx] = self._member_counts[last]
+            self._set_off_column(idx, self._data[idx] == 0)
+            moved_group = self.groups.get(moved)
+            if moved_group is not None:
+                self._set_group_bit(moved_group, last, False)
+                self._set_group_bit(moved_group, idx, True)
+            self.members[idx] = moved
+            self.index[moved] = idx
+        self._set_off_column(last, False)
+        self.members.pop()
+
+    def set_group(self, member, group):
+        """Assign ``member`` to ``group`` (team), moving their counts between totals"""
+        old = self.groups.get(member)
+        if old == group:
+            return
+        idx = self.index.get(member)
+        if idx is not None and old is not None:
+            self._group_counts[old] -= self._member_counts[idx]
+            self._set_group_bit(old, idx, False)
+        if group is None:
+            self.groups.pop(member, None)
+            return
+        self.groups[member] = group
+        if idx is not None:
+            self._group_totals(group)[:] += self._member_counts[idx]
+            self._set_group_bit(group, idx, True)
+
+    def _write(self, idx, start, values):
+        """Overwrite cells ``start..start+len(values)`` of one row, updating aggregates"""
+        end = start + len(values)
+        old = self._data[idx, start:end].copy()
+        days = np.arange(start, end)
+        self._day_counts[days, old] -= 1
+        self._day_counts[days, values] += 1
+        delta = (np.bincount(values, minlength=self.num_types)
+                 - np.bincount(old, minlength=self.num_types)).astype(np.int32)
+        self._member_counts[idx] += delta
+        group = self.groups.get(self.members[idx])
+        if group is not None:
+            self._group_totals(group)[:] += delta
+        self._data[idx, start:end] = values
+        self._set_off_column(idx, self._data[idx] == 0)
+
+    def assign_range(self, member, start, end, shift_type):
+        """Set days ``start``..``end`` (inclusive) to ``shift_type``"""
+        idx = self.ensure_member(member)
+        start = max(start, 0)
+        end = min(end, self.days - 1)
+        if start <= end:
+            self._write(idx, start, np.full(end - start + 1, shift_type, dtype=np.uint8))
+
+    def tile_pattern(self, member, pattern, start=0):
+        """Repeat ``pattern`` from day ``start`` to the end of the month"""
+        idx = self.ensure_member(member)
+        length = self.days - start
+        if length <= 0 or not pattern:
+            return
+        reps = -(-length // len(pattern))
+        self._write(idx, start, np.tile(np.asarray(pattern, dtype=np.uint8), reps)[:length])
+
+    def set_cells(self, members, days, shifts):
+        """Set arbitrary ``(member, day) -> shift`` cells in one vectorized update
+
+        The three sequences are parallel; if a cell appears more than once the
+        last value wins. Days outside the month are ignored.
+        """
+        positions = {member: self.ensure_member(member) for member in dict.fromkeys(members)}
+        rows = np.fromiter((positions[m] for m in members), dtype=np.int64, count=len(members))
+        self._write_cells(rows, days, shifts)
+
+    def fill_block(self, members, days, shift_type):
+        """Set every ``days`` cell of every member in ``members`` to ``shift_type``"""
+        rows = np.array([self.ensure_member(m) for m in dict.fromkeys(members)], dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        self._write_cells(
+            np.repeat(rows, len(days)),
+            np.tile(days, len(rows)),
+            np.full(len(rows) * len(days), shift_type, dtype=np.uint8)
+        )
+
+    def tile_rotation(self, members, pattern, offsets, start=0):
+        """Tile ``pattern`` from day ``start`` for each member at its phase offset"""
+        length = self.days - start
+        if length <= 0 or not pattern or not members:
+            return
+        rows = np.array([self.ensure_member(m) for m in members], dtype=np.int64)
+        block = rotation_block(pattern, offsets, length)
+        self._write_cells(
+            np.repeat(rows, length),
+            np.tile(np.arange(start, self.days), len(rows)),
+            block.ravel()
+        )
+
+    def _write_cells(self, rows, days, shifts):
+        """Overwrite scattered cells by row index, updating aggregates"""
+        days = np.asarray(days, dtype=np.int64)
+        values = np.asarray(shifts, dtype=np.uint8)
+        valid = (days >= 0) & (days < self.days)
+        rows, days, values = rows[valid], days[valid], values[valid]
+        # Keep the last write per cell so aggregates are adjusted exactly once
+        _, last = np.unique((rows * self.days + days)[::-1], return_index=True)
+        keep = len(rows) - 1 - last
+        rows, days, values = rows[keep], days[keep], values[keep]
+
+        old = self._data[rows, days]
+        np.add.at(self._day_counts, (days, old), -1)
+        np.add.at(self._day_counts, (days, values), 1)
+        np.add.at(self._member_counts, (rows, old), -1)
+        np.add.at(self._member_counts, (rows, values), 1)
+        # Per-group deltas with one bincount over (group id, type) keys
+        touched, row_slot = np.unique(rows, return_inverse=True)
+        row_groups = [self.groups.get(self.members[idx]) for idx in touched]
+        group_names = list(dict.fromkeys(g for g in row_groups if g is not None))
+        if group_names:
+            group_ids = {group: gid for gid, group in enumerate(group_names)}
+            # Members without a group are counted in an extra, discarded slot
+            slot_group = np.array([group_ids.get(g, len(group_names)) for g in row_groups], dtype=np.int64)
+            keys = slot_group[row_slot] * self.num_types
+            size = (len(group_names) + 1) * self.num_types
+            delta = (np.bincount(keys + values, minlength=size)
+                     - np.bincount(keys + old, minlength=size)).reshape(-1, self.num_types)
+            for gid, group in enumerate(group_names):
+                self._group_totals(group)[:] += delta[gid].astype(np.int32)
+        self._data[rows, days] = values
+        # Off bits: set for cells that became Off, clear for the rest
+        masks = np.left_shift(1, rows & 7).astype(np.uint8)
+        off = values == 0
+        np.bitwise_or.at(self._off_bits, (days[off], rows[off] >> 3), masks[off])
+        np.bitwise_and.at(self._off_bits, (days[~off], rows[~off] >> 3), ~masks[~off])
+
+    def apply_record(self, record):
+        """Apply a schedule journal record (see ``schedule_journal.apply_record``)"""
+        op = record['op']
+        member = record.get('member')
+        if op == 'set':
+            start, end = record['days']
+            self.assign_range(member, start, end, record['shift'])
+        elif op == 'pattern':
+            self.tile_pattern(member, record['pattern'], record['start'])
+        elif op == 'cells':
+            members, days, shifts = zip(*record['cells']) if record['cells'] else ((), (), ())
+            self.set_cells(members, days, shifts)
+        elif op == 'fill':
+            self.fill_block(record['members'], record['days'], record['shift'])
+        elif op == 'rotation':
+            self.tile_rotation(record['members'], record['pattern'], record['offsets'], record['start'])
+        elif op == 'add':
+            idx = self.ensure_member(member)
+            self._write(idx, 0, np.zeros(self.days, dtype=np.uint8))
+        elif op == 'remove':
+            self.remove_member(member)
+        else:
+            raise ValueError(f"Unknown journal op: {op}")
+
+    # Availability bitsets ----------------------------------------------------
+
+    def _set_off_column(self, idx, off):
+        """Set row ``idx``'s Off bit on every day from a bool (scalar or per-day array)"""
+        byte, mask = idx >> 3, np.uint8(1 << (idx & 7))
+        column = self._off_bits[:, byte]
+        self._off_bits[:, byte] = np.where(off, column | mask, column & ~mask)
+
+    def _set_group_bit(self, group, idx, on):
+        bits = self._group_bits.get(group)
+        if bits is None:
+            bits = self._group_bits[group] = np.zeros(self._data.shape[0] // 8, dtype=np.uint8)
+        mask = np.uint8(1 << (idx & 7))
+        bits[idx >> 3] = bits[idx >> 3] | mask if on else bits[idx >> 3] & ~mask
+
+    def off_rows(self, day, group=None):
+        """Row indices of members who are Off on ``day``, optionally only those in ``group``"""
+        bits = self._off_bits[day]
+        if group is not None:
+            bits = bits & self._group_bits.get(group, np.zeros_like(bits))
+        return np.flatnonzero(np.unpackbits(bits, bitorder='little'))
+
+    def off_members(self, day, group=None):
+        """Members who are Off on ``day``, optionally only those in ``group``
+
+        Includes group members with no row this month (see ``unlisted_members``).
+        """
+        return [self.members[row] for row in self.off_rows(day, group)] + self.unlisted_members(group)
+
+    def unlisted_members(self, group=None):
+        """Grouped members with no row this month, optionally only those in ``group``; Off every day"""
+        return [
+            member for member, member_group in self.groups.items()
+            if member not in self.index and (group is None or member_group == group)
+        ]
+
+    # Aggregates --------------------------------------------------------------
+
+    def _group_totals(self, group):
+        totals = self._group_counts.get(group)
+        if totals is None:
+            totals = self._group_counts[group] = np.zeros(self.num_types, dtype=np.int32)
+        return totals
+
+    def _grouped_type_counts(self, groups, num_groups):
+        """Count shift types per group id with a single bincount"""
+        keys = groups.astype(np.int64) * self.num_types + self.data
+        counts = np.bincount(keys.ravel(), minlength=num_groups * self.num_types)
+        return counts.reshape(num_groups, self.num_types).astype(np.int32)
+
+    def _rebuild_aggregates(self):
+        """Recompute every aggregate from scratch (used on load)"""
+        n = len(self.members)
+        self._day_counts = self._grouped_type_counts(
+            np.broadcast_to(np.arange(self.days), self.data.shape), self.days)
+        self._member_counts = np.zeros((self._data.shape[0], self.num_types), dtype=np.int32)
+        self._member_counts[:n] = self._grouped_type_counts(
+            np.broadcast_to(np.arange(n)[:, None], self.data.shape), n)
+        self._group_counts = {}
+        live = np.zeros(self._data.shape[0], dtype=bool)
+        live[:n] = True
+        self._off_bits = np.packbits((self._data == 0) & live[:, None], axis=0, bitorder='little').T.copy()
+        self._group_bits = {}
+        for member, group in self.groups.items():
+            idx = self.index.get(member)
+            if idx is not None:
+                self._group_totals(group)[:] += self._member_counts[idx]
+                self._set_group_bit(group, idx, True)
+
+    @property
+    def day_type_counts(self):
+        """``days x num_types`` counts of members on each type per day"""
+        return self._day_counts
+
+    @property
+    def member_type_counts(self):
+        """``members x num_types`` counts of days per type, aligned with ``members``"""
+        return self._member_counts[:len(self.members)]
+
+    def group_type_counts(self, group):
+        """Per-type day counts summed over every member of ``group``"""
+        totals = self._group_counts.get(group)
+        if totals is None:
+            return np.zeros(self.num_types, dtype=np.int32)
+        return totals
+
+    def scheduled_per_day(self):
+        """Number of members with a non-Off shift on each day"""
+        return self._day_counts[:, 1:].sum(axis=1)
+
+    def scheduled_per_member(self):
+        """Number of non-Off days for each member, aligned with ``members``"""
+        return self.member_type_counts[:, 1:].sum(axis=1)
+
+    def scheduled_for(self, members):
+        """Number of non-Off days for each of ``members``, in the given order"""
+        positions = self._positions(members)
+        counts = np.zeros(len(members), dtype=np.int64)
+        present = positions >= 0
+        counts[present] = self._member_counts[positions[present], 1:].sum(axis=1)
+        return counts
+
+    def scheduled_total(self):
+        return int(self._day_counts[:, 1:].sum())
+
+    def counts_by_type(self):
+        """Total cells of each shift type across the whole month"""
+        return self._day_counts.sum(axis=0)
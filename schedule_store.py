@@ -0,0 +1,186 @@
+"""Shift schedule storage partitioned by (year, month).
+
+Each month lives in its own snapshot + journal pair under ``data/schedule``::
+
+    data/schedule/2026-10.json
+    data/schedule/2026-10.journal
+
+Only the months that are actually viewed get loaded, so startup time and
+memory stay flat no matter how many years of history are kept.
+"""
+import calendar
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from schedule_journal import ScheduleJournal
+
+
+PARTITION_RE = re.compile(r'^(\d{4})-(\d{2})\.(json|journal)$')
+
+
+def partition_key(year, month):
+    return f"{year:04d}-{month:02d}"
+
+
+class MonthStore:
+    """Per-month schedule partitions, each behind a ``ScheduleJournal``-like object
+
+    Storage backends subclass it and implement ``_open_month`` and
+    ``partitions``; the month objects are created once and shared.
+    """
+
+    def __init__(self):
+        self._journals = {}
+        self._lock = threading.Lock()
+
+    def _open_month(self, year, month):
+        """Create the month object for one month"""
+        raise NotImplementedError
+
+    def partitions(self):
+        """Sorted (year, month) pairs that have data saved"""
+        raise NotImplementedError
+
+    def journal(self, year, month):
+        """Return the (shared) journal for one month, creating it lazily"""
+        key = partition_key(year, month)
+        with self._lock:
+            journal = self._journals.get(key)
+            if journal is None:
+                journal = self._journals[key] = self._open_month(year, month)
+        return journal
+
+    def load_month(self, year, month):
+        """Load one month, returning ``(schedule, warnings)``"""
+        return self.journal(year, month).load()
+
+    def migrate_legacy(self, snapshot_path, journal_path, year, month):
+        """Move a flat pre-partitioning schedule into the given month
+
+        Returns True if anything was migrated. The legacy files are renamed
+        with a ``.migrated`` suffix rather than deleted.
+        """
+        snapshot_path = Path(snapshot_path)
+        journal_path = Path(journal_path)
+        if not snapshot_path.exists() and not journal_path.exists():
+            return False
+
+        days = calendar.monthrange(year, month)[1]
+        legacy = ScheduleJournal(snapshot_path, journal_path)
+        schedule, _ = legacy.load()
+        schedule = {
+            member: (list(shifts[:days]) + [0] * (days - len(shifts)))
+            for member, shifts in schedule.items()
+        }
+
+        target = self.journal(year, month)
+        rules = {}
+        if target.exists():
+            existing, rules, _ = target.load_with_rules()
+            existing.update({m: s for m, s in schedule.items() if m not in existing})
+            schedule = existing
+        target.write_snapshot(schedule, rules)
+
+        for path in (snapshot_path, journal_path,
+                     legacy.sealed_path, legacy.previous_path,
+                     snapshot_path.with_name(snapshot_path.name + '.bak')):
+            if path.exists():
+                os.replace(path, path.with_name(path.name + '.migrated'))
+        return True
+
+    def rekey_members(self, mapping, months=None):
+        """Re-key schedule rows from old keys to new ones, e.g. names to member IDs
+
+        ``mapping`` maps an old key to a list of new keys; a row is copied to
+        every new key that does not already have one. Only partitions that
+        contain old keys are rewritten. ``months`` limits the partitions
+        considered (default: all). Returns the number of partitions rewritten.
+        """
+        rewritten = 0
+        for year, month in (self.partitions() if months is None else months):
+            journal = self.journal(year, month)
+            schedule, rules, _ = journal.load_with_rules()
+            old_keys = [key for key in schedule if key in mapping]
+            if not old_keys:
+                continue
+            for key in old_keys:
+                shifts = schedule.pop(key)
+                rule = rules.pop(key, None)
+                for new_key in mapping[key]:
+                    if new_key not in schedule:
+                        schedule[new_key] = list(shifts)
+                        if rule is not None:
+                            rules[new_key] = rule
+            journal.write_snapshot(schedule, rules)
+            rewritten += 1
+        return rewritten
+
+
+class ScheduleStore(MonthStore):
+    """Directory of per-month snapshot + journal partitions"""
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _open_month(self, year, month):
+        key = partition_key(year, month)
+        return ScheduleJournal(
+            self.root / f"{key}.json",
+            self.root / f"{key}.journal",
+            days=calendar.monthrange(year, month)[1]
+        )
+
+    def partitions(self):
+        """Sorted (year, month) pairs that have data on disk"""
+        found = set()
+        for entry in os.listdir(self.root):
+            match = PARTITION_RE.match(entry)
+            if match:
+                found.add((int(match.group(1)), int(match.group(2))))
+        return sorted(found)
+
+
+class MonthCache:
+    """Small LRU cache of loaded month schedules"""
+
+    def __init__(self, capacity=6):
+        self.capacity = capacity
+        self._months = OrderedDict()
+
+    def get(self, key):
+        schedule = self._months.get(key)
+        if schedule is not None:
+            self._months.move_to_end(key)
+        return schedule
+
+    def peek(self, key):
+        """Like ``get`` but without refreshing the entry's recency"""
+        return self._months.get(key)
+
+    def put(self, key, schedule):
+        self._months[key] = schedule
+        self._months.move_to_end(key)
+        while len(self._months) > self.capacity:
+            self._months.popitem(last=False)
+
+    def replace(self, key, schedule):
+        """Swap in a new value for a cached entry without refreshing its recency"""
+        if key in self._months:
+            self._months[key] = schedule
+
+    def discard(self, key):
+        self._months.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._months
+
+    def keys(self):
+        return list(self._months)
+
+    def values(self):
+        return list(self._months.values())
@@ -0,0 +1,260 @@
+"""Process-wide authoritative data shared by every session, with a change feed.
+
+Sessions no longer load their own copies of the team members, patterns,
+staffing, settings and month schedules. ``SharedDocuments`` and
+``SharedMonths`` hold one copy of each for the whole server process, and
+sessions keep references to them. Documents are never changed in place: a
+save builds a new value (copy-on-write) and swaps it in, so a session
+halfway through rendering keeps a consistent old version. Month matrices are
+copied the same way when rows are added, removed or regrouped, but cell
+edits to existing rows are written in place, at a cost proportional to the
+cells changed; a session rendering meanwhile may show some of them early.
+
+Every swap is published on a ``ChangeFeed`` with a monotonically increasing
+version. On each rerun a session asks for the entries after the last version
+it saw and re-binds only the documents and months they name.
+
+Saves still go through the storage backend (see ``storage``), so ETags and
+cell-level conflict checks are unchanged. Locks are per document and per
+month.
+"""
+import threading
+import time
+from collections import deque
+
+from json_documents import merge
+from schedule_store import MonthCache, partition_key
+
+
+FEED_SIZE = 1000
+# Seconds between checks of the storage for edits made outside this process
+REFRESH_INTERVAL = 1.0
+
+
+class ChangeFeed:
+    """Bounded log of ``(version, topic, key, delta)`` entries, numbered from 1"""
+
+    def __init__(self, capacity=FEED_SIZE):
+        self._entries = deque(maxlen=capacity)
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def publish(self, topic, key, delta=None):
+        """Add an entry and return its version"""
+        with self._lock:
+            self._version += 1
+            self._entries.append((self._version, topic, key, delta))
+            return self._version
+
+    def since(self, version):
+        """Entries after ``version``, oldest first, or None if some were already dropped"""
+        with self._lock:
+            if version >= self._version:
+                return []
+            if not self._entries or self._entries[0][0] > version + 1:
+                return None
+            return [entry for entry in self._entries if entry[0] > version]
+
+
+class _Document:
+    def __init__(self, decode, encode):
+        self.decode = decode
+        self.encode = encode
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.value = None
+        self.data = None
+        self.etag = None
+
+
+class SharedDocuments:
+    """The shared documents, each loaded once and replaced copy-on-write on save
+
+    Each document is registered with a ``decode(data)`` turning the stored
+    JSON data (None if never saved) into the value sessions use, and an
+    ``encode(value)`` turning it back into JSON data.
+    """
+
+    def __init__(self, storage, feed):
+        self.storage = storage
+        self.feed = feed
+        self._documents = {}
+        self._checked = 0.0
+
+    def register(self, key, decode=None, encode=None):
+        self._documents[key] = _Document(decode or (lambda data: data), encode or (lambda value: value))
+
+    def empty(self, key):
+        """The value of a document whose file is missing"""
+        return self._documents[key].decode(None)
+
+    def get(self, key):
+        """Current value of a document, loading it on first use"""
+        document = self._documents[key]
+        if not document.loaded:
+            with document.lock:
+                if not document.loaded:
+                    self._load(key, document)
+        return document.value
+
+    def _load(self, key, document):
+        data, etag = self.storage.read_document(key)
+        value = document.decode(data)
+        document.value, document.data, document.etag = value, data, etag
+        document.loaded = True
+        # Persist anything decoding filled in, such as IDs for members that had none
+        if data is not None and document.encode(value) != data:
+            document.data, document.etag = self.storage.save_document(
+                key, document.encode(value), data, etag
+            )
+
+    def save(self, key, value, base):
+        """Replace a document with ``value``, a modified copy of ``base``
+
+        ``base`` is the version the caller read. If the document was replaced
+        since then, the changes are merged (see ``json_documents.merge``).
+        Returns the new shared value. Raises ``ConflictError`` if both sides
+        changed the same value.
+        """
+        document = self._documents[key]
+        self.get(key)
+        with document.lock:
+            mine = document.encode(value)
+            if document.value is not base:
+                mine = merge(document.encode(base), mine, document.data)
+            data, etag = self.storage.save_document(key, mine, document.data, document.etag)
+            document.value = value if data == document.encode(value) else document.decode(data)
+            document.data, document.etag = data, etag
+        self.feed.publish('document', key)
+        return document.value
+
+    def refresh(self):
+        """Reload documents that were changed outside this process
+
+        Checks at most once every ``REFRESH_INTERVAL`` seconds.
+        """
+        now = time.monotonic()
+        if now - self._checked < REFRESH_INTERVAL:
+            return
+        self._checked = now
+        for key, document in self._documents.items():
+            if not document.loaded or self.storage.document_etag(key) == document.etag:
+                continue
+            with document.lock:
+                if self.storage.document_etag(key) != document.etag:
+                    self._load(key, document)
+            self.feed.publish('document', key)
+
+
+def _rewrites_cells_only(matrix, record):
+    """Whether a journal record only rewrites cells of rows ``matrix`` already has"""
+    op = record['op']
+    if op in ('set', 'pattern'):
+        members = [record['member']]
+    elif op == 'cells':
+        members = [cell[0] for cell in record['cells']]
+    elif op in ('fill', 'rotation'):
+        members = record['members']
+    else:
+        return False
+    return all(member in matrix for member in members)
+
+
+class SharedMonths:
+    """Loaded month schedules shared by all sessions, most recently used first
+
+    Entries are ``(matrix, seq)``: a ``ScheduleMatrix`` and the journal
+    ``seq`` it reflects. ``load(year, month)`` builds an entry from disk.
+    Changes go through ``record``, which appends to the month's journal and
+    applies them to the matrix: in place if they only rewrite cells of
+    existing rows, otherwise to a copy that is swapped in.
+    """
+
+    def __init__(self, store, feed, load, capacity=12):
+        self.store = store
+        self.feed = feed
+        self._load = load
+        self._cache = MonthCache(capacity)
+        self._lock = threading.Lock()
+        self._month_locks = {}
+
+    def _month_lock(self, key):
+        with self._lock:
+            return self._month_locks.setdefault(key, threading.Lock())
+
+    def peek(self, year, month):
+        """The cached ``(matrix, seq)`` entry, or None if the month is not loaded"""
+        with self._lock:
+            return self._cache.peek(partition_key(year, month))
+
+    def get(self, year, month):
+        """``(matrix, seq, loaded)`` for a month, loading it if needed; ``loaded`` is True on a fresh load"""
+        key = partition_key(year, month)
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None:
+            return (*entry, False)
+        with self._month_lock(key):
+            with self._lock:
+                entry = self._cache.get(key)
+            if entry is not None:
+                return (*entry, False)
+            entry = self._load(year, month)
+            with self._lock:
+                self._cache.put(key, entry)
+        return (*entry, True)
+
+    def record(self, year, month, *records, base_seq=None, force=False):
+        """Append records to a month's journal and apply them to the shared copy
+
+        ``base_seq``, ``force`` and the return value are as for
+        ``ScheduleJournal.append``.
+        """
+        key = partition_key(year, month)
+        journal = self.store.journal(year, month)
+        with self._month_lock(key):
+            others, seq = journal.append(*records, base_seq=base_seq, force=force)
+            with self._lock:
+                entry = self._cache.peek(key)
+            if entry is not None:
+                matrix, cached_seq = entry
+                pending = journal.records_since(cached_seq)
+                with self._lock:
+                    if pending is None:
+                        self._cache.discard(key)
+                    else:
+                        if not all(_rewrites_cells_only(matrix, record) for record in pending):
+                            matrix = matrix.copy()
+                        for record in pending:
+                            matrix.apply_record(record)
+                        self._cache.put(key, (matrix, pending[-1]['seq'] if pending else cached_seq))
+        self.feed.publish('schedule', key, records)
+        return others, seq
+
+    def regroup(self, member_teams):
+        """Move rows to the teams in ``member_teams``; months that already match are left alone"""
+        with self._lock:
+            keys = list(self._cache.keys())
+        for key in keys:
+            with self._month_lock(key):
+                with self._lock:
+                    entry = self._cache.peek(key)
+                if entry is None:
+                    continue
+                matrix, seq = entry
+                changed = [
+                    member for member in set(matrix.groups) | set(member_teams)
+                    if matrix.groups.get(member) != member_teams.get(member)
+                ]
+                if not changed:
+                    continue
+                matrix = matrix.copy()
+                for member in changed:
+                    matrix.set_group(member, member_teams.get(member))
+                with self._lock:
+                    self._cache.replace(key, (matrix, seq))
+            self.feed.publish('schedule', key)
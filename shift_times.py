@@ -0,0 +1,126 @@
+"""Parsed shift start/end times and hour arithmetic over schedule arrays.
+
+``SHIFT_TYPES[...]['time']`` is display text such as ``'4:00 PM - 1:00 AM SAST'``.
+``ShiftTimes`` parses it once per type into start/end minutes after midnight
+and a duration; a shift whose end is not after its start runs overnight into
+the next day. Types without a time range (Off, leave, training) count as zero
+hours.
+
+Every calculation indexes per-type lookup tables with a whole
+``members x days`` block of shift codes (as returned by
+``ScheduleMatrix.rows``), so hours and hourly coverage come from array
+operations rather than per-cell Python loops.
+"""
+import re
+from datetime import timedelta
+from functools import lru_cache
+
+import numpy as np
+
+
+TIME_RANGE_RE = re.compile(
+    r'(\d{1,2}):(\d{2})\s*([AP]M)\s*-\s*(\d{1,2}):(\d{2})\s*([AP]M)', re.IGNORECASE
+)
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minutes(hour, minute, meridiem):
+    return (int(hour) % 12 + (12 if meridiem.upper() == 'PM' else 0)) * 60 + int(minute)
+
+
+@lru_cache(maxsize=None)
+def parse_time_range(text):
+    """``(start, end)`` minutes after midnight from ``'7:00 AM - 4:00 PM ...'``, or None"""
+    match = TIME_RANGE_RE.search(text or '')
+    if match is None:
+        return None
+    return _minutes(*match.group(1, 2, 3)), _minutes(*match.group(4, 5, 6))
+
+
+class ShiftTimes:
+    """Start, end and duration of every shift type as arrays indexed by type code"""
+
+    def __init__(self, start, end, minutes):
+        self.start = np.asarray(start, dtype=np.int32)
+        self.end = np.asarray(end, dtype=np.int32)
+        self.minutes = np.asarray(minutes, dtype=np.int32)
+        self.overnight = (self.minutes > 0) & (self.start + self.minutes > MINUTES_PER_DAY)
+        self.hour_weights = self._hour_weights()
+
+    @classmethod
+    def from_types(cls, shift_types, num_types):
+        """Parse the ``time`` text of every entry in ``shift_types``"""
+        start = np.zeros(num_types, dtype=np.int32)
+        end = np.zeros(num_types, dtype=np.int32)
+        minutes = np.zeros(num_types, dtype=np.int32)
+        for shift_type, info in shift_types.items():
+            parsed = parse_time_range(info.get('time'))
+            if parsed is None or shift_type >= num_types:
+                continue
+            start[shift_type], end[shift_type] = parsed
+            # An end at or before the start is on the following day
+            minutes[shift_type] = (parsed[1] - parsed[0]) % MINUTES_PER_DAY or MINUTES_PER_DAY
+        return cls(start, end, minutes)
+
+    def _hour_weights(self):
+        """``num_types x 48`` fraction of each hour worked on the shift's day and the next"""
+        clock = np.arange(2 * MINUTES_PER_DAY)
+        worked = (clock[None, :] >= self.start[:, None]) & (clock[None, :] < (self.start + self.minutes)[:, None])
+        return worked.reshape(len(self.minutes), 48, 60).mean(axis=2)
+
+    def describe(self, shift_type):
+        """``'16:00-01:00 (+1), 9.0h'`` style summary, or None for untimed types"""
+        if not self.minutes[shift_type]:
+            return None
+        start, end = int(self.start[shift_type]), int(self.end[shift_type])
+        spill = " (+1)" if self.overnight[shift_type] else ""
+        return (f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}{spill}, "
+                f"{self.minutes[shift_type] / 60:g}h")
+
+    # Hours -------------------------------------------------------------------
+
+    def hours(self, block):
+        """Hours worked per cell of a ``members x days`` block, credited to the start day"""
+        return self.minutes[block] / 60
+
+    def hours_per_member(self, block):
+        return self.minutes[block].sum(axis=1) / 60
+
+    def hours_per_week(self, block, first_day):
+        """Hours per member per Monday-start week for a block starting on ``first_day``
+
+        Returns ``(week_starts, hours)`` with ``hours`` shaped ``members x weeks``;
+        partial weeks at either end only include the days in the block.
+        """
+        days = block.shape[1]
+        week = (first_day.weekday() + np.arange(days)) // 7
+        weeks = int(week[-1]) + 1 if days else 0
+        monday = first_day - timedelta(days=first_day.weekday())
+        week_starts = [monday + timedelta(weeks=w) for w in range(weeks)]
+        # days x weeks one-hot, so the grouping is a single matrix product
+        membership = np.zeros((days, weeks), dtype=np.int64)
+        membership[np.arange(days), week] = 1
+        return week_starts, (self.minutes[block].astype(np.int64) @ membership) / 60
+
+    # Coverage ----------------------------------------------------------------
+
+    def hour_coverage(self, block):
+        """``days x 24`` number of people working in each hour of each day
+
+        Overnight shifts are counted on the following day for the hours
+        after midnight; spill past the last day of the block is dropped, so
+        pass one extra leading day to pick up shifts running into the first.
+        Partly worked hours count fractionally.
+        """
+        days = block.shape[1]
+        num_types = len(self.minutes)
+        keys = (np.arange(days)[None, :] * num_types + block).ravel()
+        day_counts = np.bincount(keys, minlength=days * num_types).reshape(days, num_types)
+        return self.coverage_from_counts(day_counts)
+
+    def coverage_from_counts(self, day_type_counts):
+        """``hour_coverage`` from ``days x num_types`` counts (e.g. ``ScheduleMatrix.day_type_counts``)"""
+        spread = day_type_counts @ self.hour_weights
+        coverage = spread[:, :24].copy()
+        coverage[1:] += spread[:-1, 24:]
+        return coverage
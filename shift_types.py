@@ -0,0 +1,110 @@
+"""Shift type definitions shared by the app and the export/scheduling modules."""
+
+# Enhanced shift type definitions with SAST times
+SHIFT_TYPES = {
+    0: {
+        'code': '',
+        'name': 'Off',
+        'time': 'Day Off',
+        'color': '#FFFFFF',
+        'text_color': '#000000'
+    },
+    1: {
+        'code': 'D1',
+        'name': 'Day Shift 1',
+        'time': '7:00 AM - 4:00 PM SAST',
+        'color': '#3B82F6',
+        'text_color': '#FFFFFF'
+    },
+    2: {
+        'code': 'D2',
+        'name': 'Day Shift 2',
+        'time': '8:00 AM - 5:00 PM SAST',
+        'color': '#2563EB',
+        'text_color': '#FFFFFF'
+    },
+    3: {
+        'code': 'L',
+        'name': 'Layover',
+        'time': '2:00 PM - 10:00 PM SAST',
+        'color': '#F59E0B',
+        'text_color': '#FFFFFF'
+    },
+    4: {
+        'code': 'N',
+        'name': 'Night Shift',
+        'time': '4:00 PM - 1:00 AM SAST',
+        'color': '#1F2937',
+        'text_color': '#FFFFFF'
+    },
+    5: {
+        'code': 'EM',
+        'name': 'Early Morning',
+        'time': '3:00 AM - 11:00 AM SAST',
+        'color': '#8B5CF6',
+        'text_color': '#FFFFFF'
+    },
+    6: {
+        'code': 'WD',
+        'name': 'Weekend Day',
+        'time': '7:00 AM - 4:00 PM SAST',
+        'color': '#10B981',
+        'text_color': '#FFFFFF'
+    },
+    7: {
+        'code': 'WEM',
+        'name': 'Weekend Early',
+        'time': '3:00 AM - 11:00 AM SAST',
+        'color': '#059669',
+        'text_color': '#FFFFFF'
+    },
+    8: {
+        'code': 'WN',
+        'name': 'Weekend Night',
+        'time': '4:00 PM - 1:00 AM SAST',
+        'color': '#047857',
+        'text_color': '#FFFFFF'
+    },
+    9: {
+        'code': 'HD',
+        'name': 'Holiday Day',
+        'time': '7:00 AM - 4:00 PM SAST',
+        'color': '#DC2626',
+        'text_color': '#FFFFFF'
+    },
+    10: {
+        'code': 'HEM',
+        'name': 'Holiday Early',
+        'time': '3:00 AM - 11:00 AM SAST',
+        'color': '#B91C1C',
+        'text_color': '#FFFFFF'
+    },
+    11: {
+        'code': 'HN',
+        'name': 'Holiday Night',
+        'time': '4:00 PM - 1:00 AM SAST',
+        'color': '#991B1B',
+        'text_color': '#FFFFFF'
+    },
+    12: {
+        'code': 'X',
+        'name': 'Leave',
+        'time': 'Approved Leave',
+        'color': '#EC4899',
+        'text_color': '#FFFFFF'
+    },
+    13: {
+        'code': 'SL',
+        'name': 'Sick Leave',
+        'time': 'Sick Leave',
+        'color': '#EF4444',
+        'text_color': '#FFFFFF'
+    },
+    14: {
+        'code': 'TR',
+        'name': 'Training',
+        'time': 'Training/Development',
+        'color': '#06B6D4',
+        'text_color': '#FFFFFF'
+    }
+}
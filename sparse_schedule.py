@@ -0,0 +1,100 @@
+"""Sparse on-disk encoding of one month: a base rule per member plus overrides.
+
+Most rows are a pattern laid over the month, so instead of every cell a
+month snapshot stores, per member, the rule that generated the row and only
+the cells that differ from it (leave, sick days, swaps, one-off edits)::
+
+    {"members": ["a1", "b2"],
+     "patterns": [[1, 1, 0, 0]],
+     "rules": {"a1": [0, 0, 2]},
+     "overrides": {"a1": {"14": 12}, "b2": {"3": 1, "4": 1}}}
+
+A rule is ``[pattern index, start, offset]`` (in memory, the dict from
+``make_rule``) and gives ``row[day] = pattern[(day - start + offset) % len]``
+from ``start`` on and Off before it, matching the ``pattern``/``rotation``
+journal ops. Each distinct pattern is stored once however many members use
+it. Members without a rule are all Off apart from their overrides, so file
+size and save cost grow with the number of exceptions rather than
+members x days.
+"""
+import numpy as np
+
+from rotations import rotation_block
+
+
+def make_rule(pattern, start=0, offset=0):
+    return {'pattern': list(pattern), 'start': start, 'offset': offset}
+
+
+def rule_row(rule, days):
+    """The month row a rule generates on its own"""
+    row = np.zeros(days, dtype=np.uint8)
+    start = rule['start']
+    if rule['pattern'] and start < days:
+        row[start:] = rotation_block(rule['pattern'], [rule['offset']], days - start)[0]
+    return row
+
+
+def _base_block(members, rules, days):
+    """``len(members) x days`` rows generated by the rules alone, one tile per distinct pattern/start"""
+    base = np.zeros((len(members), days), dtype=np.uint8)
+    groups = {}
+    for row, member in enumerate(members):
+        rule = rules.get(member)
+        if rule and rule['pattern'] and rule['start'] < days:
+            group = groups.setdefault((tuple(rule['pattern']), rule['start']), ([], []))
+            group[0].append(row)
+            group[1].append(rule['offset'])
+    for (pattern, start), (rows, offsets) in groups.items():
+        base[rows, start:] = rotation_block(pattern, offsets, days - start)
+    return base
+
+
+def encode(schedule, rules, days):
+    """Encode ``{member: [shift, ...]}`` against ``rules`` as members/rules/overrides"""
+    members = list(schedule)
+    dense = np.zeros((len(members), days), dtype=np.uint8)
+    for row, member in enumerate(members):
+        shifts = schedule[member][:days]
+        dense[row, :len(shifts)] = shifts
+    rows, cols = np.nonzero(dense != _base_block(members, rules, days))
+    overrides = {}
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        overrides.setdefault(members[row], {})[str(col)] = int(dense[row, col])
+    patterns = {}
+    packed = {}
+    for member in members:
+        rule = rules.get(member)
+        if rule:
+            pattern = patterns.setdefault(tuple(rule['pattern']), len(patterns))
+            packed[member] = [pattern, rule['start'], rule['offset']]
+    return {
+        'members': members,
+        'patterns': [list(pattern) for pattern in patterns],
+        'rules': packed,
+        'overrides': overrides
+    }
+
+
+def _unpack_rules(data):
+    patterns = data.get('patterns', [])
+    return {
+        member: make_rule(patterns[pattern], start, offset)
+        for member, (pattern, start, offset) in data.get('rules', {}).items()
+    }
+
+
+def decode(data, days):
+    """Materialize an encoded month back into ``({member: [shift, ...]}, rules)``"""
+    members = data['members']
+    rules = _unpack_rules(data)
+    dense = _base_block(members, rules, days)
+    index = {member: row for row, member in enumerate(members)}
+    for member, cells in data.get('overrides', {}).items():
+        row = index.get(member)
+        if row is None:
+            continue
+        for day, shift in cells.items():
+            if 0 <= int(day) < days:
+                dense[row, int(day)] = shift
+    return dict(zip(members, dense.tolist())), rules
@@ -0,0 +1,338 @@
+"""SQLite storage backend (standard library ``sqlite3``).
+
+Everything lives in one database file, opened in WAL mode so any number of
+readers run alongside the single writer::
+
+    teams(name, position)
+    members(id, team, position, name, data)          -- data: the full record
+    shifts(member, day, shift)                       -- one row per cell, day is 'YYYY-MM-DD'
+    patterns(name, position, pattern)
+    settings(key, value)
+    documents(key, version, data)                    -- ETag per document; data for
+                                                        anchors and staffing
+    months(month, last_seq)
+    changes(month, seq, record)                      -- recent journal records
+
+``shifts`` is keyed by (member, day) with a second index on (day, member),
+and ``members`` is indexed by team, so by-member, by-date and by-team
+queries are all index lookups. A member has rows for every day of each month
+they appear in, as in the JSON month files.
+
+Month objects mirror ``ScheduleJournal``: ``append`` checks conflicts against
+the records in ``changes`` and applies cell upserts in the same
+transaction, so a month never needs compacting. Only the last
+``CHANGE_LOG_SIZE`` records per month are kept for merging.
+"""
+import calendar
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+from json_documents import ConflictError, merge
+from schedule_journal import check_conflicts, record_cells
+from schedule_store import MonthStore, partition_key
+
+
+CHANGE_LOG_SIZE = 1000
+# Documents stored whole in ``documents.data`` rather than in tables of their own
+BLOB_DOCUMENTS = ('pattern_anchors', 'staffing')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS teams (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    id TEXT PRIMARY KEY,
+    team TEXT NOT NULL REFERENCES teams(name),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS members_by_team ON members(team, position);
+CREATE TABLE IF NOT EXISTS shifts (
+    member TEXT NOT NULL,
+    day TEXT NOT NULL,
+    shift INTEGER NOT NULL,
+    PRIMARY KEY (member, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS shifts_by_day ON shifts(day, member);
+CREATE TABLE IF NOT EXISTS patterns (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    pattern TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS months (
+    month TEXT PRIMARY KEY,
+    last_seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    month TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (month, seq)
+) WITHOUT ROWID;
+"""
+
+
+class SqliteStorage:
+    """Documents and month schedules in one SQLite database"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.connection().executescript(SCHEMA)
+        self.schedules = SqliteScheduleStore(self)
+
+    def connection(self):
+        """This thread's connection; sqlite3 connections are not shared between threads"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            # Every commit reaches the disk, as journal appends are fsynced
+            db.execute("PRAGMA synchronous=FULL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def transaction(self, write=False):
+        """Run a block in one transaction; ``write`` takes the write lock up front"""
+        db = self.connection()
+        db.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    # Documents ---------------------------------------------------------------
+
+    def _version(self, db, key):
+        row = db.execute("SELECT version FROM documents WHERE key = ?", (key,)).fetchone()
+        return None if row is None else str(row[0])
+
+    def _read(self, db, key):
+        row = db.execute("SELECT version, data FROM documents WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if key in BLOB_DOCUMENTS:
+            return json.loads(row[1])
+        if key == 'team_members':
+            data = {name: [] for name, in db.execute("SELECT name FROM teams ORDER BY position")}
+            for team, record in db.execute("SELECT team, data FROM members ORDER BY team, position"):
+                data[team].append(json.loads(record))
+            return data
+        if key == 'shift_patterns':
+            return {
+                name: json.loads(pattern)
+                for name, pattern in db.execute("SELECT name, pattern FROM patterns ORDER BY position")
+            }
+        if key == 'settings':
+            return {name: json.loads(value) for name, value in db.execute("SELECT key, value FROM settings")}
+        raise KeyError(key)
+
+    def _write(self, db, key, data):
+        version = int(self._version(db, key) or 0) + 1
+        blob = json.dumps(data) if key in BLOB_DOCUMENTS else None
+        db.execute(
+            "INSERT INTO documents(key, version, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET version = excluded.version, data = excluded.data",
+            (key, version, blob)
+        )
+        if key == 'team_members':
+            db.execute("DELETE FROM members")
+            db.execute("DELETE FROM teams")
+            db.executemany("INSERT INTO teams(name, position) VALUES (?, ?)",
+                           [(team, position) for position, team in enumerate(data)])
+            db.executemany(
+                "INSERT INTO members(id, team, position, name, data) VALUES (?, ?, ?, ?, ?)",
+                [(record['id'], team, position, record['name'], json.dumps(record))
+                 for team, records in data.items() for position, record in enumerate(records)]
+            )
+        elif key == 'shift_patterns':
+            db.execute("DELETE FROM patterns")
+            db.executemany("INSERT INTO patterns(name, position, pattern) VALUES (?, ?, ?)",
+                           [(name, position, json.dumps(pattern))
+                            for position, (name, pattern) in enumerate(data.items())])
+        elif key == 'settings':
+            db.execute("DELETE FROM settings")
+            db.executemany("INSERT INTO settings(key, value) VALUES (?, ?)",
+                           [(name, json.dumps(value)) for name, value in data.items()])
+        return str(version)
+
+    def read_document(self, key):
+        with self.transaction() as db:
+            return self._read(db, key), self._version(db, key)
+
+    def document_etag(self, key):
+        return self._version(self.connection(), key)
+
+    def save_document(self, key, data, base=None, base_etag=None):
+        """Save ``data``, merging with any change made since ``base`` was read (see ``json_documents``)"""
+        with self.transaction(write=True) as db:
+            if self._version(db, key) != base_etag:
+                theirs = self._read(db, key)
+                data = merge(base, data, theirs) if theirs is not None else data
+            return data, self._write(db, key, data)
+
+
+class SqliteScheduleStore(MonthStore):
+    """``MonthStore`` over the ``shifts`` table, one ``SqliteMonth`` per month"""
+
+    def __init__(self, storage):
+        super().__init__()
+        self.storage = storage
+
+    def _open_month(self, year, month):
+        return SqliteMonth(self.storage, year, month)
+
+    def partitions(self):
+        db = self.storage.connection()
+        return sorted(
+            (int(month[:4]), int(month[5:]))
+            for month, in db.execute("SELECT month FROM months")
+        )
+
+
+class SqliteMonth:
+    """One month of the ``shifts`` table with the ``ScheduleJournal`` interface"""
+
+    def __init__(self, storage, year, month):
+        self.storage = storage
+        self.key = partition_key(year, month)
+        self.days = calendar.monthrange(year, month)[1]
+        self.dates = [date(year, month, day).isoformat() for day in range(1, self.days + 1)]
+
+    def exists(self):
+        db = self.storage.connection()
+        return db.execute("SELECT 1 FROM months WHERE month = ?", (self.key,)).fetchone() is not None
+
+    # Reading -----------------------------------------------------------------
+
+    def _last_seq(self, db):
+        row = db.execute("SELECT last_seq FROM months WHERE month = ?", (self.key,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def _load(self, db):
+        schedule = {}
+        offsets = {day: i for i, day in enumerate(self.dates)}
+        rows = db.execute(
+            "SELECT member, day, shift FROM shifts WHERE day BETWEEN ? AND ? ORDER BY day",
+            (self.dates[0], self.dates[-1])
+        )
+        for member, day, shift in rows:
+            row = schedule.get(member)
+            if row is None:
+                row = schedule[member] = [0] * self.days
+            row[offsets[day]] = shift
+        return schedule
+
+    def load(self):
+        """``(schedule, warnings)``; SQLite recovers on its own, so there are never warnings"""
+        schedule, _, warnings = self.load_with_rules()
+        return schedule, warnings
+
+    def load_with_rules(self):
+        """Like ``ScheduleJournal.load_with_rules``; cells are stored individually, so rules are empty"""
+        with self.storage.transaction() as db:
+            return self._load(db), {}, []
+
+    def load_versioned(self):
+        with self.storage.transaction() as db:
+            return self._load(db), self._last_seq(db), []
+
+    @property
+    def last_seq(self):
+        return self._last_seq(self.storage.connection())
+
+    def records_since(self, base_seq):
+        with self.storage.transaction() as db:
+            return self._records_since(db, base_seq, self._last_seq(db))
+
+    def _records_since(self, db, base_seq, last_seq):
+        if base_seq >= last_seq:
+            return []
+        records = [
+            json.loads(record) for record, in db.execute(
+                "SELECT record FROM changes WHERE month = ? AND seq > ? ORDER BY seq", (self.key, base_seq)
+            )
+        ]
+        if len(records) != last_seq - base_seq:
+            return None
+        return records
+
+    # Writing -----------------------------------------------------------------
+
+    def append(self, *records, base_seq=None, force=False):
+        """Save records in one transaction, checking conflicts as ``ScheduleJournal.append`` does"""
+        with self.storage.transaction(write=True) as db:
+            seq = self._last_seq(db)
+            others = []
+            if base_seq is not None and base_seq < seq:
+                others = self._records_since(db, base_seq, seq)
+                if not force:
+                    if others is None:
+                        raise ConflictError("this month was rewritten since it was loaded")
+                    check_conflicts(others, records, self.days)
+            for record in records:
+                seq += 1
+                db.execute("INSERT INTO changes(month, seq, record) VALUES (?, ?, ?)",
+                           (self.key, seq, json.dumps(dict(record, seq=seq), separators=(',', ':'))))
+                self._apply(db, record)
+            self._set_last_seq(db, seq)
+            db.execute("DELETE FROM changes WHERE month = ? AND seq <= ?", (self.key, seq - CHANGE_LOG_SIZE))
+        return others, seq
+
+    def _set_last_seq(self, db, seq):
+        db.execute(
+            "INSERT INTO months(month, last_seq) VALUES (?, ?) "
+            "ON CONFLICT(month) DO UPDATE SET last_seq = excluded.last_seq",
+            (self.key, seq)
+        )
+
+    def _apply(self, db, record):
+        if record['op'] == 'remove':
+            db.execute("DELETE FROM shifts WHERE member = ? AND day BETWEEN ? AND ?",
+                       (record['member'], self.dates[0], self.dates[-1]))
+            return
+        cells = record_cells(record, self.days)
+        # Members new to the month get a full row of Off first, as in the JSON layout
+        db.executemany(
+            "INSERT OR IGNORE INTO shifts(member, day, shift) VALUES (?, ?, 0)",
+            [(member, day) for member in {member for member, _ in cells} for day in self.dates]
+        )
+        db.executemany(
+            "UPDATE shifts SET shift = ? WHERE member = ? AND day = ?",
+            [(shift, member, self.dates[day]) for (member, day), shift in cells.items()]
+        )
+
+    def write_snapshot(self, schedule, rules=None):
+        """Replace the whole month; sessions holding an older copy will reload it"""
+        with self.storage.transaction(write=True) as db:
+            seq = self._last_seq(db) + 1
+            db.execute("DELETE FROM shifts WHERE day BETWEEN ? AND ?", (self.dates[0], self.dates[-1]))
+            db.executemany(
+                "INSERT INTO shifts(member, day, shift) VALUES (?, ?, ?)",
+                [(member, day, int(shifts[i]) if i < len(shifts) else 0)
+                 for member, shifts in schedule.items() for i, day in enumerate(self.dates)]
+            )
+            db.execute("DELETE FROM changes WHERE month = ?", (self.key,))
+            self._set_last_seq(db, seq)
+
+    def compact(self, wait=False):
+        """Nothing to fold: cells are updated in place"""
@@ -0,0 +1,74 @@
+"""Minimum staffing requirements and month-wide gap analysis.
+
+Requirements live in ``staffing_requirements.json`` next to
+``team_members.json``, as the minimum number of people each team needs on
+each shift code per weekday, with public holidays as an eighth kind of day::
+
+    {"holidays": ["2026-12-25"],
+     "teams": {"Chats": {"D1": {"Mon": 3, "Tue": 3, "Holiday": 1}, "N": {"Mon": 2}}}}
+
+Missing entries mean no requirement. ``analyze_gaps`` counts every team's
+staff per day and shift type with a single ``bincount`` over the month's
+matrix and compares the counts with the requirement for each day's kind.
+"""
+import calendar
+from datetime import date
+
+import numpy as np
+
+
+DAY_KINDS = list(calendar.day_abbr) + ['Holiday']
+HOLIDAY = len(DAY_KINDS) - 1
+
+
+def empty_requirements():
+    return {'holidays': [], 'teams': {}}
+
+
+def day_kinds(year, month, holidays=()):
+    """Index into ``DAY_KINDS`` for every day of the month; holidays override the weekday"""
+    first_weekday, days = calendar.monthrange(year, month)
+    kinds = (first_weekday + np.arange(days)) % 7
+    for holiday in holidays:
+        holiday = date.fromisoformat(holiday)
+        if (holiday.year, holiday.month) == (year, month):
+            kinds[holiday.day - 1] = HOLIDAY
+    return kinds
+
+
+def requirement_array(requirements, teams, code_types, num_types):
+    """``teams x day kinds x num_types`` array of minimum staff from the JSON layout"""
+    required = np.zeros((len(teams), len(DAY_KINDS), num_types), dtype=np.int32)
+    kind_index = {kind: k for k, kind in enumerate(DAY_KINDS)}
+    for t, team in enumerate(teams):
+        for code, per_kind in requirements.get('teams', {}).get(team, {}).items():
+            shift_type = code_types.get(code)
+            if shift_type is None:
+                continue
+            for kind, minimum in per_kind.items():
+                if kind in kind_index:
+                    required[t, kind_index[kind], shift_type] = minimum
+    return required
+
+
+def analyze_gaps(block, row_teams, kinds, required):
+    """Staff counts against requirements for every team, day and shift type
+
+    ``block`` is the ``members x days`` month, ``row_teams`` the team index of
+    each row (-1 for none) and ``kinds`` the day kind of each column. Returns
+    ``(scheduled, needed, short, over)``, each ``teams x days x num_types``;
+    ``short`` and ``over`` are zero wherever nothing is required.
+    """
+    num_teams, _, num_types = required.shape
+    days = block.shape[1]
+    row_teams = np.asarray(row_teams, dtype=np.int64)
+    block = block[row_teams >= 0]
+    row_teams = row_teams[row_teams >= 0]
+    keys = (row_teams[:, None] * days + np.arange(days)[None, :]) * num_types + block
+    scheduled = np.bincount(keys.ravel(), minlength=num_teams * days * num_types)
+    scheduled = scheduled.reshape(num_teams, days, num_types).astype(np.int32)
+    needed = required[:, kinds, :]
+    active = needed > 0
+    short = np.where(active, np.maximum(needed - scheduled, 0), 0)
+    over = np.where(active, np.maximum(scheduled - needed, 0), 0)
+    return scheduled, needed, short, over
@@ -0,0 +1,69 @@
+"""Pluggable persistence for documents and month schedules.
+
+Two backends offer the same interface, picked with ``open_storage``:
+
+- ``json``: the original layout, one JSON file per document and a snapshot +
+  journal pair per month (``JsonStorage``)
+- ``sqlite``: a single database file with tables for teams, members,
+  schedule cells, patterns and settings (``sqlite_storage.SqliteStorage``)
+
+Every backend provides:
+
+- ``read_document(key)`` -> ``(data, etag)``, ``(None, None)`` if never saved
+- ``document_etag(key)``
+- ``save_document(key, data, base, base_etag)`` -> ``(saved, etag)``, merging
+  with changes made since ``base`` and raising ``ConflictError`` on a clash
+  (see ``json_documents.save_document``)
+- ``schedules``: a ``schedule_store.MonthStore`` whose ``journal(year, month)`` objects
+  support ``load``/``load_versioned``/``append``/``records_since``/
+  ``last_seq``/``write_snapshot``
+
+Document keys are those in ``DOCUMENT_KEYS``.
+"""
+from pathlib import Path
+
+from json_documents import document_etag, read_document, save_document
+from schedule_store import ScheduleStore
+
+
+DOCUMENT_KEYS = ('team_members', 'shift_patterns', 'pattern_anchors', 'staffing', 'settings')
+SQLITE_FILE = "shifts.db"
+
+
+class JsonStorage:
+    """Documents as JSON files and months as snapshot + journal pairs under one directory"""
+
+    DOCUMENT_FILES = {
+        'team_members': "team_members.json",
+        'shift_patterns': "shift_patterns.json",
+        'pattern_anchors': "pattern_anchors.json",
+        'staffing': "staffing_requirements.json",
+        'settings': "settings.json"
+    }
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.schedules = ScheduleStore(self.root / "schedule")
+
+    def path(self, key):
+        return self.root / self.DOCUMENT_FILES[key]
+
+    def read_document(self, key):
+        return read_document(self.path(key))
+
+    def document_etag(self, key):
+        return document_etag(self.path(key))
+
+    def save_document(self, key, data, base=None, base_etag=None):
+        return save_document(self.path(key), data, base, base_etag)
+
+
+def open_storage(backend, root):
+    """Open the ``'json'`` or ``'sqlite'`` backend over the data directory ``root``"""
+    if backend == 'json':
+        return JsonStorage(root)
+    if backend == 'sqlite':
+        from sqlite_storage import SqliteStorage
+        return SqliteStorage(Path(root) / SQLITE_FILE)
+    raise ValueError(f"Unknown storage backend: {backend}")
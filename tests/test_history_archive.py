@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+from history_archive import UNLISTED, HistoryArchive, month_range, write_history_archive
+from shift_types import SHIFT_TYPES
+
+
+OCTOBER = {'a': [1] * 31, 'b': [0, 5] * 15 + [4]}
+NOVEMBER = {'b': [2] * 30, 'c': [3] * 30}
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = tmp_path / "history.shiftarc"
+    months = {(2026, 10): OCTOBER, (2026, 11): NOVEMBER}
+    members = {'a': {'name': 'Ann', 'team': 'Red'}}
+    write_history_archive(path, month_range((2026, 10), (2026, 11)), lambda y, m: months[y, m], members)
+    return path
+
+
+def test_header_and_slices(archive_path):
+    with HistoryArchive(archive_path) as archive:
+        assert (archive.start, archive.end) == (date(2026, 10, 1), date(2026, 11, 30))
+        assert archive.members[0] == {'id': 'a', 'name': 'Ann', 'team': 'Red'}
+        assert archive.shifts[1] == (SHIFT_TYPES[1]['code'], SHIFT_TYPES[1]['name'])
+        assert archive.member('b', date(2026, 10, 30), date(2026, 11, 2)).tolist() == [5, 4, 2, 2]
+        assert archive.day(date(2026, 11, 3)).tolist() == [UNLISTED, 2, 3]
+
+
+def test_month_round_trip(archive_path):
+    with HistoryArchive(archive_path) as archive:
+        assert archive.month(2026, 10) == OCTOBER
+        assert archive.month(2026, 11) == NOVEMBER
+
+
+def test_views_outlive_context_manager(archive_path):
+    with HistoryArchive(archive_path) as archive:
+        row = archive.member('a')
+        column = archive.day(date(2026, 10, 2))
+    assert row[:3].tolist() == [1, 1, 1]
+    assert column.tolist() == [1, 5, UNLISTED]
+    archive.close()
+
+
+def test_views_are_read_only(archive_path):
+    with HistoryArchive(archive_path) as archive:
+        with pytest.raises(ValueError):
+            archive.member('a')[0] = 2
+
+
+def test_renumbered_shift_types_match_by_code(archive_path):
+    renumbered = {0: SHIFT_TYPES[0], 7: SHIFT_TYPES[1], 8: SHIFT_TYPES[5], 9: SHIFT_TYPES[4]}
+    with HistoryArchive(archive_path) as archive:
+        assert archive.month(2026, 10, renumbered)['b'][:2] == [0, 8]
+        with pytest.raises(ValueError):
+            archive.month(2026, 11, renumbered)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.shiftarc"
+    path.write_bytes(b'{"json": true}' + bytes(16))
+    with pytest.raises(ValueError):
+        HistoryArchive(path)
+
+
+def test_unknown_shift_type_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        write_history_archive(tmp_path / "x", [(2026, 10)], lambda y, m: {'a': [200] * 31})
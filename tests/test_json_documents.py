@@ -0,0 +1,55 @@
+import pytest
+
+from json_documents import ConflictError, merge, read_document, save_document
+
+
+def test_merge_takes_each_sides_changes():
+    base = {'limits': {'rest': 11, 'nights': 3}, 'month': 1}
+    mine = {'limits': {'rest': 12, 'nights': 3}, 'month': 1}
+    theirs = {'limits': {'rest': 11, 'nights': 4}, 'month': 2, 'new': True}
+    assert merge(base, mine, theirs) == {'limits': {'rest': 12, 'nights': 4}, 'month': 2, 'new': True}
+
+
+def test_merge_deletions():
+    base = {'a': 1, 'b': 2}
+    assert merge(base, {'b': 2}, {'a': 1, 'b': 3}) == {'b': 3}
+    with pytest.raises(ConflictError) as e:
+        merge(base, {'b': 2}, {'a': 5, 'b': 2})
+    assert e.value.cells == [('a',)]
+
+
+def test_merge_record_lists_by_id():
+    base = [{'id': 1, 'name': 'Ann'}, {'id': 2, 'name': 'Bo'}]
+    mine = [{'id': 1, 'name': 'Anne'}, {'id': 2, 'name': 'Bo'}, {'id': 3, 'name': 'Cy'}]
+    theirs = [{'id': 2, 'name': 'Bob'}, {'id': 1, 'name': 'Ann'}]
+    assert merge(base, mine, theirs) == [
+        {'id': 2, 'name': 'Bob'}, {'id': 1, 'name': 'Anne'}, {'id': 3, 'name': 'Cy'}
+    ]
+
+
+def test_same_value_changed_on_both_sides_conflicts():
+    with pytest.raises(ConflictError) as e:
+        merge({'x': {'y': 1}}, {'x': {'y': 2}}, {'x': {'y': 3}})
+    assert e.value.cells == [('x', 'y')]
+    assert merge({'x': 1}, {'x': 2}, {'x': 2}) == {'x': 2}
+
+
+def test_save_document_merges_with_a_stale_base(tmp_path):
+    path = tmp_path / 'settings.json'
+    base, base_etag = save_document(path, {'month': 1, 'year': 2025})
+    assert read_document(path) == (base, base_etag)
+
+    save_document(path, {'month': 1, 'year': 2026}, base, base_etag)
+    saved, saved_etag = save_document(path, {'month': 2, 'year': 2025}, base, base_etag)
+    assert saved == {'month': 2, 'year': 2026}
+    assert read_document(path) == (saved, saved_etag)
+
+    with pytest.raises(ConflictError):
+        save_document(path, {'month': 3, 'year': 2025}, base, base_etag)
+    assert read_document(path)[0] == saved
+
+
+def test_save_document_created_concurrently(tmp_path):
+    path = tmp_path / 'anchors.json'
+    save_document(path, {'a': 1})
+    assert save_document(path, {'b': 2})[0] == {'a': 1, 'b': 2}
@@ -0,0 +1,13 @@
+from member_index import MemberIndex
+
+
+def test_restore_puts_a_member_back_in_place():
+    index, _ = MemberIndex.from_dict({'red': [{'id': 'a', 'name': 'A'}, {'id': 'b', 'name': 'B'},
+                                             {'id': 'c', 'name': 'C'}]})
+    record = index.remove('b')
+    index.restore('red', record, position=1)
+    assert index.ids() == ['a', 'b', 'c']
+    assert index.find('red', 'B') == 'b'
+    index.restore('blue', index.remove('a'))
+    assert index.ids() == ['b', 'c', 'a']
+    assert index.team_of('a') == 'blue'
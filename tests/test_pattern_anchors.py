@@ -0,0 +1,39 @@
+from datetime import date
+
+import numpy as np
+
+from pattern_anchors import make_anchor, materialize, month_records, shift_on
+from schedule_matrix import ScheduleMatrix
+
+
+ANCHORS = {
+    'a': make_anchor('2on-1off', [1, 1, 0], date(2026, 9, 20)),
+    'b': make_anchor('nights', [3, 3, 0, 0], date(2026, 10, 10)),
+    'c': make_anchor('late start', [2], date(2026, 12, 1)),
+}
+
+
+def test_materialize_follows_the_anchor_across_months():
+    start, end = date(2026, 10, 1), date(2026, 11, 30)
+    shifts, covered = materialize(ANCHORS, ['a', 'b', 'c', 'none'], start, end)
+    assert shifts.shape == (4, 61)
+    for row, member_id in enumerate(['a', 'b']):
+        expected = [shift_on(ANCHORS[member_id], date.fromordinal(start.toordinal() + day)) for day in range(61)]
+        assert shifts[row].tolist() == [shift or 0 for shift in expected]
+        assert covered[row].tolist() == [shift is not None for shift in expected]
+    assert not covered[1, :9].any() and covered[1, 9:].all()
+    assert not covered[2:].any() and not shifts[2:].any()
+
+
+def test_materialize_matches_the_month_records():
+    member_ids = ['a', 'b', 'c']
+    matrix = ScheduleMatrix(31, 8)
+    for record in month_records(ANCHORS, member_ids, 2026, 10):
+        matrix.apply_record(record)
+    shifts, _ = materialize(ANCHORS, member_ids, date(2026, 10, 1), date(2026, 10, 31))
+    assert np.array_equal(matrix.rows(member_ids), shifts)
+
+
+def test_materialize_empty_range():
+    shifts, covered = materialize(ANCHORS, ['a'], date(2026, 10, 2), date(2026, 10, 1))
+    assert shifts.shape == covered.shape == (1, 0)
@@ -0,0 +1,51 @@
+from datetime import date
+
+from replacements import rank_replacements
+from schedule_matrix import ScheduleMatrix
+from shift_times import ShiftTimes
+from shift_types import SHIFT_TYPES
+
+
+NUM_TYPES = max(SHIFT_TYPES) + 1
+SHIFT_TIMES = ShiftTimes.from_types(SHIFT_TYPES, NUM_TYPES)
+DAYS = 7
+
+
+def make_matrix():
+    schedule = {
+        'absent': [1] * DAYS,
+        'busy': [1] * DAYS,
+        'rested': [0] * DAYS,
+        'other_team': [0] * DAYS,
+    }
+    groups = {'absent': 'red', 'busy': 'red', 'rested': 'red', 'other_team': 'blue', 'new_hire': 'red'}
+    return ScheduleMatrix.from_dict(schedule, DAYS, NUM_TYPES, groups)
+
+
+def test_members_without_a_row_are_off_every_day():
+    matrix = make_matrix()
+    assert matrix.unlisted_members('red') == ['new_hire']
+    assert matrix.unlisted_members('blue') == []
+    assert sorted(matrix.off_members(3, 'red')) == ['new_hire', 'rested']
+
+
+def test_cover_includes_teammates_without_a_row():
+    candidates = rank_replacements(make_matrix(), 'absent', 3, 1, 'red', SHIFT_TIMES, date(2026, 10, 1))
+    assert sorted(candidate['member'] for candidate in candidates) == ['new_hire', 'rested']
+    new_hire = next(candidate for candidate in candidates if candidate['member'] == 'new_hire')
+    assert new_hire == {'member': 'new_hire', 'breaches': 0, 'rest_before': None, 'rest_after': None, 'hours': 0.0}
+
+
+def test_cover_never_offers_the_absent_member():
+    matrix = make_matrix()
+    matrix.remove_member('absent')
+    candidates = rank_replacements(matrix, 'absent', 3, 1, 'red', SHIFT_TIMES, date(2026, 10, 1))
+    assert 'absent' not in [candidate['member'] for candidate in candidates]
+
+
+def test_busy_teammates_rank_after_rested_ones():
+    matrix = make_matrix()
+    matrix.set_cells(['rested'] * 6, [0, 1, 2, 4, 5, 6], [1] * 6)
+    candidates = rank_replacements(matrix, 'absent', 3, 1, 'red', SHIFT_TIMES, date(2026, 10, 1))
+    assert [candidate['member'] for candidate in candidates] == ['new_hire', 'rested']
+    assert candidates[1]['breaches'] > 0
@@ -0,0 +1,143 @@
+import pytest
+
+from json_documents import ConflictError
+from schedule_journal import ScheduleJournal
+
+
+DAYS = 5
+
+
+def make_journal(tmp_path, **kwargs):
+    return ScheduleJournal(tmp_path / 'schedule.json', tmp_path / 'schedule.journal', days=DAYS, **kwargs)
+
+
+def set_shift(member, day, shift):
+    return {'op': 'set', 'member': member, 'days': [day, day], 'shift': shift}
+
+
+def test_append_and_reload(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append({'op': 'add', 'member': 'a'}, set_shift('a', 1, 2))
+    schedule, seq, warnings = make_journal(tmp_path).load_versioned()
+    assert schedule == {'a': [0, 2, 0, 0, 0]}
+    assert seq == 2
+    assert warnings == []
+
+
+def test_torn_tail_is_truncated_and_kept_aside(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append({'op': 'add', 'member': 'a'}, set_shift('a', 0, 1))
+    with open(journal.journal_path, 'ab') as f:
+        f.write(b'0000abcd {"op":"set"')
+    schedule, warnings = make_journal(tmp_path).load()
+    assert schedule == {'a': [1, 0, 0, 0, 0]}
+    assert len(warnings) == 1 and 'torn or corrupt' in warnings[0]
+    assert journal.journal_path.read_bytes().endswith(b'\n')
+    assert list(tmp_path.glob('schedule.journal.corrupt-*'))
+
+
+def test_crc_mismatch_drops_the_rest_of_the_segment(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append({'op': 'add', 'member': 'a'})
+    journal.append(set_shift('a', 0, 1))
+    journal.append(set_shift('a', 1, 1))
+    lines = journal.journal_path.read_bytes().splitlines(keepends=True)
+    lines[1] = lines[1].replace(b'"shift":1', b'"shift":3')
+    journal.journal_path.write_bytes(b''.join(lines))
+    schedule, warnings = make_journal(tmp_path).load()
+    assert schedule == {'a': [0] * DAYS}
+    assert warnings
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path):
+    journal = make_journal(tmp_path, compact_every=3)
+    journal.append({'op': 'add', 'member': 'a'})
+    journal.append(set_shift('a', 0, 1))
+    journal.append(set_shift('a', 1, 1))
+    journal.compact(wait=True)
+    assert not journal.journal_path.exists()
+    assert not journal.sealed_path.exists()
+    assert journal.previous_path.exists()
+    journal.append(set_shift('a', 2, 1))
+    schedule, seq, _ = make_journal(tmp_path).load_versioned()
+    assert schedule == {'a': [1, 1, 1, 0, 0]}
+    assert seq == 4
+
+
+def test_unreadable_snapshot_rolls_forward_from_backup(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append({'op': 'add', 'member': 'a'})
+    journal.compact(wait=True)
+    journal.append(set_shift('a', 0, 1))
+    journal.compact(wait=True)
+    journal.append(set_shift('a', 1, 2))
+    journal.snapshot_path.write_text('{"seq": 3, "mem')
+    schedule, warnings = make_journal(tmp_path).load()
+    assert schedule == {'a': [1, 2, 0, 0, 0]}
+    assert any('backup' in warning for warning in warnings)
+
+
+def test_write_snapshot_keeps_the_journal_for_the_backup(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append({'op': 'add', 'member': 'a'})
+    journal.compact(wait=True)
+    journal.append(set_shift('a', 0, 1))
+    journal.write_snapshot({'b': [3] * DAYS})
+    assert not journal.journal_path.exists()
+    assert make_journal(tmp_path).load()[0] == {'b': [3] * DAYS}
+
+    # As if the new snapshot never made it to disk: the old one plus .prev
+    journal.snapshot_path.unlink()
+    schedule, _ = make_journal(tmp_path).load()
+    assert schedule == {'a': [1, 0, 0, 0, 0]}
+
+
+def test_write_snapshot_makes_older_bases_reload(tmp_path):
+    journal = make_journal(tmp_path)
+    _, seq = journal.append({'op': 'add', 'member': 'a'})
+    journal.write_snapshot({'b': [0] * DAYS})
+    assert journal.records_since(seq) is None
+    with pytest.raises(ConflictError):
+        journal.append(set_shift('b', 0, 1), base_seq=seq)
+
+
+def test_no_compaction_starts_while_a_snapshot_is_written(tmp_path, monkeypatch):
+    journal = make_journal(tmp_path, compact_every=1)
+    journal.append({'op': 'add', 'member': 'a'})
+    journal.compact(wait=True)
+    wait_for_compactor = journal._wait_for_compactor
+
+    def append_meanwhile():
+        wait_for_compactor()
+        # Another session's append lands after the wait and asks for a compaction
+        journal.append(set_shift('a', 0, 1))
+        assert not journal._compactor.is_alive()
+
+    monkeypatch.setattr(journal, '_wait_for_compactor', append_meanwhile)
+    journal.write_snapshot({'b': [2] * DAYS})
+    monkeypatch.undo()
+    journal.compact(wait=True)
+    assert make_journal(tmp_path).load()[0] == {'b': [2] * DAYS}
+
+
+def test_concurrent_appends_to_different_cells_merge(tmp_path):
+    journal = make_journal(tmp_path)
+    _, base = journal.append({'op': 'add', 'member': 'a'})
+    journal.append(set_shift('a', 0, 1), base_seq=base)
+    others, seq = journal.append(set_shift('a', 1, 2), base_seq=base)
+    assert [record['seq'] for record in others] == [2]
+    assert seq == 3
+    assert make_journal(tmp_path).load()[0] == {'a': [1, 2, 0, 0, 0]}
+
+
+def test_concurrent_appends_to_the_same_cell_conflict(tmp_path):
+    journal = make_journal(tmp_path)
+    _, base = journal.append({'op': 'add', 'member': 'a'})
+    journal.append(set_shift('a', 0, 1), base_seq=base)
+    with pytest.raises(ConflictError) as e:
+        journal.append({'op': 'cells', 'cells': [['a', 0, 2], ['a', 1, 2]]}, base_seq=base)
+    assert e.value.cells == [('a', 0)]
+    # Writing the same value is not a clash, and force overrides one
+    journal.append(set_shift('a', 0, 1), base_seq=base)
+    journal.append(set_shift('a', 0, 3), base_seq=base, force=True)
+    assert make_journal(tmp_path).load()[0] == {'a': [3, 0, 0, 0, 0]}
@@ -0,0 +1,86 @@
+import random
+
+import numpy as np
+
+from schedule_matrix import ScheduleMatrix
+
+
+DAYS = 9
+NUM_TYPES = 5
+GROUPS = ['red', 'blue']
+
+
+def assert_aggregates_match_rebuild(matrix):
+    """Incrementally kept aggregates equal those recomputed from the cells"""
+    rebuilt = ScheduleMatrix.from_dict(matrix.to_dict(), matrix.days, matrix.num_types, matrix.groups)
+    assert np.array_equal(matrix.day_type_counts, rebuilt.day_type_counts)
+    assert np.array_equal(matrix.member_type_counts, rebuilt.member_type_counts)
+    for group in set(matrix.groups.values()):
+        assert np.array_equal(matrix.group_type_counts(group), rebuilt.group_type_counts(group))
+    for day in range(matrix.days):
+        for group in [None, *GROUPS]:
+            off = {m for m in matrix.members if matrix.get(m, day) == 0
+                   and (group is None or matrix.groups.get(m) == group)}
+            assert {matrix.members[row] for row in matrix.off_rows(day, group)} == off
+
+
+def random_record(rng, members):
+    member = rng.choice(members)
+    op = rng.choice(['set', 'pattern', 'cells', 'fill', 'rotation', 'add', 'remove'])
+    if op == 'set':
+        start = rng.randrange(DAYS)
+        return {'op': op, 'member': member, 'days': [start, rng.randrange(start, DAYS + 2)],
+                'shift': rng.randrange(NUM_TYPES)}
+    if op == 'pattern':
+        return {'op': op, 'member': member, 'start': rng.randrange(DAYS),
+                'pattern': [rng.randrange(NUM_TYPES) for _ in range(rng.randint(1, 4))]}
+    if op == 'cells':
+        return {'op': op, 'cells': [[rng.choice(members), rng.randrange(DAYS), rng.randrange(NUM_TYPES)]
+                                    for _ in range(rng.randint(1, 6))]}
+    if op == 'fill':
+        return {'op': op, 'members': rng.sample(members, 3), 'days': rng.sample(range(DAYS), 3),
+                'shift': rng.randrange(NUM_TYPES)}
+    if op == 'rotation':
+        chosen = rng.sample(members, 3)
+        return {'op': op, 'members': chosen, 'offsets': [rng.randrange(4) for _ in chosen],
+                'start': rng.randrange(DAYS), 'pattern': [rng.randrange(NUM_TYPES) for _ in range(4)]}
+    return {'op': op, 'member': member}
+
+
+def test_aggregates_survive_random_edits():
+    rng = random.Random(7)
+    # More members than the initial 16 rows, so capacity has to grow
+    members = [f"m{i}" for i in range(30)]
+    schedule = {member: [rng.randrange(NUM_TYPES) for _ in range(DAYS)] for member in members[:10]}
+    groups = {member: rng.choice(GROUPS) for member in members}
+    matrix = ScheduleMatrix.from_dict(schedule, DAYS, NUM_TYPES, groups)
+    assert_aggregates_match_rebuild(matrix)
+    for step in range(300):
+        matrix.apply_record(random_record(rng, members))
+        if step % 25 == 0:
+            matrix.set_group(rng.choice(members), rng.choice(GROUPS + [None]))
+        assert_aggregates_match_rebuild(matrix)
+
+
+def test_scheduled_counts():
+    matrix = ScheduleMatrix.from_dict(
+        {'a': [1, 0, 2], 'b': [0, 0, 1], 'c': [3, 3, 3]}, 3, NUM_TYPES, {'a': 'red', 'b': 'red', 'c': 'blue'}
+    )
+    assert matrix.scheduled_per_day().tolist() == [2, 1, 3]
+    assert matrix.scheduled_per_member().tolist() == [2, 1, 3]
+    assert matrix.scheduled_for(['c', 'missing', 'a']).tolist() == [3, 0, 2]
+    assert matrix.scheduled_total() == 6
+    assert matrix.counts_by_type().tolist() == [3, 2, 1, 3, 0]
+    assert matrix.group_type_counts('red').tolist() == [3, 2, 1, 0, 0]
+    assert matrix.group_type_counts('green').tolist() == [0] * NUM_TYPES
+
+
+def test_copy_is_independent():
+    matrix = ScheduleMatrix.from_dict({'a': [1, 1, 1]}, 3, NUM_TYPES, {'a': 'red'})
+    copy = matrix.copy()
+    copy.assign_range('a', 0, 2, 0)
+    copy.ensure_member('b')
+    assert matrix.to_dict() == {'a': [1, 1, 1]}
+    assert matrix.scheduled_total() == 3
+    assert matrix.off_rows(0, 'red').tolist() == []
+    assert_aggregates_match_rebuild(copy)
@@ -0,0 +1,36 @@
+from shared_store import ChangeFeed, SharedMonths
+from schedule_matrix import ScheduleMatrix
+from schedule_store import ScheduleStore
+
+
+def make_months(tmp_path):
+    store = ScheduleStore(tmp_path)
+
+    def load(year, month):
+        schedule, seq, _ = store.journal(year, month).load_versioned()
+        return ScheduleMatrix.from_dict(schedule, 31, 8, {'a': 'red', 'b': 'red'}), seq
+
+    return SharedMonths(store, ChangeFeed(), load)
+
+
+def test_cell_edits_are_applied_in_place(tmp_path):
+    months = make_months(tmp_path)
+    months.record(2026, 10, {'op': 'add', 'member': 'a'})
+    matrix, _, _ = months.get(2026, 10)
+    _, seq = months.record(2026, 10, {'op': 'cells', 'cells': [['a', 3, 2]]})
+    assert months.peek(2026, 10) == (matrix, seq)
+    assert matrix.get('a', 3) == 2
+    assert matrix.group_type_counts('red')[2] == 1
+
+
+def test_new_rows_are_added_to_a_copy(tmp_path):
+    months = make_months(tmp_path)
+    months.record(2026, 10, {'op': 'add', 'member': 'a'})
+    matrix, _, _ = months.get(2026, 10)
+    for record in ({'op': 'add', 'member': 'b'}, {'op': 'cells', 'cells': [['a', 0, 1], ['c', 0, 1]]}):
+        months.record(2026, 10, record)
+        updated = months.peek(2026, 10)[0]
+        assert updated is not matrix
+        matrix = updated
+    assert list(matrix.members) == ['a', 'b', 'c']
+    assert months.peek(2026, 10)[0].to_dict() == make_months(tmp_path).get(2026, 10)[0].to_dict()
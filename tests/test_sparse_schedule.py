@@ -0,0 +1,50 @@
+import json
+import random
+
+from sparse_schedule import decode, encode, make_rule, rule_row
+
+
+DAYS = 31
+
+
+def test_round_trip_stores_only_exceptions():
+    rules = {'a': make_rule([1, 1, 0, 0]), 'b': make_rule([1, 1, 0, 0], start=3, offset=2)}
+    a = rule_row(rules['a'], DAYS).tolist()
+    a[14] = 12
+    schedule = {'a': a, 'b': rule_row(rules['b'], DAYS).tolist(), 'c': [0] * DAYS}
+    schedule['c'][3] = schedule['c'][4] = 1
+
+    data = json.loads(json.dumps(encode(schedule, rules, DAYS)))
+    assert data['patterns'] == [[1, 1, 0, 0]]
+    assert data['rules'] == {'a': [0, 0, 0], 'b': [0, 3, 2]}
+    assert data['overrides'] == {'a': {'14': 12}, 'c': {'3': 1, '4': 1}}
+    assert decode(data, DAYS) == (schedule, rules)
+
+
+def test_random_round_trip():
+    rng = random.Random(3)
+    schedule = {}
+    rules = {}
+    for i in range(40):
+        member = f"m{i}"
+        if rng.random() < 0.7:
+            pattern = [rng.randrange(4) for _ in range(rng.randint(1, 8))]
+            rules[member] = make_rule(pattern, rng.randrange(DAYS + 3), rng.randrange(len(pattern)))
+            row = rule_row(rules[member], DAYS)
+        else:
+            row = [0] * DAYS
+        row = list(row)
+        for day in rng.sample(range(DAYS), rng.randrange(5)):
+            row[day] = rng.randrange(4)
+        schedule[member] = row
+
+    data = json.loads(json.dumps(encode(schedule, rules, DAYS)))
+    assert decode(data, DAYS) == (schedule, rules)
+    assert list(data['members']) == list(schedule)
+
+
+def test_decode_pads_and_ignores_out_of_range_overrides():
+    data = {'members': ['a'], 'patterns': [[2]], 'rules': {'a': [0, 28, 0]},
+            'overrides': {'a': {'1': 1, '40': 3}, 'gone': {'0': 1}}}
+    schedule, _ = decode(data, 30)
+    assert schedule == {'a': [0, 1] + [0] * 26 + [2, 2]}
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from storage import open_storage
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def storage(request, tmp_path):
+    return open_storage(request.param, tmp_path / 'data')
+
+
+def test_months_round_trip(storage):
+    schedules = storage.schedules
+    assert schedules.journal(2026, 10) is schedules.journal(2026, 10)
+    schedules.journal(2026, 10).append({'op': 'add', 'member': 'a'})
+    schedules.journal(2026, 11).write_snapshot({'b': [1] * 30})
+    assert schedules.partitions() == [(2026, 10), (2026, 11)]
+    assert schedules.load_month(2026, 10)[0] == {'a': [0] * 31}
+
+
+def test_rekey_members(storage):
+    schedules = storage.schedules
+    schedules.journal(2026, 10).write_snapshot({'Ann': [2] * 31, 'id-b': [0] * 31})
+    assert schedules.rekey_members({'Ann': ['id-a1', 'id-a2']}) == 1
+    assert schedules.load_month(2026, 10)[0] == {'id-b': [0] * 31, 'id-a1': [2] * 31, 'id-a2': [2] * 31}
+
+
+def test_migrate_legacy(storage, tmp_path):
+    legacy = tmp_path / 'shift_schedule.json'
+    legacy.write_text(json.dumps({'a': [1] * 31}))
+    assert storage.schedules.migrate_legacy(legacy, tmp_path / 'shift_schedule.journal', 2026, 2)
+    assert storage.schedules.load_month(2026, 2)[0] == {'a': [1] * 28}
+    assert not legacy.exists()
@@ -0,0 +1,71 @@
+from schedule_matrix import ScheduleMatrix
+from undo_history import UndoHistory, replay_records, schedule_delta
+
+
+DAYS = 4
+
+
+def make_matrix(schedule):
+    return ScheduleMatrix.from_dict(schedule, DAYS, 8)
+
+
+def apply(matrix, records):
+    matrix = matrix.copy()
+    for record in records:
+        matrix.apply_record(record)
+    return matrix
+
+
+def test_undo_and_redo_restore_the_cells():
+    before = make_matrix({'a': [1, 1, 0, 0], 'b': [0, 0, 2, 2]})
+    records = [
+        {'op': 'set', 'member': 'a', 'days': [1, 2], 'shift': 3},
+        {'op': 'add', 'member': 'c'},
+        {'op': 'cells', 'cells': [['c', 0, 4], ['b', 3, 2]]},
+        {'op': 'remove', 'member': 'b'},
+    ]
+    delta = schedule_delta(before, records)
+    assert delta['added'] == ['c'] and delta['removed'] == ['b']
+    after = apply(before, records)
+
+    undo, skipped = replay_records(delta, after, forward=False)
+    assert skipped == 0
+    undone = apply(after, undo)
+    assert undone.to_dict() == {'a': [1, 1, 0, 0], 'b': [0, 0, 2, 2]}
+
+    redo, skipped = replay_records(delta, undone, forward=True)
+    assert skipped == 0
+    assert apply(undone, redo).to_dict() == after.to_dict()
+
+
+def test_changes_made_since_are_kept():
+    before = make_matrix({'a': [0, 0, 0, 0]})
+    records = [{'op': 'fill', 'members': ['a'], 'days': [0, 1], 'shift': 1}]
+    delta = schedule_delta(before, records)
+    after = apply(before, records)
+    after.set_cells(['a'], [1], [5])
+
+    undo, skipped = replay_records(delta, after, forward=False)
+    assert skipped == 1
+    assert apply(after, undo).to_dict() == {'a': [0, 5, 0, 0]}
+
+
+def test_no_op_changes_have_no_delta():
+    matrix = make_matrix({'a': [1, 0, 0, 0]})
+    assert schedule_delta(matrix, [{'op': 'set', 'member': 'a', 'days': [0, 0], 'shift': 1}]) is None
+    assert schedule_delta(matrix, [{'op': 'remove', 'member': 'nobody'}]) is None
+
+
+def test_history_is_bounded_and_redo_is_cleared():
+    history = UndoHistory(capacity=2)
+    for label in 'abc':
+        history.push({'label': label})
+    assert history.next_undo()['label'] == 'c'
+    history.undone()
+    history.undone()
+    assert history.next_undo() is None
+    assert history.next_redo()['label'] == 'b'
+    history.redone()
+    assert history.next_undo()['label'] == 'b'
+    history.push({'label': 'd'})
+    assert history.next_redo() is None
@@ -0,0 +1,104 @@
+"""Per-session undo/redo of schedule changes as compact cell deltas.
+
+Every schedule change is a batch of journal records (see ``schedule_journal``).
+Before it is saved, ``schedule_delta`` works out from the records alone
+which cells it changes, as ``[member, day, old, new]`` entries plus the rows
+it adds or removes, so a step costs memory in proportion to the cells it
+changed rather than the size of the month.
+
+Undoing or redoing a step turns its delta back into one ``cells`` record
+(plus ``add``/``remove`` records for whole rows), which is appended to the
+month's journal in a single write. Cells someone else changed since are
+left alone and counted as skipped.
+
+``UndoHistory`` keeps the steps in bounded ring buffers; when full, the
+oldest step is dropped.
+"""
+from collections import deque
+
+from schedule_journal import record_cells
+
+
+UNDO_LIMIT = 50
+
+
+def schedule_delta(matrix, records):
+    """What ``records`` would change in ``matrix``, or None if nothing
+
+    Returns ``{'cells': [[member, day, old, new], ...], 'added': [...],
+    'removed': [...]}``; cells of removed rows read as Off afterwards.
+    """
+    written = {}
+    present = {}
+    for record in records:
+        for (member, day), shift in record_cells(record, matrix.days).items():
+            written[member, day] = shift
+            present[member] = shift is not None
+    cells = []
+    for (member, day), shift in written.items():
+        old, new = matrix.get(member, day), shift or 0
+        if old != new:
+            cells.append([member, day, old, new])
+    added = [member for member, on in present.items() if on and member not in matrix]
+    removed = [member for member, on in present.items() if not on and member in matrix]
+    if not (cells or added or removed):
+        return None
+    return {'cells': cells, 'added': added, 'removed': removed}
+
+
+def replay_records(delta, matrix, forward):
+    """Journal records that redo (``forward``) or undo a delta against ``matrix``
+
+    Only cells still holding the value the delta left (undo) or started from
+    (redo) are written. Returns ``(records, skipped)``.
+    """
+    create, drop = (delta['added'], delta['removed']) if forward else (delta['removed'], delta['added'])
+    records = [{'op': 'add', 'member': member} for member in create if member not in matrix]
+    cells = []
+    skipped = 0
+    for member, day, old, new in delta['cells']:
+        if member in drop:
+            continue
+        expected, value = (old, new) if forward else (new, old)
+        if matrix.get(member, day) != expected:
+            skipped += 1
+        elif value:
+            cells.append([member, day, value])
+        elif member not in create:
+            cells.append([member, day, 0])
+    if cells:
+        records.append({'op': 'cells', 'cells': cells})
+    records.extend({'op': 'remove', 'member': member} for member in drop if member in matrix)
+    return records, skipped
+
+
+class UndoHistory:
+    """Bounded undo and redo stacks of steps
+
+    A step is a dict with a ``'label'``, ``'months'`` mapping ``(year, month)``
+    to a ``schedule_delta``, and optionally ``'member'`` for a member that was
+    added or removed.
+    """
+
+    def __init__(self, capacity=UNDO_LIMIT):
+        self._undo = deque(maxlen=capacity)
+        self._redo = deque(maxlen=capacity)
+
+    def push(self, step):
+        """Record a new step; anything that could be redone is discarded"""
+        self._undo.append(step)
+        self._redo.clear()
+
+    def next_undo(self):
+        return self._undo[-1] if self._undo else None
+
+    def next_redo(self):
+        return self._redo[-1] if self._redo else None
+
+    def undone(self):
+        """Move the last step to the redo stack once it has been reverted"""
+        self._redo.append(self._undo.pop())
+
+    def redone(self):
+        """Move the last undone step back once it has been re-applied"""
+        self._undo.append(self._redo.pop())